@@ -0,0 +1,262 @@
+"""
+Pre-aggregation stage for the LangChain agents.
+
+Instead of letting the LLM discover data one tool round-trip at a time (each
+tool opening its own `SessionLocal` and re-running the same GROUP BY), every
+agent job computes its aggregates once, in a single session, and hands the
+result to the agent as a compact JSON context block. The agents then only
+need tools for things the database cannot answer (Tavily search) and for
+side effects (saving alerts).
+
+Set AGENT_PRECOMPUTE_CONTEXT=false to fall back to tool discovery, e.g. to
+compare the run stats of both modes (see bench_agents.py).
+
+Usage:
+    db = SessionLocal()
+    try:
+        context = build_mandi_context(db)
+    finally:
+        db.close()
+    message = f"... {context_block(context)}"
+
+    stats = run_stats(messages, wall, precomputed=True, db_tools=MANDI_DB_TOOLS)
+    record_run("mandi", stats)
+"""
+
+import json
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from models import Crop, Farmer, MandiFarmerOrder, MandiOwner, Retailer, RetailerMandiOrder, User
+
+# Orders count as delivered to a retailer when their destination is within
+# this many degrees (~100 m) of the retailer's location.
+RETAILER_MATCH_DEG = 0.001
+
+
+def _coord(value) -> Optional[float]:
+    return round(float(value), 4) if value is not None else None
+
+
+def context_block(context: dict) -> str:
+    """Serialise `context` as compact JSON for the prompt."""
+    return json.dumps(context, separators=(",", ":"), default=str)
+
+
+# ── Mandi supply-chain agent ────────────────────────────────────────────────
+def build_mandi_context(db: Session) -> dict:
+    """Past-week procurement per item plus every mandi owner and location."""
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    procurement = (
+        db.query(
+            MandiFarmerOrder.item,
+            sa_func.count(MandiFarmerOrder.id).label("total_orders"),
+            sa_func.sum(MandiFarmerOrder.price_per_kg).label("total_price"),
+            sa_func.avg(MandiFarmerOrder.price_per_kg).label("avg_price_per_kg"),
+            sa_func.min(MandiFarmerOrder.order_date).label("earliest_order"),
+            sa_func.max(MandiFarmerOrder.order_date).label("latest_order"),
+        )
+        .filter(MandiFarmerOrder.order_date >= week_ago.date())
+        .group_by(MandiFarmerOrder.item)
+        .all()
+    )
+    owners = (
+        db.query(User.id, User.username, User.latitude, User.longitude)
+        .join(MandiOwner, MandiOwner.user_id == User.id)
+        .all()
+    )
+    return {
+        "procurement_7d": [
+            {
+                "item": r.item,
+                "orders": r.total_orders,
+                "total_price": float(r.total_price) if r.total_price else 0,
+                "avg_price_per_kg": round(float(r.avg_price_per_kg), 2) if r.avg_price_per_kg else 0,
+                "first": str(r.earliest_order) if r.earliest_order else None,
+                "last": str(r.latest_order) if r.latest_order else None,
+            }
+            for r in procurement
+        ],
+        "mandi_owners": [
+            {"user_id": r.id, "username": r.username, "lat": _coord(r.latitude), "lng": _coord(r.longitude)}
+            for r in owners
+        ],
+    }
+
+
+# ── Farmer advisory agent ───────────────────────────────────────────────────
+def build_farmer_context(db: Session) -> dict:
+    """Every farmer with location and crops, plus past-week mandi prices per item."""
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    farmers = (
+        db.query(User.id, User.username, User.latitude, User.longitude, Farmer.id.label("farmer_id"))
+        .join(Farmer, Farmer.user_id == User.id)
+        .all()
+    )
+    crops = db.query(Crop.farmer_id, Crop.name, Crop.quantity, Crop.planted_date).all()
+    prices = (
+        db.query(
+            MandiFarmerOrder.item,
+            sa_func.avg(MandiFarmerOrder.price_per_kg).label("avg_price"),
+            sa_func.min(MandiFarmerOrder.price_per_kg).label("min_price"),
+            sa_func.max(MandiFarmerOrder.price_per_kg).label("max_price"),
+            sa_func.count(MandiFarmerOrder.id).label("total_orders"),
+        )
+        .filter(MandiFarmerOrder.order_date >= week_ago.date())
+        .group_by(MandiFarmerOrder.item)
+        .all()
+    )
+
+    crops_by_farmer: Dict[int, List[dict]] = defaultdict(list)
+    for c in crops:
+        crops_by_farmer[c.farmer_id].append({
+            "name": c.name,
+            "qty": float(c.quantity) if c.quantity else None,
+            "planted": str(c.planted_date) if c.planted_date else None,
+        })
+
+    return {
+        "farmers": [
+            {
+                "user_id": f.id,
+                "username": f.username,
+                "lat": _coord(f.latitude),
+                "lng": _coord(f.longitude),
+                "crops": crops_by_farmer.get(f.farmer_id, []),
+            }
+            for f in farmers
+        ],
+        "mandi_prices_7d": [
+            {
+                "item": r.item,
+                "avg": round(float(r.avg_price), 2) if r.avg_price else 0,
+                "min": float(r.min_price) if r.min_price else 0,
+                "max": float(r.max_price) if r.max_price else 0,
+                "orders": r.total_orders,
+            }
+            for r in prices
+        ],
+    }
+
+
+# ── Retailer demand agent ───────────────────────────────────────────────────
+def build_retailer_contexts(db: Session, user_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """
+    Per-retailer context ({retailer, sales_5d}) keyed by user_id, for all
+    retailers or just `user_ids`. Sales are aggregated once per (item,
+    destination) and matched to retailers in memory on a 0.001° grid.
+    """
+    query = (
+        db.query(User.id, User.username, User.latitude, User.longitude, User.contact)
+        .join(Retailer, Retailer.user_id == User.id)
+    )
+    if user_ids is not None:
+        query = query.filter(User.id.in_(list(user_ids)))
+    retailers = query.all()
+
+    five_days_ago = datetime.utcnow() - timedelta(days=5)
+    sales = (
+        db.query(
+            RetailerMandiOrder.item,
+            RetailerMandiOrder.dest_lat,
+            RetailerMandiOrder.dest_long,
+            sa_func.count(RetailerMandiOrder.id).label("order_count"),
+            sa_func.avg(RetailerMandiOrder.price_per_kg).label("avg_price"),
+        )
+        .filter(
+            RetailerMandiOrder.order_date >= five_days_ago.date(),
+            RetailerMandiOrder.dest_lat.isnot(None),
+            RetailerMandiOrder.dest_long.isnot(None),
+        )
+        .group_by(RetailerMandiOrder.item, RetailerMandiOrder.dest_lat, RetailerMandiOrder.dest_long)
+        .all()
+    )
+
+    def cell(lat: float, lng: float):
+        return math.floor(lat / RETAILER_MATCH_DEG), math.floor(lng / RETAILER_MATCH_DEG)
+
+    sales_by_cell = defaultdict(list)
+    for s in sales:
+        lat, lng = float(s.dest_lat), float(s.dest_long)
+        sales_by_cell[cell(lat, lng)].append((lat, lng, s))
+
+    contexts = {}
+    for r in retailers:
+        per_item: Dict[str, Tuple[int, float]] = {}
+        if r.latitude is not None and r.longitude is not None:
+            r_lat, r_lng = float(r.latitude), float(r.longitude)
+            row, col = cell(r_lat, r_lng)
+            for dr in (-1, 0, 1):
+                for dc in (-1, 0, 1):
+                    for lat, lng, s in sales_by_cell.get((row + dr, col + dc), ()):
+                        if abs(lat - r_lat) < RETAILER_MATCH_DEG and abs(lng - r_lng) < RETAILER_MATCH_DEG:
+                            count, total = per_item.get(s.item, (0, 0.0))
+                            avg = float(s.avg_price) if s.avg_price is not None else 0.0
+                            per_item[s.item] = (count + s.order_count, total + avg * s.order_count)
+
+        contexts[r.id] = {
+            "retailer": {
+                "user_id": r.id,
+                "username": r.username,
+                "lat": _coord(r.latitude),
+                "lng": _coord(r.longitude),
+                "contact": r.contact,
+            },
+            "sales_5d": [
+                {"item": item, "order_count": count, "avg_price": round(total / count, 2) if count else 0}
+                for item, (count, total) in sorted(per_item.items())
+            ],
+        }
+    return contexts
+
+
+# ── Run stats ───────────────────────────────────────────────────────────────
+_last_runs: Dict[str, dict] = {}
+_last_runs_lock = threading.Lock()
+
+
+def run_stats(
+    messages: list,
+    wall_seconds: float,
+    precomputed: bool,
+    db_tools: Iterable[str] = (),
+) -> dict:
+    """
+    LLM turns, tool calls (total and per tool), DB sessions and wall time for
+    one agent invocation. Precomputed runs count their one aggregation session.
+    """
+    db_tools = set(db_tools)
+    tool_calls: Dict[str, int] = defaultdict(int)
+    llm_turns = 0
+    for message in messages:
+        if getattr(message, "type", None) == "ai":
+            llm_turns += 1
+            for call in getattr(message, "tool_calls", None) or []:
+                tool_calls[call["name"]] += 1
+
+    return {
+        "mode": "precomputed" if precomputed else "tool_discovery",
+        "wall_s": round(wall_seconds, 2),
+        "llm_turns": llm_turns,
+        "tool_calls": sum(tool_calls.values()),
+        "tool_calls_by_name": dict(tool_calls),
+        "db_sessions": int(precomputed) + sum(n for name, n in tool_calls.items() if name in db_tools),
+    }
+
+
+def record_run(agent: str, stats: dict) -> None:
+    """Remember `stats` as the last run of `agent` for the metrics endpoint."""
+    with _last_runs_lock:
+        _last_runs[agent] = stats
+
+
+def agent_run_stats() -> dict:
+    """Stats of the last run of each agent, for the metrics endpoint."""
+    with _last_runs_lock:
+        return dict(_last_runs)
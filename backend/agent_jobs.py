@@ -0,0 +1,378 @@
+"""
+Scheduled agent jobs.
+
+Each agent (retailer demand, mandi supply, farmer advisory) is its own
+APScheduler job with its own cron schedule, max-instances, misfire grace and
+coalescing, so a slow retailer run no longer delays the farmer alerts. Jobs
+share one thread-pool executor capped at AGENT_SCHEDULER_WORKERS.
+
+Every run is tracked (last start, duration, outcome) in `agent_runs`, which
+`GET /api/agent/jobs` reads, so any worker reports the same status.
+Manual triggers are queued on a small background pool and get a run id to
+poll; triggering an agent that is already queued or running (with the same
+params) returns the existing run instead of starting another. Runs are rows
+in `agent_runs`, so any worker can answer a poll, and a partial unique index
+on the active (agent, params) key stops two workers starting the same run.
+A run left active by a dead worker is failed after AGENT_RUN_TIMEOUT_SECONDS.
+
+Usage:
+    scheduler = build_scheduler()
+    scheduler.start()
+    jobs_status(scheduler)     # [{name, schedule, next_run_time, last_outcome, ...}]
+
+    run, created = submit_agent_run("demand", target_user_id=12)
+    get_agent_run(run["id"])   # {status: queued|running|success|error, result, ...}
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerThreadPool
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, insert_ignoring_duplicates
+from farmer.agent import run_farmer_agent
+from mandi.agent import run_mandi_agent
+from models import AgentRun
+from retailer.agent import run_demand_agent
+
+logger = logging.getLogger("agent_jobs")
+
+
+@dataclass(frozen=True)
+class AgentJobSpec:
+    name: str
+    run: Callable[..., str]
+    cron: str                   # crontab expression, UTC
+    misfire_grace_time: int     # seconds a late run may still start
+    max_instances: int = 1
+    coalesce: bool = True       # several missed runs collapse into one
+
+
+AGENT_JOBS: Dict[str, AgentJobSpec] = {
+    spec.name: spec
+    for spec in (
+        AgentJobSpec(
+            name="demand",
+            run=run_demand_agent,
+            cron=settings.DEMAND_AGENT_CRON,
+            misfire_grace_time=settings.DEMAND_AGENT_MISFIRE_GRACE_SECONDS,
+        ),
+        AgentJobSpec(
+            name="mandi",
+            run=run_mandi_agent,
+            cron=settings.MANDI_AGENT_CRON,
+            misfire_grace_time=settings.MANDI_AGENT_MISFIRE_GRACE_SECONDS,
+        ),
+        AgentJobSpec(
+            name="farmer",
+            run=run_farmer_agent,
+            cron=settings.FARMER_AGENT_CRON,
+            misfire_grace_time=settings.FARMER_AGENT_MISFIRE_GRACE_SECONDS,
+        ),
+    )
+}
+
+
+# ── Runs (scheduled and manual) ──────────────────────────────────────────────
+ACTIVE = ("queued", "running")
+# Predicate of the partial unique index uq_agent_runs_active_dedupe
+_ACTIVE_WHERE = text("status IN ('queued', 'running')")
+
+_manual_pool = ThreadPoolExecutor(max_workers=settings.AGENT_RUN_WORKERS, thread_name_prefix="agent-run")
+_queued_here: Set[str] = set()      # manual runs this process queued but has not started
+_queued_lock = threading.Lock()
+
+
+def _dedupe_key(agent: str, params: dict) -> str:
+    return f"{agent}|{json.dumps(params, sort_keys=True)}"
+
+
+def _run_dict(run: AgentRun) -> dict:
+    return {
+        "id": run.id,
+        "agent": run.agent,
+        "params": json.loads(run.params),
+        "trigger": run.trigger,
+        "status": run.status,
+        "created_at": run.created_at.isoformat(),
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "duration_s": run.duration_s,
+        "result": run.result,
+        "error": run.error,
+    }
+
+
+def _update_run(run_id: str, *where, **values) -> bool:
+    """UPDATE one run (if it still matches `where`); True if a row changed."""
+    db = SessionLocal()
+    try:
+        changed = db.execute(
+            update(AgentRun).where(AgentRun.id == run_id, *where).values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return changed == 1
+    finally:
+        db.close()
+
+
+def _expire_abandoned(db: Session, key: str) -> None:
+    """Fail active runs of `key` that outlived AGENT_RUN_TIMEOUT_SECONDS (their worker died)."""
+    now = datetime.utcnow()
+    db.execute(
+        update(AgentRun)
+        .where(
+            AgentRun.dedupe_key == key,
+            AgentRun.status.in_(ACTIVE),
+            AgentRun.created_at < now - timedelta(seconds=settings.AGENT_RUN_TIMEOUT_SECONDS),
+        )
+        .values(status="error", finished_at=now, error="Abandoned: no outcome within AGENT_RUN_TIMEOUT_SECONDS")
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _register(agent: str, params: dict, trigger: str) -> Tuple[dict, bool]:
+    """
+    New run for (agent, params), or the one already queued/running in any
+    worker and False. The partial unique index on active dedupe keys decides.
+    """
+    key = _dedupe_key(agent, params)
+    db = SessionLocal()
+    try:
+        # A conflicting run may finish between the INSERT and the lookup; retry then
+        for _ in range(3):
+            _expire_abandoned(db, key)
+            row = {
+                "id": uuid.uuid4().hex,
+                "agent": agent,
+                "params": json.dumps(params, sort_keys=True),
+                "trigger": trigger,
+                "dedupe_key": key,
+                "status": "queued",
+                "created_at": datetime.utcnow(),
+            }
+            stmt = insert_ignoring_duplicates(
+                db, AgentRun, ["dedupe_key"], index_where=_ACTIVE_WHERE
+            ).returning(AgentRun.id)
+            created = db.execute(stmt.values(row)).first() is not None
+            db.commit()
+            if created:
+                return _run_dict(db.get(AgentRun, row["id"])), True
+            existing = db.scalar(select(AgentRun).where(AgentRun.dedupe_key == key, AgentRun.status.in_(ACTIVE)))
+            if existing is not None:
+                return _run_dict(existing), False
+        raise RuntimeError(f"Could not register a {agent} agent run")
+    finally:
+        db.close()
+
+
+def _prune_history() -> None:
+    """Keep the newest AGENT_RUN_HISTORY runs; never drop one that is still in flight."""
+    db = SessionLocal()
+    try:
+        newest = select(AgentRun.id).order_by(AgentRun.created_at.desc()).limit(settings.AGENT_RUN_HISTORY)
+        db.execute(
+            delete(AgentRun)
+            .where(AgentRun.status.not_in(ACTIVE), AgentRun.id.not_in(newest))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _execute(run: dict) -> Optional[str]:
+    """Run one registered agent run, recording start, duration and outcome. Agent errors never raise."""
+    spec = AGENT_JOBS[run["agent"]]
+    with _queued_lock:
+        _queued_here.discard(run["id"])
+    started_at = datetime.utcnow()
+    if not _update_run(run["id"], AgentRun.status == "queued", status="running", started_at=started_at):
+        logger.warning(f"{run['agent']} agent run {run['id']} is no longer queued; not starting it")
+        return None
+    logger.info(f"⏰ Running {run['agent']} agent ({run['trigger']}, run {run['id']})...")
+
+    start = time.perf_counter()
+    result, error = None, None
+    try:
+        result = spec.run(**run["params"])
+        logger.info(f"{run['agent'].capitalize()} agent finished: {result[:200]}")
+    except Exception as e:
+        error = str(e)
+        logger.error(f"{run['agent'].capitalize()} agent failed: {e}", exc_info=True)
+
+    finished_at = datetime.utcnow()
+    duration_s = round(time.perf_counter() - start, 2)
+    outcome = "error" if error else "success"
+    try:
+        _update_run(
+            run["id"],
+            status=outcome, finished_at=finished_at, duration_s=duration_s, result=result, error=error,
+        )
+        _prune_history()
+    except Exception as e:
+        logger.error(f"Could not record the outcome of {run['agent']} agent run {run['id']}: {e}", exc_info=True)
+
+    return result
+
+
+def run_agent_job(name: str) -> Optional[str]:
+    """Scheduler entry point; skipped if a run of the same agent is in flight in any worker."""
+    run, created = _register(name, {}, "schedule")
+    if not created:
+        logger.warning(f"{name} agent run skipped: run {run['id']} is already {run['status']}")
+        return None
+    return _execute(run)
+
+
+def submit_agent_run(name: str, **params) -> Tuple[dict, bool]:
+    """
+    Queue a manual run in the background and return it (created=True), or
+    return the queued/running run with the same agent and params (created=False).
+    """
+    run, created = _register(name, params, "manual")
+    if created:
+        with _queued_lock:
+            _queued_here.add(run["id"])
+        _manual_pool.submit(_execute, run)
+    return run, created
+
+
+def get_agent_run(run_id: str) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        run = db.get(AgentRun, run_id)
+        return _run_dict(run) if run else None
+    finally:
+        db.close()
+
+
+def shutdown_agent_runs() -> None:
+    """Drop queued manual runs (failing their rows); running ones finish in their threads."""
+    _manual_pool.shutdown(wait=False, cancel_futures=True)
+    with _queued_lock:
+        cancelled = list(_queued_here)
+        _queued_here.clear()
+    for run_id in cancelled:
+        _update_run(
+            run_id, AgentRun.status == "queued",
+            status="error", finished_at=datetime.utcnow(), error="Cancelled: worker shut down before it started",
+        )
+
+
+def _on_skipped(event) -> None:
+    """Log runs APScheduler dropped (misfired past grace, or max instances reached)."""
+    name = event.job_id.removeprefix("agent:")
+    if name not in AGENT_JOBS:
+        return
+    reason = "missed" if event.code == EVENT_JOB_MISSED else "max_instances"
+    logger.warning(f"{name} agent run skipped ({reason}), scheduled for {event.scheduled_run_time}")
+
+
+# ── Scheduler ────────────────────────────────────────────────────────────────
+def build_scheduler() -> BackgroundScheduler:
+    """A scheduler with one job per agent on a shared, capped thread pool."""
+    scheduler = BackgroundScheduler(
+        executors={"default": SchedulerThreadPool(max_workers=settings.AGENT_SCHEDULER_WORKERS)},
+        timezone="UTC",
+    )
+    for spec in AGENT_JOBS.values():
+        scheduler.add_job(
+            run_agent_job,
+            trigger=CronTrigger.from_crontab(spec.cron, timezone="UTC"),
+            args=[spec.name],
+            id=f"agent:{spec.name}",
+            name=f"{spec.name} agent",
+            max_instances=spec.max_instances,
+            misfire_grace_time=spec.misfire_grace_time,
+            coalesce=spec.coalesce,
+            replace_existing=True,
+        )
+    scheduler.add_listener(_on_skipped, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+    return scheduler
+
+
+def _last_runs(db: Session) -> Dict[str, dict]:
+    """Per agent, from the retained `agent_runs` history: counts, whether one is active, and the latest runs."""
+    counts = {name: {"runs": 0, "failures": 0, "running": False} for name in AGENT_JOBS}
+    for agent, status, n in db.execute(
+        select(AgentRun.agent, AgentRun.status, func.count()).group_by(AgentRun.agent, AgentRun.status)
+    ):
+        if agent not in counts:
+            continue
+        if status in ACTIVE:
+            counts[agent]["running"] = counts[agent]["running"] or status == "running"
+        else:
+            counts[agent]["runs"] += n
+            counts[agent]["failures"] += n if status == "error" else 0
+
+    stats = {}
+    for name in AGENT_JOBS:
+        started = db.scalar(
+            select(AgentRun.started_at)
+            .where(AgentRun.agent == name, AgentRun.started_at.is_not(None))
+            .order_by(AgentRun.started_at.desc()).limit(1)
+        )
+        finished = db.scalar(
+            select(AgentRun)
+            .where(AgentRun.agent == name, AgentRun.status.not_in(ACTIVE))
+            .order_by(AgentRun.finished_at.desc()).limit(1)
+        )
+        stats[name] = {
+            **counts[name],
+            "last_started_at": started.isoformat() if started else None,
+            "last_finished_at": finished.finished_at.isoformat() if finished and finished.finished_at else None,
+            "last_duration_s": finished.duration_s if finished else None,
+            "last_outcome": finished.status if finished else None,
+            "last_error": finished.error if finished else None,
+            "last_result": finished.result[:500] if finished and finished.result else None,
+        }
+    return stats
+
+
+def _next_run_time(scheduler: Optional[BackgroundScheduler], spec: AgentJobSpec) -> Optional[datetime]:
+    """
+    The leader's scheduled fire time. Followers keep their jobs paused, so
+    there it is the next time the cron expression matches.
+    """
+    job = scheduler.get_job(f"agent:{spec.name}") if scheduler is not None and scheduler.running else None
+    if job is not None and job.next_run_time is not None:
+        return job.next_run_time
+    trigger = CronTrigger.from_crontab(spec.cron, timezone="UTC")
+    return trigger.get_next_fire_time(None, datetime.now(timezone.utc))
+
+
+def jobs_status(scheduler: Optional[BackgroundScheduler]) -> List[dict]:
+    """Schedule and last-run status of every agent job, the same from every worker."""
+    db = SessionLocal()
+    try:
+        last_runs = _last_runs(db)
+    finally:
+        db.close()
+    jobs = []
+    for name, spec in AGENT_JOBS.items():
+        next_run_time = _next_run_time(scheduler, spec)
+        jobs.append({
+            "name": name,
+            "schedule": spec.cron,
+            "max_instances": spec.max_instances,
+            "misfire_grace_time": spec.misfire_grace_time,
+            "coalesce": spec.coalesce,
+            "next_run_time": next_run_time.isoformat() if next_run_time else None,
+            **last_runs[name],
+        })
+    return jobs
@@ -0,0 +1,39 @@
+"""alert_inbox
+
+Revision ID: 3d8c5e1f7a24
+Revises: 9b3f6a2d8e51
+Create Date: 2026-10-18 16:40:03.271554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3d8c5e1f7a24'
+down_revision: Union[str, None] = '9b3f6a2d8e51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination compares (created_at, id); NULL timestamps would drop out of it
+    op.execute("UPDATE alerts SET created_at = now() WHERE created_at IS NULL")
+    op.create_index('ix_alerts_user_created_id', 'alerts', ['user_id', 'created_at', 'id'])
+    op.add_column('users', sa.Column('unseen_alert_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE users SET unseen_alert_count = unseen.n
+        FROM (
+            SELECT user_id, count(*) AS n FROM alerts
+            WHERE seen IS NOT TRUE GROUP BY user_id
+        ) AS unseen
+        WHERE users.id = unseen.user_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'unseen_alert_count')
+    op.drop_index('ix_alerts_user_created_id', table_name='alerts')
@@ -0,0 +1,55 @@
+"""notification_outbox
+
+Revision ID: 5a1f0c9e2b37
+Revises: 3d8c5e1f7a24
+Create Date: 2026-10-18 19:22:47.904116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '5a1f0c9e2b37'
+down_revision: Union[str, None] = '3d8c5e1f7a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.String(length=32), nullable=False),
+        sa.Column('source', sa.String(length=50), nullable=True),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('recipient', sa.String(length=20), nullable=False),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('twiml', sa.Text(), nullable=True),
+        sa.Column('dedupe_key', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('locked_until', sa.TIMESTAMP(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('provider_sid', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('sent_at', sa.TIMESTAMP(), nullable=True),
+        sa.CheckConstraint("kind IN ('sms', 'call')", name='check_outbox_kind'),
+        sa.CheckConstraint("status IN ('pending', 'sending', 'sent', 'dead')", name='check_outbox_status'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_notification_outbox_id'), 'notification_outbox', ['id'], unique=False)
+    op.create_index('uq_outbox_recipient_kind_dedupe', 'notification_outbox', ['recipient', 'kind', 'dedupe_key'], unique=True)
+    op.create_index('ix_outbox_status_next_attempt', 'notification_outbox', ['status', 'next_attempt_at'])
+    op.create_index('ix_outbox_batch_id', 'notification_outbox', ['batch_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_batch_id', table_name='notification_outbox')
+    op.drop_index('ix_outbox_status_next_attempt', table_name='notification_outbox')
+    op.drop_index('uq_outbox_recipient_kind_dedupe', table_name='notification_outbox')
+    op.drop_index(op.f('ix_notification_outbox_id'), table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,39 @@
+"""order_listing_indexes
+
+Revision ID: 7c1d2e9f4a10
+Revises: 4ecece073684
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '7c1d2e9f4a10'
+down_revision: Union[str, None] = '4ecece073684'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_mfo_item_date_id', 'mandi_farmer_orders', ['item', 'order_date', 'id'])
+    op.create_index('ix_mfo_date_id', 'mandi_farmer_orders', ['order_date', 'id'])
+    op.create_index('ix_mfo_src_lat_long', 'mandi_farmer_orders', ['src_lat', 'src_long'])
+    op.create_index('ix_mfo_dest_lat_long', 'mandi_farmer_orders', ['dest_lat', 'dest_long'])
+    op.create_index('ix_rmo_item_date_id', 'retailer_mandi_order', ['item', 'order_date', 'id'])
+    op.create_index('ix_rmo_date_id', 'retailer_mandi_order', ['order_date', 'id'])
+    op.create_index('ix_rmo_src_lat_long', 'retailer_mandi_order', ['src_lat', 'src_long'])
+    op.create_index('ix_rmo_dest_lat_long', 'retailer_mandi_order', ['dest_lat', 'dest_long'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rmo_dest_lat_long', table_name='retailer_mandi_order')
+    op.drop_index('ix_rmo_src_lat_long', table_name='retailer_mandi_order')
+    op.drop_index('ix_rmo_date_id', table_name='retailer_mandi_order')
+    op.drop_index('ix_rmo_item_date_id', table_name='retailer_mandi_order')
+    op.drop_index('ix_mfo_dest_lat_long', table_name='mandi_farmer_orders')
+    op.drop_index('ix_mfo_src_lat_long', table_name='mandi_farmer_orders')
+    op.drop_index('ix_mfo_date_id', table_name='mandi_farmer_orders')
+    op.drop_index('ix_mfo_item_date_id', table_name='mandi_farmer_orders')
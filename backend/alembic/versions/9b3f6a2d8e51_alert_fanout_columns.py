@@ -0,0 +1,29 @@
+"""alert_fanout_columns
+
+Revision ID: 9b3f6a2d8e51
+Revises: 7c1d2e9f4a10
+Create Date: 2026-10-18 14:05:12.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '9b3f6a2d8e51'
+down_revision: Union[str, None] = '7c1d2e9f4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('alerts', sa.Column('severity', sa.String(length=20), nullable=True))
+    op.add_column('alerts', sa.Column('dedupe_key', sa.String(length=64), nullable=True))
+    op.create_index('uq_alerts_user_dedupe_key', 'alerts', ['user_id', 'dedupe_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_alerts_user_dedupe_key', table_name='alerts')
+    op.drop_column('alerts', 'dedupe_key')
+    op.drop_column('alerts', 'severity')
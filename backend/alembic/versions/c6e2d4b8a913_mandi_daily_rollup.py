@@ -0,0 +1,43 @@
+"""mandi_daily_rollup
+
+Revision ID: c6e2d4b8a913
+Revises: 5a1f0c9e2b37
+Create Date: 2026-10-18 21:03:55.610482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c6e2d4b8a913'
+down_revision: Union[str, None] = '5a1f0c9e2b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Populate with `python backfill_supply_rollup.py` after upgrading
+    op.create_table(
+        'mandi_daily_rollup',
+        sa.Column('mandi_owner_id', sa.Integer(), nullable=False),
+        sa.Column('item', sa.String(length=100), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('inbound_orders', sa.Integer(), nullable=False),
+        sa.Column('inbound_kg', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('inbound_value', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('inbound_price_sum', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('outbound_orders', sa.Integer(), nullable=False),
+        sa.Column('outbound_kg', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('outbound_value', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('outbound_price_sum', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['mandi_owner_id'], ['mandi_owners.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('mandi_owner_id', 'item', 'day'),
+    )
+    op.create_index('ix_rollup_mandi_day', 'mandi_daily_rollup', ['mandi_owner_id', 'day'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rollup_mandi_day', table_name='mandi_daily_rollup')
+    op.drop_table('mandi_daily_rollup')
@@ -0,0 +1,28 @@
+"""order_item_id_indexes
+
+Revision ID: d4b9e6a1c352
+Revises: c6e2d4b8a913
+Create Date: 2026-10-19 10:14:21.532907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd4b9e6a1c352'
+down_revision: Union[str, None] = 'c6e2d4b8a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Item-only listings page by id; (item, order_date, id) only serves date-keyed pages
+    op.create_index('ix_mfo_item_id', 'mandi_farmer_orders', ['item', 'id'])
+    op.create_index('ix_rmo_item_id', 'retailer_mandi_order', ['item', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rmo_item_id', table_name='retailer_mandi_order')
+    op.drop_index('ix_mfo_item_id', table_name='mandi_farmer_orders')
@@ -0,0 +1,49 @@
+"""agent_runs
+
+Revision ID: e8c3f1a6b297
+Revises: d4b9e6a1c352
+Create Date: 2026-10-19 11:02:37.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e8c3f1a6b297'
+down_revision: Union[str, None] = 'd4b9e6a1c352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'agent_runs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('agent', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('trigger', sa.String(length=10), nullable=False),
+        sa.Column('dedupe_key', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+        sa.Column('started_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('duration_s', sa.Float(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.CheckConstraint("status IN ('queued', 'running', 'success', 'error')", name='check_agent_run_status'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'uq_agent_runs_active_dedupe', 'agent_runs', ['dedupe_key'], unique=True,
+        postgresql_where=sa.text("status IN ('queued', 'running')"),
+        sqlite_where=sa.text("status IN ('queued', 'running')"),
+    )
+    op.create_index('ix_agent_runs_created_at', 'agent_runs', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_agent_runs_created_at', table_name='agent_runs')
+    op.drop_index('uq_agent_runs_active_dedupe', table_name='agent_runs')
+    op.drop_table('agent_runs')
@@ -0,0 +1,192 @@
+"""
+Fan-out alert writes.
+
+One message goes to a whole audience (a role, explicit user ids, a geo
+radius, or any combination of them) with one bulk INSERT per batch instead
+of one session/commit/refresh per recipient.
+
+Every row carries a `dedupe_key`, unique per user, and inserts skip rows
+that already exist (ON CONFLICT DO NOTHING). Re-running the same fan-out
+(an agent retried after a timeout, a double-clicked trigger) therefore
+cannot duplicate alerts. Without an explicit key, one is derived from the
+scope, the UTC day, the severity and the normalised message.
+
+Each batch also bumps `users.unseen_alert_count` for the users that actually
+got a new row, in the same transaction, so the inbox badge stays exact, and
+queues the new rows for the live stream (alerts.stream), sent on commit.
+
+Usage:
+    db = SessionLocal()
+    try:
+        summary = fan_out_alert(db, "Tomato prices rising", AlertAudience(role="farmer"), severity="high")
+    finally:
+        db.close()
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from alerts.stream import alert_event, publish_alerts
+from database import SessionLocal, insert_ignoring_duplicates
+from geo import KM_PER_DEGREE_LAT, haversine_km
+from models import Alert, User
+
+logger = logging.getLogger("alert_fanout")
+
+SEVERITIES = ("low", "medium", "high", "critical")
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class AlertAudience:
+    """Who receives an alert. Criteria that are set are ANDed together."""
+
+    role: Optional[str] = None                  # farmer | mandi_owner | retailer | admin
+    user_ids: Optional[Sequence[int]] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    radius_km: Optional[float] = None
+
+    def __post_init__(self):
+        geo = (self.lat, self.lng, self.radius_km)
+        if any(v is not None for v in geo) and not all(v is not None for v in geo):
+            raise ValueError("A geo audience needs lat, lng and radius_km")
+        if self.role is None and self.user_ids is None and self.radius_km is None:
+            raise ValueError("Audience needs a role, user_ids or a geo radius")
+
+
+def resolve_audience(db: Session, audience: AlertAudience) -> List[int]:
+    """User ids matching `audience`, ascending."""
+    query = select(User.id)
+    if audience.role is not None:
+        query = query.where(User.role == audience.role)
+    if audience.user_ids is not None:
+        if not audience.user_ids:
+            return []
+        query = query.where(User.id.in_(list(audience.user_ids)))
+    if audience.radius_km is None:
+        return list(db.scalars(query.order_by(User.id)))
+
+    # Bounding box in SQL, exact great-circle distance on the survivors
+    lat_pad = audience.radius_km / KM_PER_DEGREE_LAT
+    lng_pad = lat_pad / max(0.01, np.cos(np.radians(min(89.0, abs(audience.lat) + lat_pad))))
+    rows = db.execute(
+        query.add_columns(User.latitude, User.longitude).where(
+            User.latitude.between(audience.lat - lat_pad, audience.lat + lat_pad),
+            User.longitude.between(audience.lng - lng_pad, audience.lng + lng_pad),
+        ).order_by(User.id)
+    ).all()
+    if not rows:
+        return []
+    lats = np.array([float(r.latitude) for r in rows])
+    lngs = np.array([float(r.longitude) for r in rows])
+    inside = haversine_km(audience.lat, audience.lng, lats, lngs) <= audience.radius_km
+    return [r.id for r, keep in zip(rows, inside) if keep]
+
+
+def derive_dedupe_key(message: str, severity: str, scope: str = "", day: Optional[str] = None) -> str:
+    """Stable key for "this message, at this severity, from this scope, today"."""
+    day = day or datetime.utcnow().strftime("%Y-%m-%d")
+    normalised = re.sub(r"\s+", " ", message.strip().lower())
+    return hashlib.sha256(f"{scope}|{day}|{severity}|{normalised}".encode()).hexdigest()[:40]
+
+
+def fan_out_alert(
+    db: Session,
+    message: str,
+    audience: AlertAudience,
+    severity: str = "medium",
+    dedupe_key: Optional[str] = None,
+    scope: str = "",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Write `message` for every user in `audience`, `batch_size` rows per
+    INSERT (each batch commits on its own). Returns
+    {targeted, inserted, duplicates, dedupe_key, alert_ids}; alert_ids
+    covers only newly inserted rows.
+    """
+    severity = severity if severity in SEVERITIES else "medium"
+    dedupe_key = dedupe_key or derive_dedupe_key(message, severity, scope)
+    user_ids = resolve_audience(db, audience)
+
+    created_at = datetime.utcnow()
+    alert_ids: List[int] = []
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        stmt = insert_ignoring_duplicates(db, Alert, ["user_id", "dedupe_key"]).returning(Alert.id, Alert.user_id)
+        rows = [
+            {
+                "user_id": uid,
+                "message": message,
+                "severity": severity,
+                "seen": False,
+                "created_at": created_at,
+                "dedupe_key": dedupe_key,
+            }
+            for uid in batch
+        ]
+        inserted = db.execute(stmt.values(rows)).all()
+        if inserted:
+            db.execute(
+                update(User)
+                .where(User.id.in_([row.user_id for row in inserted]))
+                .values(unseen_alert_count=User.unseen_alert_count + 1)
+            )
+            publish_alerts(db, [
+                alert_event(row.id, row.user_id, message, severity, created_at) for row in inserted
+            ])
+        db.commit()
+        alert_ids.extend(row.id for row in inserted)
+
+    summary = {
+        "targeted": len(user_ids),
+        "inserted": len(alert_ids),
+        "duplicates": len(user_ids) - len(alert_ids),
+        "dedupe_key": dedupe_key,
+        "alert_ids": alert_ids,
+    }
+    logger.info(
+        f"Alert fan-out ({severity}, key {dedupe_key[:8]}): "
+        f"{summary['inserted']}/{summary['targeted']} inserted, {summary['duplicates']} duplicates"
+    )
+    return summary
+
+
+def save_alert_json(alert_json: str, role: str, scope: str) -> str:
+    """
+    Body of the agents' save-alert tools. `alert_json` holds message,
+    severity and optionally user_id / user_ids; without ids the alert goes
+    to every user with `role`. Returns a confirmation for the LLM.
+    """
+    db: Session = SessionLocal()
+    try:
+        data = json.loads(alert_json)
+        user_ids = data.get("user_ids")
+        if user_ids is None and data.get("user_id") is not None:
+            user_ids = [data["user_id"]]
+        summary = fan_out_alert(
+            db,
+            data["message"],
+            AlertAudience(role=role, user_ids=[int(uid) for uid in user_ids] if user_ids is not None else None),
+            severity=data.get("severity", "medium"),
+            scope=scope,
+        )
+        return (
+            f"Alert saved for {summary['inserted']} of {summary['targeted']} {role} users "
+            f"({summary['duplicates']} already had it)."
+        )
+    except Exception as e:
+        db.rollback()
+        return f"Failed to save alert: {e}"
+    finally:
+        db.close()
@@ -0,0 +1,225 @@
+import asyncio
+import json
+from collections import OrderedDict
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from alerts.fanout import AlertAudience, fan_out_alert
+from alerts.stream import alert_broker, alert_event
+from auth import Principal, principal_from_token, require_principal, require_role
+from config import settings
+from database import AsyncSessionLocal, get_async_db, get_db
+from models import Alert, User
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    encode_time_cursor, set_next_cursor, split_page, time_keyset_query,
+)
+from schemas import (
+    AlertFanoutRequest, AlertFanoutResponse,
+    AlertMarkSeenRequest, AlertMarkSeenResponse, AlertResponse, AlertUnseenCountResponse,
+)
+
+router = APIRouter(prefix="/api/alerts", tags=["Alerts"])
+
+INBOX_ROLES = ("farmer", "mandi_owner", "retailer")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+#  INBOX  (the caller's own alerts)
+# ═════════════════════════════════════════════════════════════════════════════
+
+@router.get("", response_model=List[AlertResponse])
+async def list_alerts(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    unseen_only: bool = False,
+    principal: Principal = Depends(require_principal(*INBOX_ROLES)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    The caller's alerts, newest first, one page at a time.
+
+    Pass the `X-Next-Cursor` response header back as `?cursor=` to fetch the
+    next page; the header is absent on the last page.
+    """
+    stmt = select(Alert).where(Alert.user_id == principal.user_id)
+    if unseen_only:
+        stmt = stmt.where(Alert.seen.isnot(True))
+    result = await db.execute(time_keyset_query(stmt, Alert.created_at, Alert.id, cursor, limit))
+    alerts, next_cursor = split_page(
+        result.scalars().all(), limit,
+        cursor_for=lambda a: encode_time_cursor(a.created_at, a.id),
+    )
+    set_next_cursor(response, next_cursor)
+    return alerts
+
+
+@router.get("/unseen-count", response_model=AlertUnseenCountResponse)
+async def unseen_count(
+    principal: Principal = Depends(require_principal(*INBOX_ROLES)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Badge count: one primary-key lookup on the maintained counter."""
+    count = await db.scalar(select(User.unseen_alert_count).where(User.id == principal.user_id))
+    return {"unseen_count": count or 0}
+
+
+@router.post("/seen", response_model=AlertMarkSeenResponse)
+async def mark_alerts_seen(
+    payload: AlertMarkSeenRequest,
+    principal: Principal = Depends(require_principal(*INBOX_ROLES)),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Mark the caller's alerts seen in bulk: by `ids`, everything up to
+    `up_to_id`, or `all`. The counter drops by the rows actually flipped.
+    """
+    stmt = update(Alert).where(Alert.user_id == principal.user_id, Alert.seen.isnot(True))
+    if payload.ids is not None:
+        stmt = stmt.where(Alert.id.in_(payload.ids))
+    elif payload.up_to_id is not None:
+        stmt = stmt.where(Alert.id <= payload.up_to_id)
+    result = await db.execute(
+        stmt.values(seen=True).execution_options(synchronize_session=False)
+    )
+    marked = result.rowcount or 0
+
+    remaining = await db.scalar(
+        update(User)
+        .where(User.id == principal.user_id)
+        .values(unseen_alert_count=case(
+            (User.unseen_alert_count > marked, User.unseen_alert_count - marked),
+            else_=0,
+        ))
+        .returning(User.unseen_alert_count)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return {"marked": marked, "unseen_count": remaining or 0}
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+#  LIVE STREAM  (Server-Sent Events)
+# ═════════════════════════════════════════════════════════════════════════════
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: alert\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def _missed_alerts(user_id: int, after_id: int, limit: int) -> List[dict]:
+    """One page of alerts written while the client was disconnected, oldest first."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(Alert.id, Alert.user_id, Alert.message, Alert.severity, Alert.created_at)
+            .where(Alert.user_id == user_id, Alert.id > after_id)
+            .order_by(Alert.id)
+            .limit(limit)
+        )).all()
+    return [alert_event(*row) for row in rows]
+
+
+class _RecentIds:
+    """Bounded set of the ids a stream has sent, oldest evicted first."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._ids
+
+    def add(self, alert_id: int) -> None:
+        self._ids[alert_id] = None
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+
+
+@router.get("/stream")
+async def stream_alerts(
+    request: Request,
+    token: str = Query(..., description="JWT access token (EventSource cannot send headers)"),
+    last_event_id: Optional[int] = Query(None, description="Fallback for the Last-Event-ID header"),
+):
+    """
+    Push the caller's new alerts as they are written (`event: alert`, the
+    alert JSON as `data`). Reconnecting clients send `Last-Event-ID` (done
+    by EventSource automatically) and first receive everything they missed,
+    paged from the inbox.
+    """
+    async with AsyncSessionLocal() as db:
+        principal = await principal_from_token(token, db)
+    if principal.role not in INBOX_ROLES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Role '{principal.role}' has no alert inbox")
+
+    header_id = request.headers.get("last-event-id")
+    resume_after = int(header_id) if header_id and header_id.isdigit() else last_event_id
+
+    async def events():
+        # Subscribe before reading the backlog so nothing falls in between.
+        # Alerts committed meanwhile arrive both ways; skip ids already sent.
+        # (A high-water mark would instead drop alerts whose transactions
+        # commit out of id order, e.g. from concurrent fan-outs.)
+        page_size = settings.ALERT_STREAM_QUEUE_SIZE
+        sent = _RecentIds(2 * page_size)
+        with alert_broker.subscribe(principal.user_id) as sub:
+            yield "retry: 5000\n\n"
+            after_id = resume_after
+            while after_id is not None:
+                page = await _missed_alerts(principal.user_id, after_id, page_size)
+                for event in page:
+                    sent.add(event["id"])
+                    yield _sse(event)
+                after_id = page[-1]["id"] if len(page) == page_size else None
+            while not await request.is_disconnected():
+                if sub.overflowed and sub.queue.empty():
+                    break  # fell too far behind: the client reconnects and replays
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), settings.ALERT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["id"] in sent:
+                    continue
+                sent.add(event["id"])
+                yield _sse(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+#  FAN-OUT  (one message → many users)
+# ═════════════════════════════════════════════════════════════════════════════
+
+@router.post("/fanout", response_model=AlertFanoutResponse, status_code=status.HTTP_201_CREATED)
+def fanout_alert(
+    payload: AlertFanoutRequest,
+    current_user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db),
+):
+    """Send one alert to a role, a list of users and/or everyone within a radius."""
+    try:
+        audience = AlertAudience(
+            role=payload.role,
+            user_ids=payload.user_ids,
+            lat=payload.lat,
+            lng=payload.lng,
+            radius_km=payload.radius_km,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return fan_out_alert(
+        db, payload.message, audience,
+        severity=payload.severity,
+        dedupe_key=payload.dedupe_key,
+        scope=f"admin:{current_user.id}",
+    )
@@ -0,0 +1,301 @@
+"""
+Live alert stream.
+
+Clients keep one Server-Sent Events connection open (GET /api/alerts/stream)
+instead of polling; an idle stream costs a heartbeat comment every
+ALERT_STREAM_HEARTBEAT_SECONDS and no DB queries.
+
+New alerts are published when the transaction that inserted them commits
+(`publish_alerts` is called by `fan_out_alert` before each batch commit; a
+rollback drops them). With the Postgres relay the events ride on
+`pg_notify` inside that same transaction and every worker's listener thread
+hands them to its in-process broker, so a client connected to any worker
+sees alerts written by the scheduler leader. With the local relay (non-
+Postgres databases, single worker) the broker is fed directly on commit.
+
+The broker is thread-safe: publishers run on request threads, agent threads
+or the listener, and events reach each subscriber's asyncio queue via
+`call_soon_threadsafe`. A subscriber that falls ALERT_STREAM_QUEUE_SIZE
+events behind is disconnected and catches up from `Last-Event-ID` on reconnect.
+
+Usage:
+    with alert_broker.subscribe(user_id) as sub:        # on the event loop
+        event = await sub.queue.get()
+
+    publish_alerts(db, [{"id": 1, "user_id": 7, "message": ..., ...}])
+    db.commit()                                          # → delivered
+
+    listener = build_alert_listener()                    # per worker
+    listener.start()
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import DATABASE_URL, SessionLocal
+from models import Alert
+
+logger = logging.getLogger("alert_stream")
+
+# pg_notify payloads must stay under 8000 bytes
+NOTIFY_PAYLOAD_LIMIT = 7500
+_PENDING_KEY = "pending_alert_events"
+
+
+def alert_event(alert_id: int, user_id: int, message: str, severity: Optional[str], created_at) -> dict:
+    """The JSON shape pushed to clients (same fields as the inbox listing)."""
+    return {
+        "id": alert_id,
+        "user_id": user_id,
+        "message": message,
+        "severity": severity,
+        "seen": False,
+        "created_at": created_at.isoformat() if hasattr(created_at, "isoformat") else created_at,
+    }
+
+
+# ── In-process broker ────────────────────────────────────────────────────────
+class Subscription:
+    """One open stream: a bounded queue owned by the subscriber's event loop."""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _deliver(self, event: dict) -> None:
+        # Runs on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class AlertBroker:
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.ALERT_STREAM_QUEUE_SIZE
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.slow_disconnects = 0
+
+    @contextmanager
+    def subscribe(self, user_id: int):
+        """Register a subscription for `user_id` on the running event loop."""
+        sub = Subscription(user_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(user_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[user_id]
+                if sub.overflowed:
+                    self.slow_disconnects += 1
+
+    def subscribed(self, user_ids: Iterable[int]) -> Set[int]:
+        """The subset of `user_ids` with at least one open stream in this worker."""
+        with self._lock:
+            return {uid for uid in user_ids if uid in self._subscribers}
+
+    def publish(self, events: List[dict]) -> None:
+        """Hand `events` to the subscribers of their user_id. Safe from any thread."""
+        with self._lock:
+            targets = [(sub, e) for e in events for sub in self._subscribers.get(e["user_id"], ())]
+            self.published += len(events)
+            self.delivered += len(targets)
+        for sub, e in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, e)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._subscribers),
+                "streams": sum(len(subs) for subs in self._subscribers.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "slow_disconnects": self.slow_disconnects,
+            }
+
+
+alert_broker = AlertBroker()
+
+
+# ── Publishing (on commit) ───────────────────────────────────────────────────
+def relay_mode() -> str:
+    """postgres = LISTEN/NOTIFY across workers; local = this process only."""
+    mode = settings.ALERT_STREAM_RELAY
+    if mode in ("postgres", "local"):
+        return mode
+    return "postgres" if make_url(DATABASE_URL).get_backend_name() == "postgresql" else "local"
+
+
+def _notify_payloads(events: List[dict]) -> List[str]:
+    """
+    Pack events into pg_notify payloads under the size limit. Events sharing
+    a message (one fan-out batch) carry it once, followed by [id, user_id]
+    pairs; a message too long to fit is left out and read back by id.
+    """
+    groups: Dict[tuple, List[list]] = defaultdict(list)
+    for e in events:
+        groups[(e["message"], e["severity"], e["created_at"])].append([e["id"], e["user_id"]])
+
+    payloads = []
+    for (message, severity, created_at), targets in groups.items():
+        header = {"m": message, "s": severity, "t": created_at}
+        if len(json.dumps(header).encode()) > NOTIFY_PAYLOAD_LIMIT // 2:
+            header["m"] = None
+        budget = NOTIFY_PAYLOAD_LIMIT - len(json.dumps({**header, "a": []}).encode())
+        chunk, size = [], 0
+        for pair in targets:
+            pair_size = len(json.dumps(pair)) + 1
+            if chunk and size + pair_size > budget:
+                payloads.append(json.dumps({**header, "a": chunk}))
+                chunk, size = [], 0
+            chunk.append(pair)
+            size += pair_size
+        if chunk:
+            payloads.append(json.dumps({**header, "a": chunk}))
+    return payloads
+
+
+def publish_alerts(db: Session, events: List[dict]) -> None:
+    """Queue `events` for the live stream; they go out when `db` commits."""
+    if not events:
+        return
+    if relay_mode() == "postgres" and db.get_bind().dialect.name == "postgresql":
+        for payload in _notify_payloads(events):
+            db.execute(select(func.pg_notify(settings.ALERT_STREAM_CHANNEL, payload)))
+    else:
+        db.info.setdefault(_PENDING_KEY, []).extend(events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    events = session.info.pop(_PENDING_KEY, None)
+    if events:
+        alert_broker.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ── Cross-worker relay (Postgres LISTEN) ─────────────────────────────────────
+class AlertListener:
+    """LISTENs on the alert channel on a dedicated connection and feeds `alert_broker`."""
+
+    def __init__(self, url: str, channel: str):
+        self.conninfo = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.connected = False
+        self.notifications = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="alert-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        import psycopg
+        from psycopg import sql
+
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.conninfo, autocommit=True, sslmode="require") as conn:
+                    conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                    self.connected, self.last_error, backoff = True, None, 1.0
+                    logger.info(f"📡 Listening for alerts on '{self.channel}'")
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self.notifications += 1
+                            self._handle(notify.payload)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Alert listener disconnected: {e}; retrying in {backoff:.0f}s")
+            self.connected = False
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed alert notification")
+            return
+        local = alert_broker.subscribed(uid for _, uid in data["a"])
+        if not local:
+            return
+        targets = [(alert_id, uid) for alert_id, uid in data["a"] if uid in local]
+        if data.get("m") is not None:
+            events = [alert_event(alert_id, uid, data["m"], data.get("s"), data.get("t")) for alert_id, uid in targets]
+        else:
+            events = self._load(alert_id for alert_id, _ in targets)
+        alert_broker.publish(events)
+
+    @staticmethod
+    def _load(alert_ids: Iterable[int]) -> List[dict]:
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Alert.id, Alert.user_id, Alert.message, Alert.severity, Alert.created_at)
+                .where(Alert.id.in_(list(alert_ids)))
+            ).all()
+            return [alert_event(*row) for row in rows]
+        finally:
+            db.close()
+
+    def status(self) -> dict:
+        return {
+            "relay": "postgres",
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "last_error": self.last_error,
+        }
+
+
+class LocalRelay:
+    """ALERT_STREAM_RELAY=local: events are published in-process on commit."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def status(self) -> dict:
+        return {"relay": "local"}
+
+
+def build_alert_listener():
+    if relay_mode() == "postgres":
+        return AlertListener(DATABASE_URL, settings.ALERT_STREAM_CHANNEL)
+    return LocalRelay()
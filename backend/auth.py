@@ -4,6 +4,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from config import settings
 
 load_dotenv()
 
@@ -11,7 +12,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min/max rounds to the configured cost makes `verify_and_update`
+# hand back a fresh hash whenever a stored hash was made at another cost.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -44,16 +53,19 @@ def verify_token(token: str) -> Optional[dict]:
 # ── FastAPI dependencies ────────────────────────────────────────────────────
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from dataclasses import dataclass
+from cache import TTLCache
+from database import get_db, get_async_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login", auto_error=False)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Decode JWT and return the authenticated User row."""
-    from models import User  # local import to avoid circular dependency
-
+def _user_id_from_token(token: str) -> int:
+    """Decode the JWT and return its user_id claim, or raise 401."""
     payload = verify_token(token)
     if payload is None:
         raise HTTPException(
@@ -64,13 +76,126 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user_id: int = payload.get("user_id")
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
+    return user_id
 
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """Decode JWT and return the authenticated User row."""
+    from models import User  # local import to avoid circular dependency
+
+    user_id = _user_id_from_token(token)
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+# ── Principal cache ─────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class Principal:
+    """Who is calling: enough to authorise and scope a request without the User row."""
+    user_id: int
+    username: str
+    role: str
+    profile_id: Optional[int]  # Farmer / MandiOwner / Retailer id for the role, if any
+
+
+_principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+async def _load_principal(user_id: int, db: AsyncSession) -> Optional[Principal]:
+    """Fetch the user and its role profile id in a single query."""
+    from models import User, Farmer, MandiOwner, Retailer  # local import to avoid circular dependency
+
+    result = await db.execute(
+        select(
+            User.id, User.username, User.role,
+            Farmer.id.label("farmer_id"),
+            MandiOwner.id.label("mandi_owner_id"),
+            Retailer.id.label("retailer_id"),
+        )
+        .outerjoin(Farmer, Farmer.user_id == User.id)
+        .outerjoin(MandiOwner, MandiOwner.user_id == User.id)
+        .outerjoin(Retailer, Retailer.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    profile_id = {
+        "farmer": row.farmer_id,
+        "mandi_owner": row.mandi_owner_id,
+        "retailer": row.retailer_id,
+    }.get(row.role)
+    return Principal(user_id=row.id, username=row.username, role=row.role, profile_id=profile_id)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drop a cached principal, e.g. after the user's profile changes."""
+    _principal_cache.invalidate(user_id)
+
+
+def principal_cache_stats() -> dict:
+    return _principal_cache.stats()
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """
+    Decode the JWT and return the cached Principal for it.
+
+    A cache hit costs no DB round-trip (the session is never used, so no
+    connection is checked out); a miss costs one joined query.
+    """
+    return await principal_from_token(token, db)
+
+
+async def principal_from_token(token: str, db: AsyncSession) -> Principal:
+    """Resolve a raw JWT to its cached Principal (for routes that can't use the bearer header)."""
+    user_id = _user_id_from_token(token)
+    principal = _principal_cache.get(user_id)
+    if principal is None:
+        principal = await _load_principal(user_id, db)
+        if principal is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        # invalidate_principal only reaches this process, so a principal
+        # without a profile yet is never cached: the worker that serves the
+        # request after /setup must see the new profile immediately.
+        if principal.profile_id is not None:
+            _principal_cache.set(user_id, principal)
+    return principal
+
+
+async def get_optional_principal(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> Optional[Principal]:
+    """The caller's Principal, or None for anonymous / invalid-token requests."""
+    if not token:
+        return None
+    try:
+        return await principal_from_token(token, db)
+    except HTTPException:
+        return None
+
+
+def require_principal(*roles: str):
+    """Like `require_role`, but yields a cached Principal instead of the User row."""
+    async def role_checker(principal: Principal = Depends(get_current_principal)):
+        if principal.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Role '{principal.role}' is not allowed. Required: {', '.join(roles)}",
+            )
+        return principal
+    return role_checker
+
+
 def require_role(*roles: str):
     """Factory that returns a dependency ensuring the user has one of the given roles."""
     def role_checker(current_user=Depends(get_current_user)):
@@ -0,0 +1,37 @@
+"""
+Rebuild the mandi daily supply rollup from the order tables.
+
+Run once after the `mandi_daily_rollup` migration, and after any bulk or raw
+SQL change to orders (those bypass the ORM listeners that keep the rollup
+current).
+
+Usage:
+    python backfill_supply_rollup.py                      # every day
+    python backfill_supply_rollup.py --since 2026-01-01   # only days from this date
+"""
+
+import argparse
+from datetime import date
+
+from database import SessionLocal
+from mandi.rollup import rebuild_rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--since", type=date.fromisoformat, help="rebuild only days on/after YYYY-MM-DD")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        summary = rebuild_rollup(db, since=args.since)
+    finally:
+        db.close()
+    print(
+        f"✅ {summary['rows']} rollup rows from {summary['orders']} orders "
+        f"({summary['unattributed']} not at any mandi location)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Backtest the price forecasters and sell-timing advice on historical orders.
+
+Replays farmer → mandi order prices with rolling origins (crops in parallel)
+and prints MAPE / interval coverage per crop and horizon day, plus how the
+sell-timing advice would have done. Thresholds make it a CI gate: the exit
+status is 1 if the gated model misses any of them.
+
+Usage:
+    python backtest_forecasts.py                                   # stored synthetic dataset
+    python backtest_forecasts.py --db --since 2025-06-01           # real orders (DATABASE_URL)
+    python backtest_forecasts.py --max-mape 0.08 --min-coverage 0.7 --json report.json
+    python backtest_forecasts.py --write-synthetic mandi/data/synthetic_orders.csv
+"""
+
+import argparse
+import json
+import sys
+from datetime import date
+
+from mandi.backtest import (
+    FORECASTERS, SYNTHETIC_ORDERS_CSV, orders_from_csv, orders_from_db, run_backtest,
+    synthetic_orders, write_orders_csv,
+)
+
+
+def _fmt(value, pct=True):
+    if value is None:
+        return "    —"
+    return f"{value * 100:5.1f}" if pct else f"{value:5.2f}"
+
+
+def print_report(report: dict) -> None:
+    cfg = report["config"]
+    print(f"=== {cfg['orders']} orders, {cfg['crops']} crops, horizon {cfg['horizon']}d, "
+          f"{cfg['coverage']:.0%} intervals, origins from day {cfg['min_train']} every {cfg['step']}d ===")
+    horizon_cols = " ".join(f"  h{h + 1:<3}" for h in range(cfg["horizon"]))
+    for name, result in report["models"].items():
+        overall = result["overall"]
+        print(f"\n── {name} ── MAPE % by horizon day (coverage % below)")
+        print(f"{'crop':<14} {horizon_cols}   mean")
+        rows = sorted(result["crops"].items()) + [("ALL", overall)]
+        for crop, summary in rows:
+            print(f"{crop:<14} " + " ".join(f"{_fmt(v):>6}" for v in summary["mape"]) + f"  {_fmt(summary['mean_mape'])}")
+            if summary["coverage"] is not None:
+                print(f"{'  coverage':<14} " + " ".join(f"{_fmt(v):>6}" for v in summary["coverage"])
+                      + f"  {_fmt(summary['mean_coverage'])}")
+        sell = overall["sell_timing"]
+        print(f"Sell timing: {sell['decisions']} decisions, waits {_fmt(sell['wait_rate'])}%, "
+              f"waits that paid off {_fmt(sell['wait_win_rate'])}%, mean uplift vs selling at once {_fmt(sell['mean_uplift'])}%")
+
+
+def check_thresholds(report: dict, model: str, max_mape, min_coverage, min_uplift) -> list:
+    """Threshold violations of `model`: per-crop mean MAPE, overall coverage and sell-timing uplift."""
+    result = report["models"][model]
+    failures = []
+    if max_mape is not None:
+        for crop, summary in sorted(result["crops"].items()):
+            if summary["mean_mape"] is not None and summary["mean_mape"] > max_mape:
+                failures.append(f"{model} MAPE on {crop}: {summary['mean_mape']:.2%} > {max_mape:.2%}")
+    overall = result["overall"]
+    if min_coverage is not None:
+        if overall["mean_coverage"] is None:
+            failures.append(f"{model} has no prediction intervals to check coverage on")
+        elif overall["mean_coverage"] < min_coverage:
+            failures.append(f"{model} interval coverage {overall['mean_coverage']:.2%} < {min_coverage:.2%}")
+    uplift = overall["sell_timing"]["mean_uplift"]
+    if min_uplift is not None and uplift is not None and uplift < min_uplift:
+        failures.append(f"{model} sell-timing mean uplift {uplift:.3%} < {min_uplift:.3%}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--csv", default=SYNTHETIC_ORDERS_CSV, help="orders CSV (default: stored synthetic dataset)")
+    source.add_argument("--db", action="store_true", help="read mandi_farmer_orders from DATABASE_URL")
+    parser.add_argument("--since", type=date.fromisoformat, help="with --db: only orders on/after YYYY-MM-DD")
+    parser.add_argument("--models", default=",".join(FORECASTERS), help=f"comma-separated, from {', '.join(FORECASTERS)}")
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--coverage", type=float, default=0.8)
+    parser.add_argument("--min-train", type=int, default=28, help="days of history before the first origin")
+    parser.add_argument("--step", type=int, default=1, help="days between origins")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count; 1 = in-process)")
+    parser.add_argument("--gate-model", default="holt_damped", help="model the thresholds apply to")
+    parser.add_argument("--max-mape", type=float, help="fail if any crop's mean MAPE exceeds this (0.08 = 8%%)")
+    parser.add_argument("--min-coverage", type=float, help="fail if overall interval coverage is below this")
+    parser.add_argument("--min-uplift", type=float, help="fail if sell-timing mean uplift is below this")
+    parser.add_argument("--json", help="also write the full report here")
+    parser.add_argument("--write-synthetic", metavar="PATH", help="generate the synthetic dataset to PATH and exit")
+    args = parser.parse_args()
+
+    if args.write_synthetic:
+        orders = synthetic_orders()
+        write_orders_csv(args.write_synthetic, orders)
+        print(f"✅ {len(orders)} synthetic orders written to {args.write_synthetic}")
+        return
+
+    if args.db:
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            orders = orders_from_db(db, since=args.since)
+        finally:
+            db.close()
+    else:
+        orders = orders_from_csv(args.csv)
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    if args.gate_model not in models:
+        models.append(args.gate_model)
+    report = run_backtest(
+        orders, models=models, horizon=args.horizon, coverage=args.coverage,
+        min_train=args.min_train, step=args.step, workers=args.workers,
+    )
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = check_thresholds(report, args.gate_model, args.max_mape, args.min_coverage, args.min_uplift)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    if any(v is not None for v in (args.max_mape, args.min_coverage, args.min_uplift)):
+        print(f"✅ {args.gate_model} within thresholds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Agent run benchmark — runs each agent once with tool discovery (the LLM
+fetches DB data through tools) and once with the precomputed context block,
+then prints wall time, LLM turns, tool calls and DB sessions side by side.
+
+Calls Groq and Tavily for real and saves the alerts the agents generate, so
+point it at a dev database.
+
+Usage:
+    python bench_agents.py                          # mandi + farmer agents
+    python bench_agents.py --retailer-id 12         # also one retailer's demand run
+    python bench_agents.py --agents mandi
+"""
+
+import argparse
+
+from agent_context import agent_run_stats
+from farmer.agent import run_farmer_agent
+from mandi.agent import run_mandi_agent
+from retailer.agent import run_demand_agent
+
+COLUMNS = ("wall_s", "llm_turns", "tool_calls", "db_sessions")
+
+
+def run_both(name: str, run):
+    rows = {}
+    for precompute in (False, True):
+        mode = "precomputed" if precompute else "tool_discovery"
+        print(f"▶ {name}: {mode} ...")
+        try:
+            run(precompute)
+        except Exception as e:
+            print(f"❌ {name} ({mode}) failed: {e}")
+            continue
+        rows[mode] = agent_run_stats()[name]
+    return rows
+
+
+def print_table(name: str, rows: dict):
+    print(f"\n── {name} ──")
+    print(f"{'mode':<16}" + "".join(f"{c:>13}" for c in COLUMNS))
+    for mode, stats in rows.items():
+        print(f"{mode:<16}" + "".join(f"{stats[c]:>13}" for c in COLUMNS))
+    if len(rows) == 2:
+        before, after = rows["tool_discovery"], rows["precomputed"]
+        print(f"tool calls by name before: {before['tool_calls_by_name']}")
+        print(f"tool calls by name after:  {after['tool_calls_by_name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--agents", nargs="+", default=["mandi", "farmer"], choices=["mandi", "farmer", "retailer"])
+    parser.add_argument("--retailer-id", type=int, help="retailer user_id for the demand agent run")
+    args = parser.parse_args()
+
+    agents = list(args.agents)
+    if args.retailer_id and "retailer" not in agents:
+        agents.append("retailer")
+
+    runners = {
+        "mandi": lambda p: run_mandi_agent(precompute=p),
+        "farmer": lambda p: run_farmer_agent(precompute=p),
+        "retailer": lambda p: run_demand_agent(target_user_id=args.retailer_id, precompute=p),
+    }
+    results = {}
+    for name in agents:
+        if name == "retailer" and not args.retailer_id:
+            print("⚠️  skipping retailer: pass --retailer-id")
+            continue
+        results[name] = run_both(name, runners[name])
+
+    for name, rows in results.items():
+        print_table(name, rows)
+
+
+if __name__ == "__main__":
+    main()
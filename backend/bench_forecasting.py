@@ -0,0 +1,102 @@
+"""
+Price forecasting benchmark — fits damped-trend Holt on a synthetic
+(crops × mandis) price matrix with the vectorized batch engine and with a
+per-series pure Python loop (the same grid search), and checks they agree.
+
+Usage:
+    python bench_forecasting.py                          # 10000 series, 60 days, 7-day horizon
+    python bench_forecasting.py --series 50000 --days 90 --missing 0.3
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from mandi.forecasting import ALPHAS, BETAS, PHIS, fit_holt_damped, forecast_holt_damped
+
+
+def synthetic_prices(n_series: int, n_days: int, missing: float, rng: np.random.Generator) -> np.ndarray:
+    """Random-walk prices with drift around ₹20–60/kg; `missing` share of days have no orders."""
+    base = rng.uniform(20, 60, size=(n_series, 1))
+    drift = rng.normal(0, 0.15, size=(n_series, 1))
+    noise = rng.normal(0, 1.0, size=(n_series, n_days)) * base * 0.03
+    prices = np.maximum(1.0, base + drift * np.arange(n_days) + np.cumsum(noise, axis=1))
+    prices[rng.random((n_series, n_days)) < missing] = np.nan
+    prices[:, 0] = base[:, 0]   # every series has at least one observation
+    return prices
+
+
+def python_holt(series) -> tuple:
+    """One series, scalar loop over the same (alpha, beta, phi) grid; returns (level, trend)."""
+    best = None
+    first = next(y for y in series if not math.isnan(y))
+    for alpha in ALPHAS:
+        for beta in BETAS:
+            for phi in PHIS:
+                level, trend, sse, started = first, 0.0, 0.0, False
+                for y in series:
+                    predicted = level + phi * trend
+                    if math.isnan(y):
+                        level, trend = predicted, phi * trend
+                    elif not started:
+                        level, started = first, True
+                        trend = phi * trend
+                    else:
+                        e = y - predicted
+                        level, trend = predicted + alpha * e, phi * trend + beta * e
+                        sse += e * e
+                if best is None or sse < best[0]:
+                    best = (sse, level, trend)
+    return best[1], best[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--series", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--horizon", type=int, default=7)
+    parser.add_argument("--missing", type=float, default=0.2)
+    parser.add_argument("--loop-sample", type=int, default=500, help="series timed with the Python loop")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    prices = synthetic_prices(args.series, args.days, args.missing, rng)
+    grid = len(ALPHAS) * len(BETAS) * len(PHIS)
+    print(f"=== {args.series} series × {args.days} days, {args.missing:.0%} missing, {grid} parameter sets ===")
+
+    start = time.perf_counter()
+    fit = fit_holt_damped(prices)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    mean, lower, upper = forecast_holt_damped(fit, args.horizon)
+    forecast_time = time.perf_counter() - start
+    total = fit_time + forecast_time
+    print(f"\n── Batch engine ──")
+    print(f"Fit:      {fit_time * 1000:9.1f} ms")
+    print(f"Forecast: {forecast_time * 1000:9.1f} ms   ({args.horizon}-day horizon with 80% intervals)")
+    print(f"Throughput: {args.series / total:,.0f} series/s")
+
+    sample = min(args.loop_sample, args.series)
+    start = time.perf_counter()
+    reference = [python_holt(prices[i].tolist()) for i in range(sample)]
+    loop_time = time.perf_counter() - start
+    per_series = loop_time / sample
+    print(f"\n── Python loop ({sample} series timed) ──")
+    print(f"Per series: {per_series * 1e3:.2f} ms → ~{per_series * args.series:.1f} s for {args.series} series "
+          f"({per_series * args.series / total:.0f}x slower)")
+
+    mismatches = sum(
+        1 for i, (level, trend) in enumerate(reference)
+        if not (math.isclose(level, fit.level[i], rel_tol=1e-9, abs_tol=1e-9)
+                and math.isclose(trend, fit.trend[i], rel_tol=1e-9, abs_tol=1e-9))
+    )
+    inside = np.mean((lower <= mean) & (mean <= upper))
+    print(f"{'✅' if mismatches == 0 else '❌'} fit mismatches vs loop: {mismatches}/{sample}")
+    print(f"{'✅' if inside == 1 else '❌'} forecasts inside their intervals: {inside:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Login throughput benchmark — fires concurrent /api/login calls and reports
+logins/sec, latency percentiles and how many were shed with 429.
+
+Usage (server running on port 8001):
+    python bench_login.py                      # 500 logins, 32 concurrent
+    python bench_login.py --total 2000 --concurrency 64
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://localhost:8001"
+USERNAME = "bench_login_user"
+PASSWORD = "bench-password-123"
+
+
+def ensure_user():
+    resp = requests.post(f"{BASE_URL}/api/register", json={
+        "username": USERNAME,
+        "password": PASSWORD,
+        "role": "farmer",
+    })
+    if resp.status_code not in (201, 400):
+        raise SystemExit(f"❌ Could not create bench user: {resp.status_code} {resp.text}")
+
+
+def one_login(session: requests.Session):
+    start = time.perf_counter()
+    resp = session.post(f"{BASE_URL}/api/login", json={"username": USERNAME, "password": PASSWORD})
+    return resp.status_code, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--total", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    ensure_user()
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+
+    print(f"=== {args.total} logins, {args.concurrency} concurrent ===")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: one_login(session), range(args.total)))
+    wall = time.perf_counter() - started
+
+    ok = [lat for code, lat in results if code == 200]
+    shed = sum(1 for code, _ in results if code == 429)
+    other = len(results) - len(ok) - shed
+
+    print(f"✅ succeeded: {len(ok)}   ⏳ shed (429): {shed}   ❌ other: {other}")
+    print(f"Wall time: {wall:.2f}s   Throughput: {len(ok) / wall:.1f} logins/sec")
+    if ok:
+        ok.sort()
+        p95 = ok[min(len(ok) - 1, int(len(ok) * 0.95))]
+        print(f"Latency p50: {statistics.median(ok) * 1000:.0f}ms   p95: {p95 * 1000:.0f}ms")
+
+    metrics = requests.get(f"{BASE_URL}/api/metrics").json()
+    print(f"Server hashing stats: {metrics['auth']['hashing']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Nearest-mandi lookup benchmark — compares the old per-request scan (pure
+Python haversine over every mandi, then a full sort) against the grid
+`SpatialIndex` on a synthetic APMC-sized registry.
+
+Usage:
+    python bench_mandi_lookup.py                       # 7000 mandis, 2000 queries, k=5
+    python bench_mandi_lookup.py --mandis 20000 --k 20 --radius 50
+"""
+
+import argparse
+import random
+import time
+
+from geo import SpatialIndex, haversine_distance
+
+# Rough bounding box of mainland India
+LAT_RANGE = (8.0, 35.0)
+LNG_RANGE = (68.0, 97.0)
+
+
+def synthetic_mandis(n: int, rng: random.Random):
+    return [
+        {"id": i, "name": f"Mandi {i}", "lat": rng.uniform(*LAT_RANGE), "lng": rng.uniform(*LNG_RANGE)}
+        for i in range(n)
+    ]
+
+
+def linear_nearest(mandis, lat, lng, k):
+    ranked = sorted(((m, haversine_distance(lat, lng, m["lat"], m["lng"])) for m in mandis), key=lambda x: x[1])
+    return ranked[:k]
+
+
+def linear_within(mandis, lat, lng, radius_km):
+    ranked = sorted(((m, haversine_distance(lat, lng, m["lat"], m["lng"])) for m in mandis), key=lambda x: x[1])
+    return [(m, d) for m, d in ranked if d <= radius_km]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(lat, lng) for lat, lng in queries]
+    return results, time.perf_counter() - start
+
+
+def report(label, linear, indexed, n_queries):
+    (lin_results, lin_time), (idx_results, idx_time) = linear, indexed
+    mismatches = sum(
+        1 for a, b in zip(lin_results, idx_results)
+        if [m["id"] for m, _ in a] != [m["id"] for m, _ in b]
+    )
+    print(f"\n── {label} ──")
+    print(f"Linear scan:   {lin_time / n_queries * 1e6:9.1f} µs/query")
+    print(f"Spatial index: {idx_time / n_queries * 1e6:9.1f} µs/query   ({lin_time / idx_time:.1f}x faster)")
+    print(f"{'✅' if mismatches == 0 else '❌'} result mismatches: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--mandis", type=int, default=7000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--radius", type=float, default=50.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mandis = synthetic_mandis(args.mandis, rng)
+    queries = [(rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for _ in range(args.queries)]
+
+    print(f"=== {args.mandis} mandis, {args.queries} queries ===")
+    start = time.perf_counter()
+    index = SpatialIndex(mandis)
+    print(f"Index build: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    report(
+        f"k-nearest (k={args.k})",
+        timed(lambda lat, lng: linear_nearest(mandis, lat, lng, args.k), queries),
+        timed(lambda lat, lng: index.nearest(lat, lng, args.k), queries),
+        args.queries,
+    )
+    report(
+        f"radius ({args.radius:g} km)",
+        timed(lambda lat, lng: linear_within(mandis, lat, lng, args.radius), queries),
+        timed(lambda lat, lng: index.within(lat, lng, args.radius), queries),
+        args.queries,
+    )
+
+
+if __name__ == "__main__":
+    main()
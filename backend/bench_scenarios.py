@@ -0,0 +1,54 @@
+"""
+Monte-Carlo scenario benchmark — latency (p50/p95) of the stochastic what-if
+mode, single scenario and parameter sweeps, including JSON serialisation.
+
+Usage:
+    python bench_scenarios.py                            # 10000 samples, 50 runs per case
+    python bench_scenarios.py --samples 50000 --runs 20
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from mandi.supply_chain import run_scenario_monte_carlo
+
+CASES = {
+    "single scenario": None,
+    "sweep 4 × 3 (12 cells)": {"rain_days": [0, 1, 2, 4], "demand_surge_pct": [0, 20, 40]},
+    "sweep 5 × 4 × 5 (100 cells)": {
+        "rain_days": [0, 1, 2, 3, 5],
+        "demand_surge_pct": [0, 15, 30, 50],
+        "transport_delay_pct": [0, 25, 50, 75, 100],
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="p95 target for the single scenario")
+    args = parser.parse_args()
+
+    print(f"=== {args.samples} samples, {args.runs} runs per case ===")
+    single_p95 = None
+    for label, sweep in CASES.items():
+        timings = []
+        for run in range(args.runs):
+            start = time.perf_counter()
+            result = run_scenario_monte_carlo(2, 20, 30, samples=args.samples, sweep=sweep, seed=run)
+            json.dumps(result)
+            timings.append((time.perf_counter() - start) * 1000)
+        p50, p95 = np.percentile(timings, [50, 95])
+        single_p95 = single_p95 if single_p95 is not None else p95
+        cells = 1 if sweep is None else int(np.prod([len(v) for v in sweep.values()]))
+        print(f"{label:<30} p50 {p50:7.1f} ms   p95 {p95:7.1f} ms   ({cells * args.samples / (p50 / 1000):,.0f} draws/s)")
+
+    print(f"{'✅' if single_p95 <= args.budget_ms else '❌'} single-scenario p95 {single_p95:.1f} ms (budget {args.budget_ms:g} ms)")
+
+
+if __name__ == "__main__":
+    main()
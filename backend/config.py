@@ -7,6 +7,7 @@ Usage:
 """
 
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,21 +16,126 @@ load_dotenv()
 class Settings:
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
 
     # Auth
     SECRET_KEY: str = os.getenv("secret_key", "changeme")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+    # Password hashing (bcrypt cost and its dedicated worker pool)
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    HASH_QUEUE_SIZE: int = int(os.getenv("HASH_QUEUE_SIZE", "64"))
 
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
     TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "")
     TO_PHONE_NUMBER: str = os.getenv("TO_PHONE_NUMBER", "")
+    # SMS/call dispatch: in-process fake client, shared quota, pool and retries
+    TWILIO_FAKE: bool = os.getenv("TWILIO_FAKE", "false").lower() in ("1", "true", "yes")
+    TWILIO_FAKE_LATENCY_SECONDS: float = float(os.getenv("TWILIO_FAKE_LATENCY_SECONDS", "0.2"))
+    TWILIO_REQUESTS_PER_MINUTE: float = float(os.getenv("TWILIO_REQUESTS_PER_MINUTE", "60"))
+    TWILIO_DISPATCH_WORKERS: int = int(os.getenv("TWILIO_DISPATCH_WORKERS", "8"))
+    TWILIO_RETRIES: int = int(os.getenv("TWILIO_RETRIES", "3"))
+    TWILIO_RETRY_BASE_DELAY: float = float(os.getenv("TWILIO_RETRY_BASE_DELAY", "0.5"))
+    TWILIO_RETRY_MAX_DELAY: float = float(os.getenv("TWILIO_RETRY_MAX_DELAY", "8"))
+    # Durable notification outbox drained by a worker in every process
+    OUTBOX_WORKER_ENABLED: bool = os.getenv("OUTBOX_WORKER_ENABLED", "true").lower() in ("1", "true", "yes")
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_SECONDS: float = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+    OUTBOX_LEASE_SECONDS: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+    OUTBOX_RETRY_BASE_SECONDS: float = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+    OUTBOX_RETRY_MAX_SECONDS: float = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "1800"))
 
     # LLM & Search
     GROQ_API_KEY: str = os.getenv("GROQ", "")
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "") or os.getenv("TAVILY", "")
 
+    # Shared upstream HTTP clients (Groq, Tavily)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_RETRIES: int = int(os.getenv("HTTP_RETRIES", "2"))
+    HTTP_RETRY_BASE_DELAY: float = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.25"))
+    HTTP_RETRY_MAX_DELAY: float = float(os.getenv("HTTP_RETRY_MAX_DELAY", "4"))
+
+    # /api/farmer/analyze fan-out deadlines (seconds per branch)
+    ANALYZE_WEATHER_DEADLINE: float = float(os.getenv("ANALYZE_WEATHER_DEADLINE", "8"))
+    ANALYZE_MARKET_DEADLINE: float = float(os.getenv("ANALYZE_MARKET_DEADLINE", "8"))
+
+    # Groq response cache for parse_voice_command / ask_farming_question
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+    LLM_CACHE_TTL_PARSE: float = float(os.getenv("LLM_CACHE_TTL_PARSE", "86400"))
+    LLM_CACHE_TTL_ASK: float = float(os.getenv("LLM_CACHE_TTL_ASK", "21600"))
+    LLM_CACHE_SIMILARITY: float = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))  # 0 = exact match only
+    LLM_CACHE_SCAN_LIMIT: int = int(os.getenv("LLM_CACHE_SCAN_LIMIT", "500"))
+
+    # Tavily weather cache, bucketed by geohash cell
+    WEATHER_GEOHASH_PRECISION: int = int(os.getenv("WEATHER_GEOHASH_PRECISION", "5"))
+    WEATHER_CACHE_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "10800"))
+    WEATHER_CACHE_SIZE: int = int(os.getenv("WEATHER_CACHE_SIZE", "20000"))
+
+    # Supply-chain dashboard response cache (ETag / 304); order-based responses expire sooner
+    DASHBOARD_CACHE_SIZE: int = int(os.getenv("DASHBOARD_CACHE_SIZE", "2000"))
+    DASHBOARD_CACHE_ORDERS_TTL_SECONDS: float = float(os.getenv("DASHBOARD_CACHE_ORDERS_TTL_SECONDS", "60"))
+
+    # Price forecasts (damped-trend Holt): order history window and prediction-interval coverage
+    FORECAST_HISTORY_DAYS: int = int(os.getenv("FORECAST_HISTORY_DAYS", "60"))
+    FORECAST_INTERVAL_COVERAGE: float = float(os.getenv("FORECAST_INTERVAL_COVERAGE", "0.8"))
+
+    # Monte-Carlo what-if scenarios (POST /supply-chain/scenario, mode=monte_carlo)
+    SCENARIO_MAX_SAMPLES: int = int(os.getenv("SCENARIO_MAX_SAMPLES", "50000"))
+    SCENARIO_MAX_SWEEP_CELLS: int = int(os.getenv("SCENARIO_MAX_SWEEP_CELLS", "100"))
+    SCENARIO_MAX_DRAWS: int = int(os.getenv("SCENARIO_MAX_DRAWS", "1000000"))
+
+    # Upstream quotas shared by every agent run (requests per minute, 0 = unlimited)
+    GROQ_REQUESTS_PER_MINUTE: float = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "300"))
+    TAVILY_REQUESTS_PER_MINUTE: float = float(os.getenv("TAVILY_REQUESTS_PER_MINUTE", "100"))
+
+    # Agents get their DB aggregates precomputed in one pass (false = discover via tools)
+    AGENT_PRECOMPUTE_CONTEXT: bool = os.getenv("AGENT_PRECOMPUTE_CONTEXT", "true").lower() in ("1", "true", "yes")
+
+    # Demand agent fleet run (all retailers)
+    DEMAND_AGENT_CONCURRENCY: int = int(os.getenv("DEMAND_AGENT_CONCURRENCY", "8"))
+    DEMAND_AGENT_TIMEOUT_SECONDS: float = float(os.getenv("DEMAND_AGENT_TIMEOUT_SECONDS", "120"))
+
+    # Agent schedules (crontab, UTC) and how late a missed run may still start
+    DEMAND_AGENT_CRON: str = os.getenv("DEMAND_AGENT_CRON", "0 6 * * *")
+    MANDI_AGENT_CRON: str = os.getenv("MANDI_AGENT_CRON", "0 6 * * *")
+    FARMER_AGENT_CRON: str = os.getenv("FARMER_AGENT_CRON", "0 6 * * *")
+    DEMAND_AGENT_MISFIRE_GRACE_SECONDS: int = int(os.getenv("DEMAND_AGENT_MISFIRE_GRACE_SECONDS", "3600"))
+    MANDI_AGENT_MISFIRE_GRACE_SECONDS: int = int(os.getenv("MANDI_AGENT_MISFIRE_GRACE_SECONDS", "3600"))
+    FARMER_AGENT_MISFIRE_GRACE_SECONDS: int = int(os.getenv("FARMER_AGENT_MISFIRE_GRACE_SECONDS", "3600"))
+    AGENT_SCHEDULER_WORKERS: int = int(os.getenv("AGENT_SCHEDULER_WORKERS", "3"))
+
+    # Manually triggered agent runs (POST /api/agent/*/run → 202 + job id)
+    AGENT_RUN_WORKERS: int = int(os.getenv("AGENT_RUN_WORKERS", "2"))
+    AGENT_RUN_HISTORY: int = int(os.getenv("AGENT_RUN_HISTORY", "200"))
+    AGENT_RUN_TIMEOUT_SECONDS: int = int(os.getenv("AGENT_RUN_TIMEOUT_SECONDS", "7200"))   # then a run left active is failed
+
+    # Only the elected worker runs the scheduler: auto | postgres | file | off
+    LEADER_ELECTION: str = os.getenv("LEADER_ELECTION", "auto").lower()
+    LEADER_POLL_SECONDS: float = float(os.getenv("LEADER_POLL_SECONDS", "10"))
+    LEADER_LOCK_KEY: int = int(os.getenv("LEADER_LOCK_KEY", "815462001"))
+    LEADER_LOCK_FILE: str = os.getenv(
+        "LEADER_LOCK_FILE", os.path.join(tempfile.gettempdir(), "supply-chain-scheduler.lock")
+    )
+
+    # Live alert stream (GET /api/alerts/stream); relay: auto | postgres | local
+    ALERT_STREAM_RELAY: str = os.getenv("ALERT_STREAM_RELAY", "auto").lower()
+    ALERT_STREAM_CHANNEL: str = os.getenv("ALERT_STREAM_CHANNEL", "alert_events")
+    ALERT_STREAM_HEARTBEAT_SECONDS: float = float(os.getenv("ALERT_STREAM_HEARTBEAT_SECONDS", "15"))
+    ALERT_STREAM_QUEUE_SIZE: int = int(os.getenv("ALERT_STREAM_QUEUE_SIZE", "100"))
+
 
 settings = Settings()
@@ -1,20 +1,132 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, exc as sa_exc
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from config import settings
+
+DATABASE_URL = settings.DATABASE_URL
+
+
+# ── Pool telemetry ──────────────────────────────────────────────────────────
+class PoolTelemetry:
+    """Checkout latency / wait counters for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float, waited: bool, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self, pool) -> dict:
+        """Counters plus live gauges read off `pool`."""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "avg_checkout_ms": round(self.total_wait_seconds / attempts * 1000, 2) if attempts else 0.0,
+                "max_checkout_ms": round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+class InstrumentedPoolMixin:
+    """Times every checkout and counts the ones that found the pool exhausted."""
+
+    telemetry: PoolTelemetry
+
+    def _do_get(self):
+        # Every slot (pool + overflow) taken means this checkout has to queue.
+        saturated = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sa_exc.TimeoutError:
+            self.telemetry.record(time.perf_counter() - start, waited=True, timed_out=True)
+            raise
+        self.telemetry.record(time.perf_counter() - start, waited=saturated)
+        return conn
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    telemetry = PoolTelemetry()
+
 
-load_dotenv()
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    telemetry = PoolTelemetry()
+
+
+def _async_url(url: str):
+    """Point a postgresql:// URL at the async psycopg (v3) driver."""
+    return make_url(url).set(drivername="postgresql+psycopg")
+
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING, which the outbox, alert
+# fan-out and agent-run de-duplication rely on (checked when the engine is built)
+_ON_CONFLICT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 
 # Create engine
 engine = create_engine(
     DATABASE_URL,
     connect_args={"sslmode": "require"},  # ensure SSL, no cert files
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,   # drop connections before the server/LB idles them out
+    pool_pre_ping=settings.DB_POOL_PRE_PING,  # detect stale SSL connections before use
 )
+if engine.dialect.name not in _ON_CONFLICT_INSERTS:
+    raise RuntimeError(
+        f"DATABASE_URL uses the unsupported '{engine.dialect.name}' dialect; "
+        f"expected one of: {', '.join(_ON_CONFLICT_INSERTS)}"
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the high-traffic routers. It has its own pool (same sizing
+# knobs), so async requests wait on Postgres rather than on the threadpool.
+async_engine = create_async_engine(
+    _async_url(DATABASE_URL),
+    connect_args={"sslmode": "require"},
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+# expire_on_commit=False: responses are serialised after commit, and an
+# expired attribute would need lazy IO, which AsyncSession cannot do.
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -24,6 +136,28 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def insert_ignoring_duplicates(db, model, index_elements, index_where=None):
+    """
+    INSERT into `model` that skips rows conflicting on the unique `index_elements`
+    (a partial unique index also needs its predicate as `index_where`).
+    """
+    insert = _ON_CONFLICT_INSERTS[db.get_bind().dialect.name]
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements, index_where=index_where)
+
+
 def init_db():
     from models import Base as ModelsBase
     ModelsBase.metadata.create_all(bind=engine)
+
+
+def pool_stats() -> dict:
+    """Pool gauges and checkout telemetry for the metrics endpoint."""
+    return {
+        "sync": InstrumentedQueuePool.telemetry.snapshot(engine.pool),
+        "async": InstrumentedAsyncQueuePool.telemetry.snapshot(async_engine.sync_engine.pool),
+    }
@@ -9,11 +9,16 @@ Flow:
   3. Use Tavily to search for crop price trends and weather news.
   4. LLM generates actionable alerts for farmers.
   5. Persist alerts into the `alerts` table with severity.
+
+Steps 1–2 run once up front (`agent_context.build_farmer_context`) and are
+passed to the LLM as a context block, unless AGENT_PRECOMPUTE_CONTEXT=false.
 """
 
 import json
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import func as sa_func
@@ -22,9 +27,12 @@ from langchain.agents import create_agent
 from langchain_core.tools import tool
 from langchain_groq import ChatGroq
 
+from agent_context import build_farmer_context, context_block, record_run, run_stats
+from alerts.fanout import save_alert_json
 from config import settings
 from database import SessionLocal
-from models import Farmer, Crop, MandiFarmerOrder, User, Alert
+from models import Farmer, Crop, MandiFarmerOrder, User
+from rate_limits import groq_rate_limiter, rate_limited_tool, tavily_rate_limiter
 
 logger = logging.getLogger("farmer_agent")
 
@@ -134,30 +142,14 @@ def get_farmer_locations(dummy: str = "") -> str:
 @tool
 def save_farmer_alert(alert_json: str) -> str:
     """
-    Save an advisory alert to the database for a farmer.
+    Save an advisory alert for farmers — one call covers every recipient.
     Input must be a JSON string with keys:
-      - user_id  (int)  — the farmer's user ID to notify
       - message  (str)  — the alert text
       - severity (str)  — one of: low, medium, high, critical
+      - user_ids (list[int], optional) — specific farmers; omit to alert ALL farmers
     Returns a confirmation message.
     """
-    db: Session = SessionLocal()
-    try:
-        data = json.loads(alert_json)
-        alert = Alert(
-            user_id=data["user_id"],
-            message=data["message"],
-            severity=data.get("severity", "medium"),
-        )
-        db.add(alert)
-        db.commit()
-        db.refresh(alert)
-        return f"Alert #{alert.id} saved for user {alert.user_id} (severity={alert.severity})."
-    except Exception as e:
-        db.rollback()
-        return f"Failed to save alert: {e}"
-    finally:
-        db.close()
+    return save_alert_json(alert_json, role="farmer", scope="farmer_agent")
 
 
 @tool
@@ -205,54 +197,110 @@ INSTRUCTIONS:
    relevant to the crops and locations.
 6. Analyse the crop data, market prices, and news together.
 7. For each significant insight, call `save_farmer_alert` with a JSON containing:
-   - user_id: the farmer's user ID (send to ALL farmers)
    - message: a clear, actionable advisory (e.g. best time to sell, price trends)
    - severity: "low" | "medium" | "high" | "critical"
+   Omit user_ids to send it to ALL farmers in one call.
 8. If there is no actionable insight, save one alert with severity "low" saying
    "No significant market changes expected this week. Current prices are stable."
 9. Return a summary of all alerts generated."""
 
+# Used when the DB aggregates are precomputed and passed in the user message.
+CONTEXT_SYSTEM_PROMPT = """You are an agricultural advisory assistant for farmers.
+Your job is to help farmers get the best prices for their crops and prepare
+for weather or market changes.
+
+The user message contains a JSON context block with:
+  - farmers: every farmer's user_id, username, lat/lng and crops
+    (name, qty, planted date)
+  - mandi_prices_7d: per item avg/min/max price and order count at mandis
+    over the past 7 days
+
+INSTRUCTIONS:
+1. Read the context block; do not ask for data it already contains.
+2. Use `tavily_search_results_json` to search for recent news about
+   "crop prices India", "agricultural weather forecast",
+   "harvest season update", "MSP price changes", or similar queries
+   relevant to the crops and locations.
+3. Analyse the crop data, market prices, and news together.
+4. For each significant insight, call `save_farmer_alert` with a JSON containing:
+   - message: a clear, actionable advisory (e.g. best time to sell, price trends)
+   - severity: "low" | "medium" | "high" | "critical"
+   Omit user_ids to send it to ALL farmers in one call; pass user_ids only
+   for insights that concern specific farmers.
+5. If there is no actionable insight, save one alert with severity "low" saying
+   "No significant market changes expected this week. Current prices are stable."
+6. Return a summary of all alerts generated."""
+
+# Tools that open a DB session (counted in the run stats)
+FARMER_DB_TOOLS = {
+    "get_farmer_crops",
+    "get_recent_mandi_prices",
+    "get_farmer_locations",
+    "get_all_farmer_user_ids",
+    "save_farmer_alert",
+}
+
 
 # ── Build & run ──────────────────────────────────────────────────────────────
-def run_farmer_agent() -> str:
-    """Build the agent, invoke it, return the final answer string."""
+def run_farmer_agent(precompute: Optional[bool] = None) -> str:
+    """
+    Build the agent, invoke it, return the final answer string.
+
+    With `precompute` (default: AGENT_PRECOMPUTE_CONTEXT) the DB aggregates
+    are computed up front and passed in the message; otherwise the LLM
+    fetches them through the DB tools.
+    """
     from langchain_community.tools.tavily_search import TavilySearchResults
 
-    tavily_search = TavilySearchResults(
-        max_results=5,
-        api_key=settings.TAVILY_API_KEY,
+    precompute = settings.AGENT_PRECOMPUTE_CONTEXT if precompute is None else precompute
+    start = time.perf_counter()
+
+    tavily_search = rate_limited_tool(
+        TavilySearchResults(max_results=5, api_key=settings.TAVILY_API_KEY),
+        tavily_rate_limiter,
     )
 
     llm = ChatGroq(
         model="gpt-oss-120b",
         api_key=settings.GROQ_API_KEY,
-    )
-
-    tools = [
-        get_farmer_crops,
-        get_recent_mandi_prices,
-        get_farmer_locations,
-        get_all_farmer_user_ids,
-        tavily_search,
-        save_farmer_alert,
-    ]
-
-    agent = create_agent(
-        llm,
-        tools=tools,
-        prompt=SYSTEM_PROMPT,
+        rate_limiter=groq_rate_limiter,
     )
 
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    result = agent.invoke({
-        "messages": [
-            ("user",
-             f"Today is {today}. Analyse current crop data, mandi prices, and "
-             f"market news to generate advisory alerts for farmers.")
+    if precompute:
+        db: Session = SessionLocal()
+        try:
+            context = build_farmer_context(db)
+        finally:
+            db.close()
+        tools = [tavily_search, save_farmer_alert]
+        prompt = CONTEXT_SYSTEM_PROMPT
+        message = (
+            f"Today is {today}. Using the context below and current market news, "
+            f"generate advisory alerts for farmers.\n\nCONTEXT:\n{context_block(context)}"
+        )
+    else:
+        tools = [
+            get_farmer_crops,
+            get_recent_mandi_prices,
+            get_farmer_locations,
+            get_all_farmer_user_ids,
+            tavily_search,
+            save_farmer_alert,
         ]
-    })
+        prompt = SYSTEM_PROMPT
+        message = (
+            f"Today is {today}. Analyse current crop data, mandi prices, and "
+            f"market news to generate advisory alerts for farmers."
+        )
+
+    agent = create_agent(llm, tools=tools, system_prompt=prompt)
+    result = agent.invoke({"messages": [("user", message)]})
 
     messages = result.get("messages", [])
+    stats = run_stats(messages, time.perf_counter() - start, precompute, FARMER_DB_TOOLS)
+    record_run("farmer", stats)
+    logger.info(f"Farmer agent run: {stats}")
     if messages:
         return messages[-1].content
     return "Agent completed without output."
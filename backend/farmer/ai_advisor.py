@@ -1,6 +1,7 @@
 import os
 import json
-import httpx
+from http_clients import post_with_retry
+from farmer.llm_cache import llm_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -61,29 +62,34 @@ Analyze and provide a JSON response with this exact structure:
         "max_tokens": 2000
     }
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        
-        # Try to parse JSON
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # Try to extract JSON from the response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
-            return {"error": "Could not parse AI response", "raw": content}
-
-
-async def parse_voice_command(text: str):
+    response = await post_with_retry("groq", GROQ_URL, headers=headers, json=payload, timeout=30.0)
+    response.raise_for_status()
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+
+    # Try to parse JSON
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        # Try to extract JSON from the response
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start != -1 and end > start:
+            return json.loads(content[start:end])
+        return {"error": "Could not parse AI response", "raw": content}
+
+
+async def parse_voice_command(text: str, use_cache: bool = True):
     """
     Uses Groq to parse farmer's voice command into structured data.
     Handles: sell, grow/plant, harvest advice, price check, weather, general farming questions.
+    Parsed commands are cached by normalised text unless `use_cache` is False.
     """
+    if use_cache:
+        cached = llm_cache.get("parse_voice_command", (text,))
+        if cached is not None:
+            return cached
+
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -116,26 +122,34 @@ Always respond with valid JSON only:
         "max_tokens": 200
     }
     
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
+    response = await post_with_retry("groq", GROQ_URL, headers=headers, json=payload, timeout=15.0)
+    response.raise_for_status()
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start == -1 or end <= start:
             return {"action": "unknown", "original_text": text}
+        parsed = json.loads(content[start:end])
+    if use_cache:
+        llm_cache.set("parse_voice_command", (text,), parsed)
+    return parsed
 
 
-async def ask_farming_question(question: str, crop: str = "", context: str = ""):
+async def ask_farming_question(question: str, crop: str = "", context: str = "", use_cache: bool = True):
     """
     Uses Groq to answer any farming question and return structured UI data.
     Returns title, advice cards, steps, and a spoken summary.
+    Answers are cached by normalised question/crop/context unless `use_cache` is False.
     """
+    if use_cache:
+        cached = llm_cache.get("ask_farming_question", (question, crop, context))
+        if cached is not None:
+            return cached
+
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -178,17 +192,19 @@ Keep advice practical, specific to Indian farming conditions. Max 4 sections, 4
         "max_tokens": 1500
     }
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(GROQ_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        result = response.json()
-        content = result["choices"][0]["message"]["content"]
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                return json.loads(content[start:end])
+    response = await post_with_retry("groq", GROQ_URL, headers=headers, json=payload, timeout=30.0)
+    response.raise_for_status()
+    result = response.json()
+    content = result["choices"][0]["message"]["content"]
+    try:
+        advice = json.loads(content)
+    except json.JSONDecodeError:
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start == -1 or end <= start:
             return {"title": "Advice", "recommendation": content[:300], "sections": [], "steps": [], "spoken_summary": content[:100]}
+        advice = json.loads(content[start:end])
+    if use_cache:
+        llm_cache.set("ask_farming_question", (question, crop, context), advice)
+    return advice
 
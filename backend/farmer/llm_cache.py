@@ -0,0 +1,145 @@
+"""
+Response cache for the Groq helpers in `farmer.ai_advisor`.
+
+Farmers ask the same handful of things all day ("tomato price today",
+"should I harvest wheat"), so answers are cached per function under a
+normalised prompt key with a per-function TTL. When
+`LLM_CACHE_SIMILARITY` is above 0, a miss on the exact key for a free-text
+function (SIMILARITY_FNS) falls back to the most similar recent prompt for
+that function, compared with a cheap local embedding (hashed character
+trigrams, cosine similarity). Voice-command parsing is exact-match only:
+"sell 10 kg tomato" and "sell 100 kg tomato" embed almost identically but
+must not share a parse.
+
+Usage:
+    cached = llm_cache.get("ask_farming_question", (question, crop, context))
+    llm_cache.set("ask_farming_question", (question, crop, context), answer)
+"""
+
+import copy
+import math
+import re
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+from cache import TTLCache
+from config import settings
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+_EMBED_DIM = 2048
+
+# Functions whose answers are free-text advice, safe to serve for a paraphrase
+SIMILARITY_FNS = ("ask_farming_question",)
+
+
+def normalize_prompt(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    text = _PUNCTUATION.sub(" ", (text or "").lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Unit-length sparse vector of hashed character trigrams."""
+    padded = f"  {text} "
+    counts = Counter(
+        zlib.crc32(padded[i:i + 3].encode()) % _EMBED_DIM
+        for i in range(len(padded) - 2)
+    )
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        maxsize: int,
+        ttls: Dict[str, float],
+        similarity: float,
+        scan_limit: int,
+        similarity_fns: Sequence[str] = SIMILARITY_FNS,
+    ):
+        self._store = TTLCache(maxsize=maxsize, ttl=max(ttls.values()))
+        self._ttls = ttls
+        self.similarity = similarity
+        self.similarity_fns = frozenset(similarity_fns)
+        self.scan_limit = scan_limit
+        # Per-function recent keys with their embeddings, for similarity lookups
+        self._recent: Dict[str, "OrderedDict[str, Dict[int, float]]"] = {}
+        self._lock = threading.Lock()
+        self.semantic_hits = 0
+
+    @staticmethod
+    def _key(parts: Sequence[Any]) -> str:
+        return " | ".join(normalize_prompt(str(p)) for p in parts)
+
+    def get(self, fn: str, parts: Sequence[Any]) -> Optional[Any]:
+        """Return a deep copy of the cached answer for `parts`, or None."""
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        key = self._key(parts)
+        value = self._store.get((fn, key))
+        if value is None and self._uses_similarity(fn):
+            value = self._similar(fn, key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, fn: str, parts: Sequence[Any], value: Any) -> None:
+        if not settings.LLM_CACHE_ENABLED:
+            return
+        key = self._key(parts)
+        self._store.set((fn, key), copy.deepcopy(value), ttl=self._ttls.get(fn))
+        if self._uses_similarity(fn):
+            with self._lock:
+                recent = self._recent.setdefault(fn, OrderedDict())
+                recent[key] = embed(key)
+                recent.move_to_end(key)
+                while len(recent) > self.scan_limit:
+                    recent.popitem(last=False)
+
+    def _uses_similarity(self, fn: str) -> bool:
+        return self.similarity > 0 and fn in self.similarity_fns
+
+    def _similar(self, fn: str, key: str) -> Optional[Any]:
+        """The cached answer of the most similar prompt above the threshold that has not expired."""
+        query = embed(key)
+        with self._lock:
+            candidates = list(self._recent.get(fn, {}).items())
+        scored = [(cosine(query, vector), other_key) for other_key, vector in candidates]
+        for score, other_key in sorted((c for c in scored if c[0] >= self.similarity), reverse=True):
+            value = self._store.peek((fn, other_key))
+            if value is not None:
+                with self._lock:
+                    self.semantic_hits += 1
+                return value
+        return None
+
+    def stats(self) -> dict:
+        """Hit-rate counters; semantic hits are also counted as exact-key misses."""
+        stats = self._store.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "similarity_threshold": self.similarity,
+            "semantic_hits": self.semantic_hits,
+            "hit_rate": round((stats["hits"] + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+llm_cache = LLMResponseCache(
+    maxsize=settings.LLM_CACHE_SIZE,
+    ttls={
+        "parse_voice_command": settings.LLM_CACHE_TTL_PARSE,
+        "ask_farming_question": settings.LLM_CACHE_TTL_ASK,
+    },
+    similarity=settings.LLM_CACHE_SIMILARITY,
+    scan_limit=settings.LLM_CACHE_SCAN_LIMIT,
+)
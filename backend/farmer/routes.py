@@ -1,22 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional, List
+import asyncio
+import logging
 import random
 from datetime import datetime, timedelta
 
-from database import get_db
+from config import settings
+from database import get_db, get_async_db
 from models import Farmer, Crop, User, Alert
 from schemas import (
     FarmerProfileUpdate, FarmerProfileResponse,
     CropCreate, CropUpdate, CropResponse,
 )
-from auth import get_current_user, require_role
+from auth import (
+    Principal, invalidate_principal, require_principal, require_role,
+)
 from farmer.ai_advisor import get_ai_recommendation, parse_voice_command, ask_farming_question
 from farmer.weather import get_weather_data, search_market_info
 from farmer.alerts import categorize_alerts
+from farmer.sell_timing import simulated_price_history, trend_forecast, sell_timing as advise_sell_timing
+from geo import SpatialIndex
 
 router = APIRouter(tags=["farmer"])
+logger = logging.getLogger("farmer_routes")
 
 
 # ── Helper ──────────────────────────────────────────────────────────────────
@@ -28,6 +38,13 @@ def _get_farmer_profile(user: User, db: Session) -> Farmer:
     return farmer
 
 
+def _farmer_id(principal: Principal) -> int:
+    """Return the cached Farmer id for the authenticated principal, or 404."""
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Farmer profile not found")
+    return principal.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
@@ -60,6 +77,7 @@ def update_profile(
         farmer.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(farmer)
     return farmer
 
@@ -69,63 +87,64 @@ def update_profile(
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/crops", response_model=List[CropResponse])
-def list_crops(
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+async def list_crops(
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all crops belonging to the logged-in farmer."""
-    farmer = _get_farmer_profile(current_user, db)
-    return db.query(Crop).filter(Crop.farmer_id == farmer.id).all()
+    farmer_id = _farmer_id(principal)
+    result = await db.execute(select(Crop).where(Crop.farmer_id == farmer_id))
+    return result.scalars().all()
 
 
 @router.post("/crops", response_model=CropResponse, status_code=status.HTTP_201_CREATED)
-def create_crop(
+async def create_crop(
     payload: CropCreate,
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a new crop for the farmer."""
-    farmer = _get_farmer_profile(current_user, db)
+    farmer_id = _farmer_id(principal)
     crop = Crop(
-        farmer_id=farmer.id,
+        farmer_id=farmer_id,
         name=payload.name,
         quantity=payload.quantity,
         planted_date=payload.planted_date,
     )
     db.add(crop)
-    db.commit()
-    db.refresh(crop)
+    await db.commit()
+    await db.refresh(crop)
     return crop
 
 
 @router.get("/crops/{crop_id}", response_model=CropResponse)
-def get_crop(
+async def get_crop(
     crop_id: int,
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a single crop by ID."""
-    farmer = _get_farmer_profile(current_user, db)
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
-    ).first()
+    farmer_id = _farmer_id(principal)
+    crop = await db.scalar(select(Crop).where(
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
+    ))
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
     return crop
 
 
 @router.put("/crops/{crop_id}", response_model=CropResponse)
-def update_crop(
+async def update_crop(
     crop_id: int,
     payload: CropUpdate,
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing crop."""
-    farmer = _get_farmer_profile(current_user, db)
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
-    ).first()
+    farmer_id = _farmer_id(principal)
+    crop = await db.scalar(select(Crop).where(
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
+    ))
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
 
@@ -133,26 +152,26 @@ def update_crop(
     for key, value in update_data.items():
         setattr(crop, key, value)
 
-    db.commit()
-    db.refresh(crop)
+    await db.commit()
+    await db.refresh(crop)
     return crop
 
 
 @router.delete("/crops/{crop_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_crop(
+async def delete_crop(
     crop_id: int,
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a crop."""
-    farmer = _get_farmer_profile(current_user, db)
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id, Crop.farmer_id == farmer.id
-    ).first()
+    farmer_id = _farmer_id(principal)
+    crop = await db.scalar(select(Crop).where(
+        Crop.id == crop_id, Crop.farmer_id == farmer_id
+    ))
     if not crop:
         raise HTTPException(status_code=404, detail="Crop not found")
-    db.delete(crop)
-    db.commit()
+    await db.delete(crop)
+    await db.commit()
 
 
 # ─── Request / Response Models ───
@@ -202,23 +221,24 @@ CROP_PRICE_RANGES = {
     "grape": (50, 150), "apple": (80, 200), "sugarcane": (3, 5),
 }
 
-import math
+# Built once at import; queries touch only the grid cells near the caller.
+MANDI_INDEX = SpatialIndex(MOCK_MANDIS)
 
-def haversine_distance(lat1, lng1, lat2, lng2):
-    R = 6371
-    dlat = math.radians(lat2 - lat1)
-    dlng = math.radians(lng2 - lng1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-
-def get_mandis_with_prices(lat: float, lng: float, crop: str):
-    """Returns mandis sorted by distance with simulated prices"""
+def get_mandis_with_prices(
+    lat: float, lng: float, crop: str,
+    limit: Optional[int] = None, radius_km: Optional[float] = None,
+):
+    """Returns the nearest mandis (all, `limit` of them, or those within `radius_km`) with simulated prices"""
     price_range = CROP_PRICE_RANGES.get(crop.lower(), (20, 50))
-    
+
+    if radius_km is not None:
+        nearby = MANDI_INDEX.within(lat, lng, radius_km)[:limit]
+    else:
+        nearby = MANDI_INDEX.nearest(lat, lng, limit or len(MANDI_INDEX))
+
     mandis = []
-    for m in MOCK_MANDIS:
-        dist = haversine_distance(lat, lng, m["lat"], m["lng"])
+    for m, dist in nearby:
         price = round(random.uniform(*price_range), 2)
         transport_cost = round(dist * 2.5 + random.uniform(100, 500), 2)  # ₹/trip
         mandis.append({
@@ -228,32 +248,62 @@ def get_mandis_with_prices(lat: float, lng: float, crop: str):
             "transport_cost": transport_cost,
             "travel_time_min": round(dist * 1.8 + random.uniform(10, 30)),
         })
-    
-    mandis.sort(key=lambda x: x["distance_km"])
     return mandis
 
 
 # ─── Endpoints ───
 
 @router.get("/mandis")
-async def get_nearby_mandis(lat: float = 12.97, lng: float = 77.59, crop: str = "tomato"):
+async def get_nearby_mandis(
+    lat: float = 12.97, lng: float = 77.59, crop: str = "tomato",
+    limit: int = Query(20, ge=1, le=500),
+    radius_km: Optional[float] = Query(None, gt=0),
+):
     """Get nearby mandis with current prices for a crop"""
-    mandis = get_mandis_with_prices(lat, lng, crop)
+    mandis = get_mandis_with_prices(lat, lng, crop, limit=limit, radius_km=radius_km)
     return {"mandis": mandis, "crop": crop, "total": len(mandis)}
 
 
+async def _branch(name: str, coro, deadline: float, fallback: dict):
+    """Await one fan-out branch; on timeout or error degrade to `fallback` instead of failing."""
+    try:
+        return await asyncio.wait_for(coro, timeout=deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f"analyze: {name} branch exceeded {deadline}s deadline")
+        return {**fallback, "status": "timeout"}
+    except Exception as e:
+        logger.warning(f"analyze: {name} branch failed: {e}")
+        return {**fallback, "status": "error", "error": str(e)}
+
+
 @router.post("/analyze")
 async def analyze_sell(req: AnalyzeRequest):
     """AI-powered analysis: when & where to sell for best profit"""
     # Get mandi prices
-    mandis = get_mandis_with_prices(req.lat, req.lng, req.crop)
-    mandi_data = [{"name": m["name"], "price_per_kg": m["price_per_kg"], "distance_km": m["distance_km"], "transport_cost": m["transport_cost"]} for m in mandis[:5]]
-    
-    # Get weather
-    weather = await get_weather_data(req.lat, req.lng, req.location)
+    mandis = get_mandis_with_prices(req.lat, req.lng, req.crop, limit=5)
+    mandi_data = [{"name": m["name"], "price_per_kg": m["price_per_kg"], "distance_km": m["distance_km"], "transport_cost": m["transport_cost"]} for m in mandis]
     
-    # Get market info from Tavily
-    market_info = await search_market_info(req.crop, req.location or "Karnataka")
+    # Fan out: weather and market info are independent, so fetch them together.
+    # Each branch has its own deadline and degrades to a placeholder on failure.
+    region = req.location or "Karnataka"
+    weather, market_info = await asyncio.gather(
+        _branch(
+            "weather",
+            get_weather_data(req.lat, req.lng, req.location),
+            settings.ANALYZE_WEATHER_DEADLINE,
+            {"summary": "Weather data not available", "sources": [], "location": req.location or f"{req.lat}, {req.lng}"},
+        ),
+        _branch(
+            "market",
+            search_market_info(req.crop, region),
+            settings.ANALYZE_MARKET_DEADLINE,
+            {"summary": "Market data not available", "sources": [], "crop": req.crop, "region": region},
+        ),
+    )
+    degraded = [
+        name for name, branch in (("weather", weather), ("market", market_info))
+        if branch.get("status") != "success"
+    ]
     
     # Get AI recommendation
     ai_result = await get_ai_recommendation(
@@ -270,10 +320,11 @@ async def analyze_sell(req: AnalyzeRequest):
     
     return {
         "ai_recommendation": ai_result,
-        "mandis": mandis[:5],
+        "mandis": mandis,
         "weather": weather,
         "market_info": market_info,
         "alerts": alerts,
+        "degraded": degraded,
         "request": {"crop": req.crop, "quantity": req.quantity}
     }
 
@@ -307,27 +358,12 @@ async def process_voice(cmd: VoiceCommand):
 
         # ── Price Forecast (7-day prediction) ──
         price_range = CROP_PRICE_RANGES.get(crop.lower(), (20, 50))
-        base = (price_range[0] + price_range[1]) / 2
         today = datetime.utcnow().date()
-        rng = random.Random(hash(crop) + today.toordinal())
-
-        # Simulate last 5 days of prices for the best mandi
-        best_mandi_name = (analysis.get("mandis") or [{}])[0].get("name", "APMC Yeshwanthpur")
-        prices_last5 = []
-        p = base + rng.uniform(-3, 3)
-        for _ in range(30):
-            p += rng.uniform(-2, 2.3)
-            p = max(price_range[0] * 0.7, min(price_range[1] * 1.3, p))
-            prices_last5.append(round(p, 2))
-        prices_last5 = prices_last5[-5:]  # last 5 days
-
-        # Calculate trend and project 7 days
-        avg_change = (prices_last5[-1] - prices_last5[0]) / len(prices_last5) if len(prices_last5) > 1 else 0
-        last_price = prices_last5[-1]
+        history = simulated_price_history(crop, today, price_range)
+        today_price = history[-1]
         forecast = []
-        for i in range(7):
+        for i, predicted in enumerate(trend_forecast(history, horizon=7, floor=price_range[0] * 0.7)):
             day_date = today + timedelta(days=i + 1)
-            predicted = round(max(price_range[0] * 0.7, last_price + avg_change * (i + 1) + random.uniform(-0.5, 0.5)), 2)
             forecast.append({
                 "date": day_date.isoformat(),
                 "day_label": day_date.strftime("%a %d %b"),
@@ -336,18 +372,7 @@ async def process_voice(cmd: VoiceCommand):
             })
 
         # Sell timing recommendation
-        today_price = last_price
-        max_forecast = max(forecast, key=lambda x: x["predicted_price"])
-        max_idx = forecast.index(max_forecast)
-
-        if max_forecast["predicted_price"] > today_price * 1.03:
-            # Price will rise >3% — wait
-            if max_idx <= 1:
-                sell_timing = {"action": "WAIT_2_DAYS", "reason": f"Price expected to rise to ₹{max_forecast['predicted_price']}/kg by {max_forecast['day_label']}", "best_day": max_forecast["day_label"], "best_price": max_forecast["predicted_price"]}
-            else:
-                sell_timing = {"action": "WAIT_WEEK", "reason": f"Price rising trend — peak ₹{max_forecast['predicted_price']}/kg expected on {max_forecast['day_label']}", "best_day": max_forecast["day_label"], "best_price": max_forecast["predicted_price"]}
-        else:
-            sell_timing = {"action": "SELL_TODAY", "reason": "Prices are stable or declining — selling today gives you the best return", "best_day": "Today", "best_price": today_price}
+        sell_timing = advise_sell_timing(today_price, forecast)
 
         analysis["price_forecast"] = forecast
         analysis["sell_timing"] = sell_timing
@@ -396,8 +421,8 @@ async def process_voice(cmd: VoiceCommand):
     # ── CHECK PRICE ──
     elif action == "check_price":
         crop = parsed.get("crop", "tomato")
-        mandis = get_mandis_with_prices(cmd.lat, cmd.lng, crop)
-        return {"parsed_command": parsed, "response_type": "price_check", "mandis": mandis[:5], "crop": crop}
+        mandis = get_mandis_with_prices(cmd.lat, cmd.lng, crop, limit=5)
+        return {"parsed_command": parsed, "response_type": "price_check", "mandis": mandis, "crop": crop}
 
     # ── UNKNOWN — try as general question ──
     else:
@@ -460,22 +485,23 @@ async def get_price_history(crop: str = "tomato", days: int = 30):
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/alerts")
-def get_farmer_alerts(
-    current_user: User = Depends(require_role("farmer")),
-    db: Session = Depends(get_db),
+async def get_farmer_alerts(
+    principal: Principal = Depends(require_principal("farmer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get all alerts for the logged-in farmer, newest first."""
-    alerts = (
-        db.query(Alert)
-        .filter(Alert.user_id == current_user.id)
+    result = await db.execute(
+        select(Alert)
+        .where(Alert.user_id == principal.user_id)
         .order_by(Alert.created_at.desc())
         .limit(20)
-        .all()
     )
+    alerts = result.scalars().all()
     return [
         {
             "id": a.id,
             "message": a.message,
+            "severity": a.severity,
             "seen": a.seen,
             "created_at": a.created_at.isoformat() if a.created_at else None,
         }
@@ -510,6 +536,7 @@ def setup_farm(
         current_user.longitude = payload.lng
 
     db.commit()
+    invalidate_principal(current_user.id)
 
     # Create initial crop if farmer has no crops yet
     existing_crops = db.query(Crop).filter(Crop.farmer_id == farmer.id).all()
@@ -0,0 +1,64 @@
+"""
+Sell-timing advice for the voice "sell" intent.
+
+The price forecast behind it is a straight line through the last five days
+(`trend_forecast`); `sell_timing_decision` waits only if some forecast day
+beats today's price by more than SELL_RISE_THRESHOLD. Both are pure
+functions so `mandi.backtest` can replay them over historical prices.
+
+Usage:
+    history = simulated_price_history("tomato", today, price_range=(15, 55))
+    predicted = trend_forecast(history, horizon=7, floor=15 * 0.7)
+    advice = sell_timing(history[-1], forecast_days)     # forecast_days: [{"predicted_price", "day_label"}, ...]
+"""
+
+import random
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+SELL_RISE_THRESHOLD = 1.03     # wait only for a > 3% better price
+TREND_WINDOW = 5
+
+
+def simulated_price_history(crop: str, today: date, price_range: Tuple[float, float], days: int = 30) -> List[float]:
+    """Daily prices for the best mandi until today (seeded per crop and day)."""
+    low, high = price_range
+    rng = random.Random(hash(crop) + today.toordinal())
+    prices = []
+    p = (low + high) / 2 + rng.uniform(-3, 3)
+    for _ in range(days):
+        p += rng.uniform(-2, 2.3)
+        p = max(low * 0.7, min(high * 1.3, p))
+        prices.append(round(p, 2))
+    return prices
+
+
+def trend_forecast(history: Sequence[float], horizon: int, floor: Optional[float] = None) -> List[float]:
+    """Extend the average daily change over the last TREND_WINDOW prices `horizon` days ahead."""
+    window = list(history[-TREND_WINDOW:])
+    avg_change = (window[-1] - window[0]) / len(window) if len(window) > 1 else 0
+    predicted = [window[-1] + avg_change * (h + 1) for h in range(horizon)]
+    if floor is not None:
+        predicted = [max(floor, p) for p in predicted]
+    return [round(p, 2) for p in predicted]
+
+
+def sell_timing_decision(today_price: float, predicted: Sequence[float]) -> Tuple[str, Optional[int]]:
+    """(action, index of the best forecast day, or None when selling today)."""
+    best_idx = max(range(len(predicted)), key=lambda i: predicted[i])
+    if predicted[best_idx] > today_price * SELL_RISE_THRESHOLD:
+        return ("WAIT_2_DAYS" if best_idx <= 1 else "WAIT_WEEK"), best_idx
+    return "SELL_TODAY", None
+
+
+def sell_timing(today_price: float, forecast: List[dict]) -> dict:
+    """The advice payload for `forecast` days ({"predicted_price", "day_label"})."""
+    action, best_idx = sell_timing_decision(today_price, [f["predicted_price"] for f in forecast])
+    if action == "SELL_TODAY":
+        return {"action": action, "reason": "Prices are stable or declining — selling today gives you the best return", "best_day": "Today", "best_price": today_price}
+    best = forecast[best_idx]
+    if action == "WAIT_2_DAYS":
+        reason = f"Price expected to rise to ₹{best['predicted_price']}/kg by {best['day_label']}"
+    else:
+        reason = f"Price rising trend — peak ₹{best['predicted_price']}/kg expected on {best['day_label']}"
+    return {"action": action, "reason": reason, "best_day": best["day_label"], "best_price": best["predicted_price"]}
@@ -1,5 +1,8 @@
 import os
-import httpx
+from http_clients import post_with_retry
+from cache import AsyncSingleFlight, TTLCache
+from config import settings
+from geo import geohash_center, geohash_encode
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,10 +11,14 @@ TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 TAVILY_URL = "https://api.tavily.com/search"
 
 
-async def get_weather_data(lat: float, lng: float, location_name: str = ""):
-    """
-    Uses Tavily search to get current weather and forecast for the farmer's location.
-    """
+# Weather is shared by every farmer in the same geohash cell for a few hours.
+_weather_cache = TTLCache(maxsize=settings.WEATHER_CACHE_SIZE, ttl=settings.WEATHER_CACHE_TTL_SECONDS)
+_weather_flight = AsyncSingleFlight()
+
+
+async def _fetch_cell_weather(cell: str, location_name: str) -> dict:
+    """Query Tavily for one geohash cell; successful answers are cached per cell."""
+    lat, lng = (round(v, 3) for v in geohash_center(cell))
     query = f"current weather forecast {location_name} India temperature rain humidity wind today tomorrow" if location_name else f"weather forecast India latitude {lat} longitude {lng} today tomorrow"
     
     payload = {
@@ -23,30 +30,45 @@ async def get_weather_data(lat: float, lng: float, location_name: str = ""):
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(TAVILY_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "summary": data.get("answer", "Weather data not available"),
-                "sources": [
-                    {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
-                    for r in data.get("results", [])[:3]
-                ],
-                "location": location_name or f"{lat}, {lng}",
-                "status": "success"
-            }
+        response = await post_with_retry("tavily", TAVILY_URL, json=payload, timeout=15.0)
+        response.raise_for_status()
+        data = response.json()
+
+        weather = {
+            "summary": data.get("answer", "Weather data not available"),
+            "sources": [
+                {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
+                for r in data.get("results", [])[:3]
+            ],
+            "status": "success"
+        }
+        _weather_cache.set(cell, weather)
+        return weather
     except Exception as e:
         return {
             "summary": "Could not fetch weather data",
             "sources": [],
-            "location": location_name or f"{lat}, {lng}",
             "status": "error",
             "error": str(e)
         }
 
 
+async def get_weather_data(lat: float, lng: float, location_name: str = ""):
+    """
+    Uses Tavily search to get current weather and forecast for the farmer's location.
+    Results are cached per geohash cell; concurrent misses for a cell share one upstream call.
+    """
+    cell = geohash_encode(lat, lng, settings.WEATHER_GEOHASH_PRECISION)
+    weather = _weather_cache.get(cell)
+    if weather is None:
+        weather = await _weather_flight.do(cell, lambda: _fetch_cell_weather(cell, location_name))
+    return {**weather, "location": location_name or f"{lat}, {lng}", "geohash": cell}
+
+
+def weather_cache_stats() -> dict:
+    return {**_weather_cache.stats(), **_weather_flight.stats()}
+
+
 async def search_market_info(crop: str, region: str = "India"):
     """
     Uses Tavily to search current market prices and news for a crop.
@@ -62,21 +84,20 @@ async def search_market_info(crop: str, region: str = "India"):
     }
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(TAVILY_URL, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "summary": data.get("answer", "Market data not available"),
-                "sources": [
-                    {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
-                    for r in data.get("results", [])[:3]
-                ],
-                "crop": crop,
-                "region": region,
-                "status": "success"
-            }
+        response = await post_with_retry("tavily", TAVILY_URL, json=payload, timeout=15.0)
+        response.raise_for_status()
+        data = response.json()
+
+        return {
+            "summary": data.get("answer", "Market data not available"),
+            "sources": [
+                {"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("content", "")[:200]}
+                for r in data.get("results", [])[:3]
+            ],
+            "crop": crop,
+            "region": region,
+            "status": "success"
+        }
     except Exception as e:
         return {
             "summary": "Could not fetch market data",
@@ -0,0 +1,188 @@
+"""
+Geospatial helpers: distances, geohash cells for bucketing nearby
+coordinates, and a grid index for nearest-neighbour lookups.
+
+Geohash precision guide (cell size near the equator):
+    4 → ~39 km × 20 km     5 → ~4.9 km × 4.9 km     6 → ~1.2 km × 0.6 km
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.195
+
+
+def haversine_distance(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km between two points (scalar, pure Python)."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng/2)**2
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorised great-circle distance in km from one point to arrays of points."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 5) -> str:
+    """Encode a coordinate into a geohash string of `precision` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = (bits << 1) | 1, mid
+            else:
+                bits, lng_hi = bits << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = (bits << 1) | 1, mid
+            else:
+                bits, lat_hi = bits << 1, mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Return (min_lat, min_lng, max_lat, max_lng) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+    for c in geohash:
+        value = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lng_lo, lat_hi, lng_hi
+
+
+def geohash_center(geohash: str) -> Tuple[float, float]:
+    """Return the (lat, lng) centre of a geohash cell."""
+    lat_lo, lng_lo, lat_hi, lng_hi = geohash_bounds(geohash)
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+class SpatialIndex:
+    """
+    Uniform lat/lng grid over records with "lat"/"lng" keys.
+
+    Built once; queries expand ring by ring around the query cell and only
+    compute (vectorised) haversine distances for the candidates they touch.
+
+    Usage:
+        index = SpatialIndex(mandis)
+        index.nearest(12.97, 77.59, k=5)        # [(record, distance_km), ...]
+        index.within(12.97, 77.59, radius_km=50)
+    """
+
+    def __init__(self, records: Sequence[dict], cell_deg: float = 0.5):
+        self.records = list(records)
+        self.cell_deg = cell_deg
+        self._lats = np.array([r["lat"] for r in self.records], dtype=float)
+        self._lngs = np.array([r["lng"] for r in self.records], dtype=float)
+
+        cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, (lat, lng) in enumerate(zip(self._lats, self._lngs)):
+            cells[self._cell(lat, lng)].append(i)
+        self._cells = {key: np.array(idx, dtype=np.int64) for key, idx in cells.items()}
+        if self._cells:
+            rows = [key[0] for key in self._cells]
+            cols = [key[1] for key in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def _ring(self, row: int, col: int, r: int) -> List[np.ndarray]:
+        """Index arrays for the cells exactly `r` steps from (row, col)."""
+        if r == 0:
+            keys = [(row, col)]
+        else:
+            keys = [(row + dr, col + dc) for dr in (-r, r) for dc in range(-r, r + 1)]
+            keys += [(row + dr, col + dc) for dc in (-r, r) for dr in range(-r + 1, r)]
+        return [self._cells[key] for key in keys if key in self._cells]
+
+    def _max_ring(self, row: int, col: int) -> int:
+        """Ring radius that covers every occupied cell from (row, col)."""
+        min_row, max_row, min_col, max_col = self._bounds
+        return max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+    def _ring_clearance_km(self, lat: float, r: int) -> float:
+        """Lower bound on the distance to any point outside rings 0..r."""
+        # A point outside ring r is at least r cells away in lat or lng;
+        # longitude degrees shrink with latitude, so use the widest latitude reached.
+        reach = r * self.cell_deg
+        widest_lat = min(89.9, abs(lat) + reach)
+        return reach * KM_PER_DEGREE_LAT * math.cos(math.radians(widest_lat))
+
+    def _ranked(self, lat: float, lng: float, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        dist = haversine_km(lat, lng, self._lats[idx], self._lngs[idx])
+        order = np.argsort(dist, kind="stable")
+        return idx[order], dist[order]
+
+    def nearest(self, lat: float, lng: float, k: int) -> List[Tuple[dict, float]]:
+        """The `k` closest records to (lat, lng), nearest first."""
+        if not self.records or k <= 0:
+            return []
+        row, col = self._cell(lat, lng)
+        max_ring = self._max_ring(row, col)
+        found: List[np.ndarray] = []
+        count = 0
+        for r in range(max_ring + 1):
+            ring = self._ring(row, col, r)
+            found.extend(ring)
+            count += sum(len(a) for a in ring)
+            if count >= k:
+                idx, dist = self._ranked(lat, lng, np.concatenate(found))
+                if dist[k - 1] <= self._ring_clearance_km(lat, r):
+                    return [(self.records[i], float(d)) for i, d in zip(idx[:k], dist[:k])]
+        idx, dist = self._ranked(lat, lng, np.concatenate(found))
+        return [(self.records[i], float(d)) for i, d in zip(idx[:k], dist[:k])]
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[dict, float]]:
+        """All records within `radius_km` of (lat, lng), nearest first."""
+        if not self.records:
+            return []
+        row, col = self._cell(lat, lng)
+        max_ring = self._max_ring(row, col)
+        found: List[np.ndarray] = []
+        r = 0
+        while True:
+            found.extend(self._ring(row, col, r))
+            if r >= max_ring or self._ring_clearance_km(lat, r) >= radius_km:
+                break
+            r += 1
+        if not found:
+            return []
+        idx, dist = self._ranked(lat, lng, np.concatenate(found))
+        keep = dist <= radius_km
+        return [(self.records[i], float(d)) for i, d in zip(idx[keep], dist[keep])]
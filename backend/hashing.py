@@ -0,0 +1,94 @@
+"""
+Dedicated, size-bounded worker pool for bcrypt.
+
+bcrypt is deliberately slow (~250ms at cost 12) and releases the GIL, so it
+runs well on threads — but not on FastAPI's shared anyio threadpool, where a
+burst of logins starves every other sync route. Hashing work goes to its own
+small executor instead; once `HASH_QUEUE_SIZE` jobs are in flight further
+callers are refused with `HashPoolSaturated`, which the routes turn into 429.
+
+Usage:
+    ok, new_hash = await password_hasher.verify_and_update(plain, stored_hash)
+    hashed = await password_hasher.hash(plain)
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from auth import pwd_context
+from config import settings
+
+
+class HashPoolSaturated(Exception):
+    """Raised when the hashing pool already has its maximum number of jobs queued."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self.workers = workers
+        self.queue_size = queue_size
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    async def _run(self, fn: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashPoolSaturated()
+        with self._lock:
+            self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+                self._total_seconds += elapsed
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password at the configured bcrypt cost."""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; if it matches but was hashed at a different cost,
+        also return a replacement hash at the current cost (else None).
+        """
+        return await self._run(pwd_context.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        """Throughput counters for the metrics endpoint."""
+        with self._lock:
+            uptime = time.monotonic() - self._started_at
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_hash_ms": round(self._total_seconds / self._completed * 1000, 1) if self._completed else 0.0,
+                "hashes_per_sec": round(self._completed / uptime, 2) if uptime else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.HASH_WORKERS,
+    queue_size=settings.HASH_QUEUE_SIZE,
+)
@@ -0,0 +1,108 @@
+"""
+Application-lifetime HTTP clients for the upstream APIs (Groq, Tavily).
+
+One pooled `httpx.AsyncClient` per upstream is opened in `server.lifespan`
+and reused by every request, so calls ride on warm HTTP/2 keep-alive
+connections instead of paying a TCP+TLS handshake each time.
+
+Usage:
+    from http_clients import post_with_retry
+    response = await post_with_retry("groq", GROQ_URL, headers=..., json=..., timeout=15.0)
+"""
+
+import asyncio
+import logging
+import random
+from typing import Dict, Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger("http_clients")
+
+# Default per-upstream timeouts; callers may override the total per call.
+UPSTREAM_TIMEOUTS = {
+    "groq": httpx.Timeout(30.0, connect=5.0),
+    "tavily": httpx.Timeout(15.0, connect=5.0),
+}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _build_client(name: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=UPSTREAM_TIMEOUTS[name],
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def start_clients() -> None:
+    """Open one pooled client per upstream (called from the lifespan hook)."""
+    for name in UPSTREAM_TIMEOUTS:
+        if name not in _clients:
+            _clients[name] = _build_client(name)
+
+
+async def close_clients() -> None:
+    """Close all pooled clients (called on shutdown)."""
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for `name`, creating it if lifespan has not run (scripts)."""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _build_client(name)
+    return client
+
+
+def _backoff_seconds(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After header."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), settings.HTTP_RETRY_MAX_DELAY)
+    cap = min(settings.HTTP_RETRY_MAX_DELAY, settings.HTTP_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+async def post_with_retry(
+    upstream: str,
+    url: str,
+    *,
+    json: dict,
+    headers: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+) -> httpx.Response:
+    """
+    POST through the shared client for `upstream`, retrying transport errors
+    and 429/5xx responses with jittered backoff. The final response (or
+    exception) is returned to the caller unchanged.
+    """
+    client = get_client(upstream)
+    retries = settings.HTTP_RETRIES if retries is None else retries
+    request_timeout = UPSTREAM_TIMEOUTS[upstream] if timeout is None else httpx.Timeout(timeout, connect=5.0)
+
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = await client.post(url, json=json, headers=headers, timeout=request_timeout)
+            if response.status_code not in RETRYABLE_STATUS or attempt == retries:
+                return response
+        except httpx.TransportError as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"{upstream} request failed ({e!r}), retrying")
+        await asyncio.sleep(_backoff_seconds(attempt, response))
+    return response
@@ -0,0 +1,235 @@
+"""
+Leader election for the in-process agent scheduler.
+
+Every uvicorn/gunicorn worker runs the same lifespan hook, but only the
+worker holding the leader lock schedules agent jobs. The lock is a Postgres
+session-level advisory lock held on a dedicated connection (released by the
+server as soon as that worker's connection dies), or an fcntl file lock for
+non-Postgres databases (released by the OS when the process exits).
+
+Followers retry every LEADER_POLL_SECONDS, so when the leader dies another
+worker takes over within one poll interval. The leader re-checks its lock
+connection on the same cadence and steps down if it is gone.
+
+Usage:
+    elector = LeaderElector(build_leader_lock(), on_elected=start, on_demoted=pause)
+    elector.start()
+    ...
+    elector.stop()
+"""
+
+import fcntl
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from database import DATABASE_URL
+
+logger = logging.getLogger("leader")
+
+
+class PostgresAdvisoryLock:
+    """`pg_try_advisory_lock` held on a dedicated autocommit connection."""
+
+    name = "postgres"
+
+    def __init__(self, url: str, key: int):
+        self.key = key
+        # Outside the app pool so the held connection never counts against it;
+        # TCP keepalives make the server drop a dead leader's session promptly.
+        self._engine = create_engine(
+            url,
+            poolclass=NullPool,
+            connect_args={
+                "sslmode": "require",
+                "keepalives": 1,
+                "keepalives_idle": 30,
+                "keepalives_interval": 10,
+                "keepalives_count": 3,
+            },
+        )
+        self._conn = None
+
+    def try_acquire(self) -> bool:
+        if self._conn is None:
+            self._conn = self._engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = self._conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        except Exception:
+            self._discard()
+            raise
+        return bool(acquired)
+
+    def check(self) -> bool:
+        """True while the lock connection is alive (the lock lives as long as it does)."""
+        if self._conn is None:
+            return False
+        try:
+            self._conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            self._discard()
+            return False
+
+    def release(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+        except Exception:
+            pass
+        self._discard()
+
+    def _discard(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class FileLock:
+    """Exclusive non-blocking `flock` on a local file (single-host fallback)."""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def check(self) -> bool:
+        return self._fd is not None
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class AlwaysLeader:
+    """LEADER_ELECTION=off: every worker schedules (single-worker deployments)."""
+
+    name = "off"
+
+    def try_acquire(self) -> bool:
+        return True
+
+    def check(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def build_leader_lock():
+    """Pick the lock backend from LEADER_ELECTION (auto = by database dialect)."""
+    mode = settings.LEADER_ELECTION
+    if mode == "off":
+        return AlwaysLeader()
+    if mode == "file":
+        return FileLock(settings.LEADER_LOCK_FILE)
+    if mode == "postgres" or make_url(DATABASE_URL).get_backend_name() == "postgresql":
+        return PostgresAdvisoryLock(DATABASE_URL, settings.LEADER_LOCK_KEY)
+    return FileLock(settings.LEADER_LOCK_FILE)
+
+
+class LeaderElector:
+    def __init__(
+        self,
+        lock,
+        on_elected: Callable[[], None],
+        on_demoted: Callable[[], None],
+        interval: Optional[float] = None,
+    ):
+        self._lock = lock
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self.interval = interval or settings.LEADER_POLL_SECONDS
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.is_leader = False
+        self.leader_since: Optional[datetime] = None
+        self.elections = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Try once right away (so a single worker schedules immediately), then poll."""
+        self._tick()
+        self._thread = threading.Thread(target=self._run, name="leader-elector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop polling and hand leadership back so another worker can take over."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        if self.is_leader:
+            self._demote("shutting down")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._tick()
+
+    def _tick(self) -> None:
+        try:
+            if self.is_leader:
+                if not self._lock.check():
+                    self._demote("lost leader lock")
+            elif self._lock.try_acquire():
+                self._elect()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Leader election ({self._lock.name}) failed: {e}")
+
+    def _elect(self) -> None:
+        self.is_leader = True
+        self.leader_since = datetime.utcnow()
+        self.elections += 1
+        logger.info(f"👑 Worker {os.getpid()} elected scheduler leader ({self._lock.name} lock)")
+        try:
+            self._on_elected()
+        except Exception:
+            logger.error("on_elected callback failed; stepping down", exc_info=True)
+            self._demote("on_elected failed")
+
+    def _demote(self, reason: str) -> None:
+        self.is_leader = False
+        self.leader_since = None
+        logger.warning(f"Worker {os.getpid()} stepped down as scheduler leader: {reason}")
+        try:
+            self._on_demoted()
+        except Exception:
+            logger.error("on_demoted callback failed", exc_info=True)
+        self._lock.release()
+
+    def status(self) -> dict:
+        return {
+            "backend": self._lock.name,
+            "worker_pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "leader_since": self.leader_since.isoformat() if self.leader_since else None,
+            "elections": self.elections,
+            "last_error": self.last_error,
+        }
@@ -9,11 +9,16 @@ Flow:
   3. Use Tavily to search for agricultural supply news near those locations.
   4. LLM decides whether to create alerts for mandi owners.
   5. Persist alerts into the `alerts` table with severity.
+
+Steps 1–2 run once up front (`agent_context.build_mandi_context`) and are
+passed to the LLM as a context block, unless AGENT_PRECOMPUTE_CONTEXT=false.
 """
 
 import json
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import func as sa_func
@@ -22,9 +27,12 @@ from langchain.agents import create_agent
 from langchain_core.tools import tool
 from langchain_groq import ChatGroq
 
+from agent_context import build_mandi_context, context_block, record_run, run_stats
+from alerts.fanout import save_alert_json
 from config import settings
 from database import SessionLocal
-from models import MandiFarmerOrder, MandiOwner, User, Alert
+from models import MandiFarmerOrder, MandiOwner, User
+from rate_limits import groq_rate_limiter, rate_limited_tool, tavily_rate_limiter
 
 logger = logging.getLogger("mandi_agent")
 
@@ -100,30 +108,14 @@ def get_mandi_locations(dummy: str = "") -> str:
 @tool
 def save_mandi_alert(alert_json: str) -> str:
     """
-    Save a supply alert to the database for a mandi owner.
+    Save a supply alert for mandi owners — one call covers every recipient.
     Input must be a JSON string with keys:
-      - user_id  (int)  — the mandi owner's user ID to notify
       - message  (str)  — the alert text
       - severity (str)  — one of: low, medium, high, critical
+      - user_ids (list[int], optional) — specific mandi owners; omit to alert ALL mandi owners
     Returns a confirmation message.
     """
-    db: Session = SessionLocal()
-    try:
-        data = json.loads(alert_json)
-        alert = Alert(
-            user_id=data["user_id"],
-            message=data["message"],
-            severity=data.get("severity", "medium"),
-        )
-        db.add(alert)
-        db.commit()
-        db.refresh(alert)
-        return f"Alert #{alert.id} saved for user {alert.user_id} (severity={alert.severity})."
-    except Exception as e:
-        db.rollback()
-        return f"Failed to save alert: {e}"
-    finally:
-        db.close()
+    return save_alert_json(alert_json, role="mandi_owner", scope="mandi_agent")
 
 
 @tool
@@ -170,53 +162,106 @@ INSTRUCTIONS:
    queries relevant to the items and locations.
 5. Analyse the procurement trends and news together.
 6. For each significant insight, call `save_mandi_alert` with a JSON containing:
-   - user_id: the mandi owner's user ID (send to ALL mandi owners)
    - message: a clear, actionable alert about supply or pricing changes
    - severity: "low" | "medium" | "high" | "critical"
+   Omit user_ids to send it to ALL mandi owners in one call.
 7. If there is no actionable insight, save one alert with severity "low" saying
    "No significant supply changes expected this week."
 8. Return a summary of all alerts generated."""
 
+# Used when the DB aggregates are precomputed and passed in the user message.
+CONTEXT_SYSTEM_PROMPT = """You are a supply-chain intelligence assistant for mandi (wholesale market) owners.
+Your job is to help mandi owners anticipate supply trends and price fluctuations.
+
+The user message contains a JSON context block with:
+  - procurement_7d: items farmers supplied to mandis in the past 7 days
+    (orders, total_price, avg_price_per_kg, first/last order date)
+  - mandi_owners: every mandi owner's user_id, username and lat/lng
+
+INSTRUCTIONS:
+1. Read the context block; do not ask for data it already contains.
+2. Use `tavily_search_results_json` to search for recent news about
+   "crop harvest season India", "agricultural supply shortage",
+   "farmer produce prices", "mandi wholesale market trends", or similar
+   queries relevant to the items and locations.
+3. Analyse the procurement trends and news together.
+4. For each significant insight, call `save_mandi_alert` with a JSON containing:
+   - message: a clear, actionable alert about supply or pricing changes
+   - severity: "low" | "medium" | "high" | "critical"
+   Omit user_ids to send it to ALL mandi owners in one call; pass user_ids only
+   for insights that concern specific owners.
+5. If there is no actionable insight, save one alert with severity "low" saying
+   "No significant supply changes expected this week."
+6. Return a summary of all alerts generated."""
+
+# Tools that open a DB session (counted in the run stats)
+MANDI_DB_TOOLS = {
+    "get_past_week_procurement",
+    "get_mandi_locations",
+    "get_all_mandi_owner_user_ids",
+    "save_mandi_alert",
+}
+
 
 # ── Build & run ──────────────────────────────────────────────────────────────
-def run_mandi_agent() -> str:
-    """Build the agent, invoke it, return the final answer string."""
+def run_mandi_agent(precompute: Optional[bool] = None) -> str:
+    """
+    Build the agent, invoke it, return the final answer string.
+
+    With `precompute` (default: AGENT_PRECOMPUTE_CONTEXT) the DB aggregates
+    are computed up front and passed in the message; otherwise the LLM
+    fetches them through the DB tools.
+    """
     from langchain_community.tools.tavily_search import TavilySearchResults
 
-    tavily_search = TavilySearchResults(
-        max_results=5,
-        api_key=settings.TAVILY_API_KEY,
+    precompute = settings.AGENT_PRECOMPUTE_CONTEXT if precompute is None else precompute
+    start = time.perf_counter()
+
+    tavily_search = rate_limited_tool(
+        TavilySearchResults(max_results=5, api_key=settings.TAVILY_API_KEY),
+        tavily_rate_limiter,
     )
 
     llm = ChatGroq(
         model="gpt-oss-120b",
         api_key=settings.GROQ_API_KEY,
-    )
-
-    tools = [
-        get_past_week_procurement,
-        get_mandi_locations,
-        get_all_mandi_owner_user_ids,
-        tavily_search,
-        save_mandi_alert,
-    ]
-
-    agent = create_agent(
-        llm,
-        tools=tools,
-        prompt=SYSTEM_PROMPT,
+        rate_limiter=groq_rate_limiter,
     )
 
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    result = agent.invoke({
-        "messages": [
-            ("user",
-             f"Today is {today}. Analyse past week procurement data and current "
-             f"market news to generate supply alerts for mandi owners.")
+    if precompute:
+        db: Session = SessionLocal()
+        try:
+            context = build_mandi_context(db)
+        finally:
+            db.close()
+        tools = [tavily_search, save_mandi_alert]
+        prompt = CONTEXT_SYSTEM_PROMPT
+        message = (
+            f"Today is {today}. Using the context below and current market news, "
+            f"generate supply alerts for mandi owners.\n\nCONTEXT:\n{context_block(context)}"
+        )
+    else:
+        tools = [
+            get_past_week_procurement,
+            get_mandi_locations,
+            get_all_mandi_owner_user_ids,
+            tavily_search,
+            save_mandi_alert,
         ]
-    })
+        prompt = SYSTEM_PROMPT
+        message = (
+            f"Today is {today}. Analyse past week procurement data and current "
+            f"market news to generate supply alerts for mandi owners."
+        )
+
+    agent = create_agent(llm, tools=tools, system_prompt=prompt)
+    result = agent.invoke({"messages": [("user", message)]})
 
     messages = result.get("messages", [])
+    stats = run_stats(messages, time.perf_counter() - start, precompute, MANDI_DB_TOOLS)
+    record_run("mandi", stats)
+    logger.info(f"Mandi agent run: {stats}")
     if messages:
         return messages[-1].content
     return "Agent completed without output."
@@ -0,0 +1,321 @@
+"""
+Backtesting for the price forecasters and the farmer sell-timing advice.
+
+Farmer → mandi orders (from the database or a CSV with the same columns)
+become one daily price series per crop and destination mandi (quantity-
+weighted average price). Each crop is replayed with rolling origins: at
+every origin day the forecasters see only the prices up to that day and
+forecast the next `horizon` days, which are scored against what actually
+happened. Crops run in parallel on a process pool.
+
+Reported per model, per crop and per horizon day:
+- MAPE: mean |actual − forecast| / actual over days that had orders;
+- coverage: share of those actuals inside the prediction interval (models
+  without intervals report None);
+- sell timing: `farmer.sell_timing.sell_timing_decision` fed the model's
+  forecast, scored by the realised price on the day it picks vs selling at
+  the origin ("uplift"; > 0 means waiting paid off).
+
+A synthetic dataset (`synthetic_orders`, stored at SYNTHETIC_ORDERS_CSV)
+keeps CI runs deterministic.
+
+Usage:
+    orders = orders_from_csv(SYNTHETIC_ORDERS_CSV)           # or orders_from_db(db)
+    report = run_backtest(orders, models=["holt_damped", "last5_trend"], horizon=7)
+    report["models"]["holt_damped"]["overall"]["mape"]       # per horizon day
+"""
+
+import csv
+import math
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from farmer.sell_timing import sell_timing_decision, trend_forecast
+from mandi.forecasting import fit_holt_damped, forecast_holt_damped
+from mandi.supply_chain import CROPS
+
+ORDER_COLUMNS = ("order_date", "item", "dest_lat", "dest_long", "price_per_kg", "quantity")
+SYNTHETIC_ORDERS_CSV = os.path.join(os.path.dirname(__file__), "data", "synthetic_orders.csv")
+MIN_TRAIN_OBS = 5       # observed days a series needs at an origin to be forecast
+
+
+# ── Forecasters ──────────────────────────────────────────────────────────────
+# Each takes a (series × days) price matrix (NaN = no orders) and returns
+# (mean, lower, upper), each (series × horizon); lower/upper None = no interval.
+def _holt_damped(prices: np.ndarray, horizon: int, coverage: float):
+    return forecast_holt_damped(fit_holt_damped(prices), horizon, coverage)
+
+
+def _days_since_observed(prices: np.ndarray) -> np.ndarray:
+    """Per series, days from the last observed price to the origin (the last column)."""
+    observed = ~np.isnan(prices)
+    return np.argmax(observed[:, ::-1], axis=1)
+
+
+def _last5_trend(prices: np.ndarray, horizon: int, coverage: float):
+    """
+    The sell-timing forecast (straight line through the last five observed
+    prices), projected from the last observed day across any order-less days
+    up to the origin, so step h lands on origin + h like the other models.
+    """
+    gaps = _days_since_observed(prices)
+    mean = np.array([
+        trend_forecast(row[~np.isnan(row)], horizon + gap)[gap:]
+        for row, gap in zip(prices, gaps)
+    ])
+    return mean, None, None
+
+
+def _naive(prices: np.ndarray, horizon: int, coverage: float):
+    """Last observed price; random-walk interval from the day-to-day changes (widened over order-less days)."""
+    last = np.array([row[~np.isnan(row)][-1] for row in prices])
+    steps = np.array([np.std(np.diff(row[~np.isnan(row)])) if (~np.isnan(row)).sum() > 2 else 0.0 for row in prices])
+    mean = np.repeat(last[:, None], horizon, axis=1)
+    sd = steps[:, None] * np.sqrt(np.arange(1, horizon + 1) + _days_since_observed(prices)[:, None])
+    z = NormalDist().inv_cdf(0.5 + coverage / 2)
+    return mean, np.maximum(mean - z * sd, 0.0), mean + z * sd
+
+
+FORECASTERS = {
+    "holt_damped": _holt_damped,
+    "last5_trend": _last5_trend,
+    "naive": _naive,
+}
+
+
+# ── Order data ───────────────────────────────────────────────────────────────
+def orders_from_db(db, since: Optional[date] = None) -> List[dict]:
+    """Farmer → mandi orders with a date and price."""
+    from sqlalchemy import select
+    from models import MandiFarmerOrder
+
+    query = select(*(getattr(MandiFarmerOrder, c) for c in ORDER_COLUMNS)).where(
+        MandiFarmerOrder.order_date.isnot(None), MandiFarmerOrder.price_per_kg.isnot(None),
+    )
+    if since is not None:
+        query = query.where(MandiFarmerOrder.order_date >= since)
+    return [
+        {
+            "order_date": r.order_date,
+            "item": r.item or "unknown",
+            "dest_lat": float(r.dest_lat) if r.dest_lat is not None else None,
+            "dest_long": float(r.dest_long) if r.dest_long is not None else None,
+            "price_per_kg": float(r.price_per_kg),
+            "quantity": float(r.quantity) if r.quantity is not None else None,
+        }
+        for r in db.execute(query)
+    ]
+
+
+def orders_from_csv(path: str) -> List[dict]:
+    def number(value: str) -> Optional[float]:
+        return float(value) if value else None
+
+    with open(path, newline="") as f:
+        return [
+            {
+                "order_date": date.fromisoformat(row["order_date"]),
+                "item": row["item"],
+                "dest_lat": number(row["dest_lat"]),
+                "dest_long": number(row["dest_long"]),
+                "price_per_kg": float(row["price_per_kg"]),
+                "quantity": number(row["quantity"]),
+            }
+            for row in csv.DictReader(f)
+        ]
+
+
+def write_orders_csv(path: str, orders: List[dict]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=ORDER_COLUMNS)
+        writer.writeheader()
+        for o in orders:
+            writer.writerow({**o, "order_date": o["order_date"].isoformat()})
+
+
+def synthetic_orders(mandis: int = 4, days: int = 150, seed: int = 7, end: date = date(2025, 12, 31)) -> List[dict]:
+    """
+    Orders for every crop at `mandis` locations over `days`: a mean-reverting
+    price with slow trends, a weekly cycle and noise, 1–4 orders on ~80% of days.
+    """
+    rng = random.Random(seed)
+    start = end - timedelta(days=days - 1)
+    orders = []
+    for m in range(mandis):
+        lat, lng = round(12.9 + 0.05 * m, 4), round(77.5 + 0.05 * m, 4)
+        for crop in CROPS:
+            base = crop["base_price"] * rng.uniform(0.9, 1.1)
+            level, drift = base, 0.0
+            for d in range(days):
+                drift = 0.9 * drift + rng.gauss(0, crop["volatility"] * 0.3)
+                level = max(base * 0.5, level + drift + 0.05 * (base - level))
+                day_price = level * (1 + 0.03 * math.sin(2 * math.pi * d / 7))
+                if rng.random() < 0.2:
+                    continue
+                for _ in range(rng.randint(1, 4)):
+                    orders.append({
+                        "order_date": start + timedelta(days=d),
+                        "item": crop["name"].lower(),
+                        "dest_lat": lat,
+                        "dest_long": lng,
+                        "price_per_kg": round(day_price * (1 + rng.gauss(0, 0.02)), 2),
+                        "quantity": rng.choice([None, 50, 100, 250, 500]),
+                    })
+    return orders
+
+
+def daily_prices(orders: List[dict]) -> Dict[str, dict]:
+    """Per crop: {"series": [mandi location], "days": [date], "prices": (series × days) ndarray}."""
+    totals = defaultdict(lambda: [0.0, 0.0, 0.0, 0])   # value, kg, Σ price, orders
+    for o in orders:
+        if o["dest_lat"] is None or o["dest_long"] is None:
+            continue
+        location = (round(o["dest_lat"], 3), round(o["dest_long"], 3))
+        t = totals[(o["item"].lower(), location, o["order_date"])]
+        if o["quantity"]:
+            t[0] += o["price_per_kg"] * o["quantity"]
+            t[1] += o["quantity"]
+        t[2] += o["price_per_kg"]
+        t[3] += 1
+
+    by_crop = defaultdict(dict)
+    for (crop, location, day), (value, kg, price_sum, count) in totals.items():
+        by_crop[crop][(location, day)] = value / kg if kg else price_sum / count
+
+    result = {}
+    for crop, points in by_crop.items():
+        first, last = min(day for _, day in points), max(day for _, day in points)
+        days = [first + timedelta(days=d) for d in range((last - first).days + 1)]
+        series = sorted({location for location, _ in points})
+        prices = np.full((len(series), len(days)), np.nan)
+        row_of = {location: i for i, location in enumerate(series)}
+        for (location, day), price in points.items():
+            prices[row_of[location], (day - first).days] = price
+        result[crop] = {"series": series, "days": days, "prices": prices}
+    return result
+
+
+# ── Replay ───────────────────────────────────────────────────────────────────
+def _empty_scores(horizon: int) -> dict:
+    return {
+        "ape_sum": np.zeros(horizon), "ape_n": np.zeros(horizon),
+        "covered": np.zeros(horizon), "cover_n": np.zeros(horizon),
+        "uplift_sum": 0.0, "decisions": 0, "waits": 0, "wins": 0,
+    }
+
+
+def backtest_crop(crop: str, prices: np.ndarray, models: Sequence[str], horizon: int, coverage: float,
+                  min_train: int, step: int) -> dict:
+    """Rolling-origin scores of `models` on one crop's (series × days) prices."""
+    scores = {name: _empty_scores(horizon) for name in models}
+    n_days = prices.shape[1]
+    for origin in range(min_train - 1, n_days - 1, step):
+        train = prices[:, :origin + 1]
+        eligible = (~np.isnan(train)).sum(axis=1) >= MIN_TRAIN_OBS
+        if not eligible.any():
+            continue
+        train = train[eligible]
+        actual = np.full((len(train), horizon), np.nan)
+        ahead = prices[eligible, origin + 1:origin + 1 + horizon]
+        actual[:, :ahead.shape[1]] = ahead
+        scored = ~np.isnan(actual) & (actual > 0)
+        today = train[:, -1]
+
+        for name in models:
+            mean, lower, upper = FORECASTERS[name](train, horizon, coverage)
+            s = scores[name]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ape = np.abs(actual - mean) / actual
+            s["ape_sum"] += np.where(scored, ape, 0.0).sum(axis=0)
+            s["ape_n"] += scored.sum(axis=0)
+            if lower is not None:
+                inside = scored & (actual >= lower) & (actual <= upper)
+                s["covered"] += inside.sum(axis=0)
+                s["cover_n"] += scored.sum(axis=0)
+
+            # Sell timing: decide at the origin (if it had a price), realise the chosen day's price
+            for i in np.flatnonzero(~np.isnan(today)):
+                action, best_idx = sell_timing_decision(today[i], mean[i])
+                realised = today[i] if best_idx is None else actual[i, best_idx]
+                if np.isnan(realised):
+                    continue
+                uplift = realised / today[i] - 1
+                s["uplift_sum"] += uplift
+                s["decisions"] += 1
+                if best_idx is not None:
+                    s["waits"] += 1
+                    s["wins"] += uplift > 0
+    return {"crop": crop, "scores": scores}
+
+
+def _backtest_task(args: tuple) -> dict:
+    return backtest_crop(*args)
+
+
+def _summarise(s: dict) -> dict:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mape = s["ape_sum"] / s["ape_n"]
+        cover = s["covered"] / s["cover_n"]
+    has_interval = s["cover_n"].sum() > 0
+    return {
+        "mape": [round(float(v), 4) if np.isfinite(v) else None for v in mape],
+        "mean_mape": round(float(s["ape_sum"].sum() / s["ape_n"].sum()), 4) if s["ape_n"].sum() else None,
+        "coverage": [round(float(v), 4) if np.isfinite(v) else None for v in cover] if has_interval else None,
+        "mean_coverage": round(float(s["covered"].sum() / s["cover_n"].sum()), 4) if has_interval else None,
+        "points": int(s["ape_n"].sum()),
+        "sell_timing": {
+            "decisions": s["decisions"],
+            "wait_rate": round(s["waits"] / s["decisions"], 4) if s["decisions"] else None,
+            "wait_win_rate": round(s["wins"] / s["waits"], 4) if s["waits"] else None,
+            "mean_uplift": round(s["uplift_sum"] / s["decisions"], 5) if s["decisions"] else None,
+        },
+    }
+
+
+def run_backtest(
+    orders: List[dict],
+    models: Sequence[str] = tuple(FORECASTERS),
+    horizon: int = 7,
+    coverage: float = 0.8,
+    min_train: int = 28,
+    step: int = 1,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Replay every crop in `orders` (in parallel, `workers` processes; 1 =
+    in-process) and return {"config", "models": {name: {"overall", "crops"}}}.
+    """
+    unknown = [m for m in models if m not in FORECASTERS]
+    if unknown:
+        raise ValueError(f"Unknown forecaster(s): {', '.join(unknown)}")
+    crops = daily_prices(orders)
+    tasks = [(crop, data["prices"], list(models), horizon, coverage, min_train, step) for crop, data in sorted(crops.items())]
+    if workers == 1 or len(tasks) <= 1:
+        results = [_backtest_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_backtest_task, tasks))
+
+    report = {
+        "config": {"horizon": horizon, "coverage": coverage, "min_train": min_train, "step": step,
+                   "crops": len(crops), "orders": len(orders)},
+        "models": {},
+    }
+    for name in models:
+        overall = _empty_scores(horizon)
+        per_crop = {}
+        for result in results:
+            s = result["scores"][name]
+            per_crop[result["crop"]] = _summarise(s)
+            for key in overall:
+                overall[key] = overall[key] + s[key]
+        report["models"][name] = {"overall": _summarise(overall), "crops": per_crop}
+    return report
@@ -0,0 +1,185 @@
+"""
+Response cache for the supply-chain dashboard endpoints.
+
+The dashboard polls /api/mandi/supply-chain/* every few seconds, but the
+simulated data only changes per UTC day (stress signals: per 3-hour bucket).
+Each response is cached as serialized JSON under
+(endpoint, mandi, time bucket, params) until its bucket ends, and carries an
+ETag and Last-Modified; a poll presenting a matching If-None-Match (or an
+If-Modified-Since at or after Last-Modified) gets an empty 304.
+
+Simulated responses are fixed for their bucket, so their ETag is derived
+from the cache key and is identical on every worker. Responses built from a
+mandi's own orders (the rollup overview) are hashed from the body instead,
+are cached for at most DASHBOARD_CACHE_ORDERS_TTL_SECONDS, and are dropped
+as soon as a commit in this process touches that mandi's orders or inventory.
+
+Usage:
+    @router.get("/supply-chain/stress")
+    def supply_stress(request: Request):
+        return cached_json_response(request, dashboard_entry("stress", detect_stress_signals, stress_bucket()))
+
+    entry = dashboard_entry("stress", detect_stress_signals, stress_bucket())
+    entry.value            # the computed result (shared; do not mutate)
+"""
+
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from config import settings
+from models import MandiItem
+
+# Session.info key: mandi owner ids whose orders/inventory changed in this transaction
+CHANGED_MANDIS_KEY = "dashboard_changed_mandis"
+
+
+@dataclass(frozen=True)
+class TimeBucket:
+    label: str
+    start: datetime
+    end: datetime
+
+    def remaining_seconds(self, now: datetime) -> float:
+        return max(1.0, (self.end - now).total_seconds())
+
+
+def day_bucket(now: Optional[datetime] = None) -> TimeBucket:
+    """The current UTC day (what `_seed()`-based data is fixed for)."""
+    now = now or datetime.utcnow()
+    start = datetime(now.year, now.month, now.day)
+    return TimeBucket(start.strftime("%Y-%m-%d"), start, start + timedelta(days=1))
+
+
+def stress_bucket(now: Optional[datetime] = None) -> TimeBucket:
+    """The current 3-hour UTC bucket (what `detect_stress_signals` is seeded with)."""
+    now = now or datetime.utcnow()
+    start = datetime(now.year, now.month, now.day, now.hour - now.hour % 3)
+    return TimeBucket(start.strftime("%Y-%m-%dT%H"), start, start + timedelta(hours=3))
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    value: Any
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+_responses = TTLCache(maxsize=settings.DASHBOARD_CACHE_SIZE, ttl=86400)
+_generations: Dict[int, int] = defaultdict(int)
+_generations_lock = threading.Lock()
+
+
+def _generation(mandi_id: Optional[int]) -> int:
+    if mandi_id is None:
+        return 0
+    with _generations_lock:
+        return _generations[mandi_id]
+
+
+def dashboard_entry(
+    endpoint: str,
+    compute: Callable[[], Any],
+    bucket: TimeBucket,
+    mandi_id: Optional[int] = None,
+    params: Tuple[Hashable, ...] = (),
+    from_orders: bool = False,
+) -> CachedResponse:
+    """
+    The cached response for (endpoint, mandi, bucket, params), computing it on
+    a miss. `from_orders` marks a result read from the mandi's own data
+    (body-hashed ETag, short TTL, invalidated on writes).
+    """
+    key = (endpoint, mandi_id, _generation(mandi_id), bucket.label, params)
+    entry = _responses.get(key)
+    if entry is not None:
+        return entry
+
+    now = datetime.utcnow()
+    value = compute()
+    body = json.dumps(jsonable_encoder(value), ensure_ascii=False, separators=(",", ":")).encode()
+    digest = hashlib.sha1(body if from_orders else repr(key).encode()).hexdigest()[:20]
+    ttl = bucket.remaining_seconds(now)
+    if from_orders:
+        ttl = min(ttl, settings.DASHBOARD_CACHE_ORDERS_TTL_SECONDS)
+    entry = CachedResponse(
+        value=value,
+        body=body,
+        etag=f'W/"{digest}"',
+        last_modified=now.replace(microsecond=0) if from_orders else bucket.start,
+    )
+    _responses.set(key, entry, ttl=ttl)
+    return entry
+
+
+def _not_modified(request: Request, entry: CachedResponse) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison; If-None-Match takes precedence over If-Modified-Since
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or entry.etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.replace(tzinfo=None) - (since.utcoffset() or timedelta(0))
+        return entry.last_modified <= since
+    return False
+
+
+def cached_json_response(request: Request, entry: CachedResponse) -> Response:
+    """200 with the cached body, or an empty 304 if the client's copy is current."""
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def mark_mandi_changed(session: Session, mandi_id: int) -> None:
+    """Drop `mandi_id`'s cached order-based responses once `session` commits."""
+    session.info.setdefault(CHANGED_MANDIS_KEY, set()).add(mandi_id)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_inventory_changes(session: Session, flush_context, instances) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        mandi_id = inspect(obj).dict.get("mandi_owner_id") if isinstance(obj, MandiItem) else None
+        if mandi_id is not None:
+            mark_mandi_changed(session, mandi_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_generations(session: Session) -> None:
+    changed = session.info.pop(CHANGED_MANDIS_KEY, None)
+    if changed:
+        with _generations_lock:
+            for mandi_id in changed:
+                _generations[mandi_id] += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session: Session) -> None:
+    session.info.pop(CHANGED_MANDIS_KEY, None)
+
+
+def dashboard_cache_stats() -> dict:
+    return _responses.stats()
@@ -0,0 +1,195 @@
+"""
+Batch price forecasting: Holt's linear method with a damped trend, fitted
+and projected for every price series at once with NumPy.
+
+A series is one row of a dense (series × days) price matrix with NaN on
+days without a price (for orders: `mandi.rollup.price_history`, one row per
+mandi and item); a missing day advances the level along the damped trend
+without a correction.
+
+Smoothing parameters are chosen per series by grid search: every candidate
+(alpha, beta, phi) is run over a chunk of series in the same vectorized pass
+over the days, and each series keeps the candidate with the lowest one-step
+squared error. Prediction intervals use the ETS(A,Ad,N) forecast variance
+
+    var(h) = σ² · (1 + Σ_{j<h} (alpha + beta · (φ + … + φ^j))²)
+
+with σ² the series' one-step error variance (the median relative error
+across series stands in for series with too few observations).
+
+Usage:
+    fit = fit_holt_damped(prices)                   # prices: (series, days) ndarray
+    mean, lower, upper = forecast_holt_damped(fit, horizon=7, coverage=0.8)
+
+    series_forecasts(names, emojis, days, prices, horizon=7, coverage=0.8)   # forecast_prices() entries
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from statistics import NormalDist
+from typing import List, Tuple
+
+import numpy as np
+
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.01, 0.05, 0.1, 0.2)
+PHIS = (0.8, 0.9, 0.98)
+SERIES_CHUNK = 512      # series per smoothing pass
+MIN_ERRORS = 3          # one-step errors needed before a series' own σ is trusted
+
+
+@dataclass
+class HoltFit:
+    level: np.ndarray
+    trend: np.ndarray
+    alpha: np.ndarray
+    beta: np.ndarray
+    phi: np.ndarray
+    sigma: np.ndarray
+    observations: np.ndarray        # observed days per series
+
+
+# ── Engine ───────────────────────────────────────────────────────────────────
+def _grid(alphas, betas, phis) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    a, b, p = np.meshgrid(alphas, betas, phis, indexing="ij")
+    return a.ravel(), b.ravel(), p.ravel()
+
+
+def _smooth(filled: np.ndarray, scored: np.ndarray, first: np.ndarray, a, b, p) -> Tuple[np.ndarray, ...]:
+    """
+    Run every grid candidate over one chunk of series. `filled` / `scored` are
+    (days, N): the price (0 if missing) and whether its one-step error counts.
+    Returns the (G, N) final level, trend and sum of squared errors.
+    """
+    level = np.broadcast_to(first, (a.shape[0], first.shape[0])).copy()
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+    predicted, e, scratch = (np.empty_like(level) for _ in range(3))
+    for t in range(filled.shape[0]):
+        # In place: fresh (G, N) temporaries per day would dominate the run time
+        np.multiply(p, trend, out=scratch)
+        np.add(level, scratch, out=predicted)
+        np.subtract(filled[t], predicted, out=e)
+        e *= scored[t]
+        np.multiply(a, e, out=scratch)
+        np.add(predicted, scratch, out=level)
+        trend *= p
+        np.multiply(b, e, out=scratch)
+        trend += scratch
+        np.multiply(e, e, out=scratch)
+        sse += scratch
+    return level, trend, sse
+
+
+def fit_holt_damped(
+    prices: np.ndarray,
+    alphas=ALPHAS,
+    betas=BETAS,
+    phis=PHIS,
+) -> HoltFit:
+    """
+    Fit every row of `prices` (series × days, NaN = missing) over the
+    (alpha, beta, phi) grid. Rows need at least one observation.
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_series, n_days = prices.shape
+    observed = ~np.isnan(prices)
+    if not observed.any(axis=1).all():
+        raise ValueError("Every series needs at least one observed price")
+
+    a, b, p = (g[:, None] for g in _grid(alphas, betas, phis))      # (G, 1)
+    first = prices[np.arange(n_series), observed.argmax(axis=1)]     # first observed price
+    # Before its first observation a series sits at level = first, trend = 0,
+    # so that observation gives a zero error; errors count from the next one
+    scored = (observed & (np.cumsum(observed, axis=1) > 1)).T.copy()   # (days, N), contiguous per day
+    filled = np.where(observed, prices, 0.0).T.copy()
+    errors = scored.sum(axis=0)
+
+    level, trend, sse = np.empty(n_series), np.empty(n_series), np.empty(n_series)
+    best = np.zeros(n_series, dtype=int)
+    # Chunks of series keep the (G, chunk) state in CPU cache
+    for lo in range(0, n_series, SERIES_CHUNK):
+        hi = min(lo + SERIES_CHUNK, n_series)
+        grid_level, grid_trend, grid_sse = _smooth(filled[:, lo:hi], scored[:, lo:hi], first[lo:hi], a, b, p)
+        pick = grid_sse.argmin(axis=0)
+        cols = np.arange(hi - lo)
+        best[lo:hi] = pick
+        level[lo:hi], trend[lo:hi], sse[lo:hi] = grid_level[pick, cols], grid_trend[pick, cols], grid_sse[pick, cols]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt(sse / errors)
+        relative = sigma / np.abs(level)
+    enough = (errors >= MIN_ERRORS) & np.isfinite(relative)
+    fallback = np.median(relative[enough]) if enough.any() else 0.1
+    sigma = np.where(enough, sigma, fallback * np.abs(level))
+
+    return HoltFit(
+        level=level, trend=trend,
+        alpha=a[best, 0], beta=b[best, 0], phi=p[best, 0],
+        sigma=sigma, observations=observed.sum(axis=1),
+    )
+
+
+def forecast_holt_damped(fit: HoltFit, horizon: int, coverage: float = 0.8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(mean, lower, upper), each (series × horizon); prices are floored at 0."""
+    steps = np.arange(1, horizon + 1)
+    # φ_h = φ + φ² + … + φ^h
+    damp = np.cumsum(fit.phi[:, None] ** steps, axis=1)
+    mean = fit.level[:, None] + damp * fit.trend[:, None]
+
+    c = fit.alpha[:, None] + fit.beta[:, None] * damp                 # c_j for j = 1..horizon
+    spread = np.concatenate([np.zeros((len(fit.level), 1)), np.cumsum(c[:, :-1] ** 2, axis=1)], axis=1)
+    sd = fit.sigma[:, None] * np.sqrt(1.0 + spread)
+    z = NormalDist().inv_cdf(0.5 + coverage / 2)
+    return np.maximum(mean, 0.0), np.maximum(mean - z * sd, 0.0), np.maximum(mean + z * sd, 0.0)
+
+
+# ── Dashboard shape ──────────────────────────────────────────────────────────
+def _trend_label(trend_pct: float) -> str:
+    return "up" if trend_pct > 2 else "down" if trend_pct < -2 else "stable"
+
+
+def series_forecasts(
+    names: List[str],
+    emojis: List[str],
+    days: List[date],
+    prices: np.ndarray,
+    horizon: int,
+    coverage: float,
+    history_days: int = 14,
+) -> List[dict]:
+    """Fit and forecast `prices` (one row per name) into the `forecast_prices()` entry shape."""
+    fit = fit_holt_damped(prices)
+    mean, lower, upper = forecast_holt_damped(fit, horizon, coverage)
+    start = days[-1] if days else datetime.utcnow().date()
+    dates = [(start + timedelta(days=h)).isoformat() for h in range(1, horizon + 1)]
+
+    entries = []
+    for i, name in enumerate(names):
+        row = prices[i]
+        seen = np.flatnonzero(~np.isnan(row))
+        current = float(row[seen[-1]])
+        final = float(mean[i, -1]) if horizon else current
+        trend_pct = round((final - current) / current * 100, 1) if current else 0.0
+        entries.append({
+            "crop": name, "emoji": emojis[i],
+            "current_price": round(current, 2),
+            "predicted_price_7d": round(final, 2),
+            "trend_pct": trend_pct,
+            "trend": _trend_label(trend_pct),
+            "history": [
+                {"date": days[d].isoformat(), "price": round(float(row[d]), 2)}
+                for d in seen if d >= len(days) - history_days
+            ],
+            "forecast": [
+                {
+                    "date": dates[h],
+                    "price": round(float(mean[i, h]), 2),
+                    "lower": round(float(lower[i, h]), 2),
+                    "upper": round(float(upper[i, h]), 2),
+                }
+                for h in range(horizon)
+            ],
+            "volatility": round(float(fit.sigma[i] / abs(fit.level[i])), 3) if fit.level[i] else None,
+        })
+    return entries
@@ -0,0 +1,497 @@
+"""
+Daily supply rollup per mandi, item and day.
+
+Orders carry coordinates, not a mandi id: a farmer → mandi order belongs to
+the mandi owner located at its destination, a mandi → retailer order to the
+one at its source (within MANDI_MATCH_DEG, ~100 m), looked up in a cached
+grid of mandi locations that mandi owner / location writes invalidate.
+Every ORM insert, update or delete of a `MandiFarmerOrder` /
+`RetailerMandiOrder` applies its delta to `mandi_daily_rollup` on the same
+connection, inside the same transaction (an update subtracts the old
+contribution and adds the new one).
+
+Bulk `update()` / `delete()` statements and raw SQL bypass the ORM events;
+run `python backfill_supply_rollup.py` after those (and once after the
+migration) to rebuild the table from the orders.
+
+Usage:
+    import mandi.rollup            # registers the ORM listeners
+    rows = mandi_rollup(db, mandi_owner_id, since=date.today() - timedelta(days=13))
+    overview = rollup_overview(db, mandi_owner_id)   # None → no data, use the simulation
+    forecast = orders_forecast(db, mandi_owner_id, days=7)
+    rebuild_rollup(db)             # full rebuild (or since=date)
+"""
+
+import logging
+import math
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, object_session
+
+from cache import TTLCache
+from config import settings
+from mandi.dashboard_cache import mark_mandi_changed
+from mandi.forecasting import series_forecasts
+from mandi.supply_chain import CROPS, TRUCKS
+from models import MandiDailyRollup, MandiFarmerOrder, MandiItem, MandiOwner, RetailerMandiOrder, User
+
+logger = logging.getLogger("mandi_rollup")
+
+MANDI_MATCH_DEG = 0.001
+MEASURES = ("orders", "kg", "value", "price_sum")
+
+# model → (rollup side, coordinates that locate the mandi)
+SIDES = {
+    MandiFarmerOrder: ("inbound", "dest_lat", "dest_long"),
+    RetailerMandiOrder: ("outbound", "src_lat", "src_long"),
+}
+
+_ZERO = Decimal(0)
+
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else _ZERO
+
+
+# ── Mandi lookup ─────────────────────────────────────────────────────────────
+# Grid of mandi locations, invalidated when a mandi owner or its location changes
+# through the ORM (the TTL covers raw SQL). A miss is answered from the grid, so
+# orders not at any mandi cost no query.
+_locations = TTLCache(maxsize=1, ttl=300)
+_grid_lock = threading.Lock()
+_grid_generation = 0
+_LOCATIONS_CHANGED_KEY = "mandi_locations_changed"
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / MANDI_MATCH_DEG), math.floor(lng / MANDI_MATCH_DEG)
+
+
+def _load_locations(connection) -> Dict[Tuple[int, int], List[tuple]]:
+    rows = connection.execute(
+        select(MandiOwner.id, User.latitude, User.longitude)
+        .join(User, User.id == MandiOwner.user_id)
+        .where(User.latitude.isnot(None), User.longitude.isnot(None))
+        .order_by(MandiOwner.id)
+    ).all()
+    grid = defaultdict(list)
+    for mandi_id, lat, lng in rows:
+        grid[_cell(float(lat), float(lng))].append((float(lat), float(lng), mandi_id))
+    return grid
+
+
+def _match(grid, lat: float, lng: float) -> Optional[int]:
+    row, col = _cell(lat, lng)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            for m_lat, m_lng, mandi_id in grid.get((row + dr, col + dc), ()):
+                if abs(m_lat - lat) < MANDI_MATCH_DEG and abs(m_lng - lng) < MANDI_MATCH_DEG:
+                    return mandi_id
+    return None
+
+
+def invalidate_mandi_locations() -> None:
+    """Drop the cached grid (a load that started before this call is not cached)."""
+    global _grid_generation
+    with _grid_lock:
+        _grid_generation += 1
+        _locations.invalidate("grid")
+
+
+def _mandi_grid(connection) -> Dict[Tuple[int, int], List[tuple]]:
+    grid = _locations.get("grid")
+    if grid is None:
+        with _grid_lock:
+            generation = _grid_generation
+        grid = _load_locations(connection)
+        with _grid_lock:
+            if generation == _grid_generation:
+                _locations.set("grid", grid)
+    return grid
+
+
+def mandi_at(connection, lat, lng, grid=None) -> Optional[int]:
+    """MandiOwner id located at (lat, lng), from `grid` or the cached grid of mandi locations."""
+    if lat is None or lng is None:
+        return None
+    return _match(grid if grid is not None else _mandi_grid(connection), float(lat), float(lng))
+
+
+def _locations_changed(target) -> None:
+    # Now for this transaction's later lookups, and again once it commits or
+    # rolls back, so a grid loaded from uncommitted rows is not kept
+    invalidate_mandi_locations()
+    session = object_session(target)
+    if session is not None:
+        session.info[_LOCATIONS_CHANGED_KEY] = True
+
+
+def _mandi_owner_changed(mapper, connection, target) -> None:
+    _locations_changed(target)
+
+
+def _user_changed(mapper, connection, target) -> None:
+    if target.role != "mandi_owner":
+        return
+    state = inspect(target)
+    if state.attrs.latitude.history.has_changes() or state.attrs.longitude.history.has_changes():
+        _locations_changed(target)
+
+
+def _user_deleted(mapper, connection, target) -> None:
+    if target.role == "mandi_owner":
+        _locations_changed(target)
+
+
+def _transaction_ended(session: Session) -> None:
+    if session.info.pop(_LOCATIONS_CHANGED_KEY, False):
+        invalidate_mandi_locations()
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(MandiOwner, _event, _mandi_owner_changed)
+event.listen(User, "after_update", _user_changed)
+event.listen(User, "after_delete", _user_deleted)
+event.listen(Session, "after_commit", _transaction_ended)
+event.listen(Session, "after_rollback", _transaction_ended)
+
+
+# ── Incremental maintenance (ORM events) ─────────────────────────────────────
+def _contribution(values: dict, side: str, lat_attr: str, lng_attr: str, connection) -> Optional[tuple]:
+    """(rollup key, measures) one order adds, or None if it cannot be attributed."""
+    if values["order_date"] is None:
+        return None
+    mandi_id = mandi_at(connection, values[lat_attr], values[lng_attr])
+    if mandi_id is None:
+        return None
+    qty, price = _dec(values["quantity"]), _dec(values["price_per_kg"])
+    key = (mandi_id, values["item"] or "unknown", values["order_date"])
+    return key, {
+        f"{side}_orders": 1,
+        f"{side}_kg": qty,
+        f"{side}_value": qty * price,
+        f"{side}_price_sum": price,
+    }
+
+
+def _upsert_increment(connection, key: tuple, measures: dict, sign: int) -> None:
+    mandi_id, item, day = key
+    deltas = {name: value * sign for name, value in measures.items()}
+    dialect = connection.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    row = {f"{side}_{m}": 0 for side in ("inbound", "outbound") for m in MEASURES}
+    row.update(mandi_owner_id=mandi_id, item=item, day=day, **deltas)
+    stmt = insert(MandiDailyRollup).values(row)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["mandi_owner_id", "item", "day"],
+        set_={name: getattr(MandiDailyRollup, name) + getattr(stmt.excluded, name) for name in deltas},
+    ))
+
+
+def _tracked(model) -> Tuple[str, ...]:
+    _, lat_attr, lng_attr = SIDES[model]
+    return "item", "order_date", "quantity", "price_per_kg", lat_attr, lng_attr
+
+
+def _current(target) -> dict:
+    return {name: getattr(target, name) for name in _tracked(type(target))}
+
+
+def _previous(target) -> dict:
+    """Attribute values as loaded, before this flush's changes."""
+    state = inspect(target)
+    values = {}
+    for name in _tracked(type(target)):
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    return values
+
+
+def _apply(connection, target, values: dict, sign: int) -> None:
+    side, lat_attr, lng_attr = SIDES[type(target)]
+    contribution = _contribution(values, side, lat_attr, lng_attr, connection)
+    if contribution is not None:
+        _upsert_increment(connection, *contribution, sign)
+        session = object_session(target)
+        if session is not None:
+            mark_mandi_changed(session, contribution[0][0])
+
+
+def _after_insert(mapper, connection, target) -> None:
+    _apply(connection, target, _current(target), +1)
+
+
+def _after_delete(mapper, connection, target) -> None:
+    _apply(connection, target, _previous(target), -1)
+
+
+def _after_update(mapper, connection, target) -> None:
+    before, after = _previous(target), _current(target)
+    if before == after:
+        return
+    _apply(connection, target, before, -1)
+    _apply(connection, target, after, +1)
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+for _model in SIDES:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+    # Load the previous value on assignment (even if expired) so updates can subtract it
+    for _name in _tracked(_model):
+        event.listen(getattr(_model, _name), "set", _keep_old_value, active_history=True, retval=True)
+
+
+# ── Reads ────────────────────────────────────────────────────────────────────
+def mandi_rollup(db: Session, mandi_owner_id: int, since: date) -> List[MandiDailyRollup]:
+    """Rollup rows of one mandi from `since` on (one index range scan)."""
+    return db.scalars(
+        select(MandiDailyRollup)
+        .where(MandiDailyRollup.mandi_owner_id == mandi_owner_id, MandiDailyRollup.day >= since)
+    ).all()
+
+
+def _avg_price(rows: List[MandiDailyRollup], side: str) -> Optional[float]:
+    kg = sum(getattr(r, f"{side}_kg") for r in rows)
+    if kg:
+        return float(sum(getattr(r, f"{side}_value") for r in rows) / kg)
+    orders = sum(getattr(r, f"{side}_orders") for r in rows)
+    return float(sum(getattr(r, f"{side}_price_sum") for r in rows) / orders) if orders else None
+
+
+def _distinct_counterparties(db: Session, model, near: tuple, far: tuple, lat: float, lng: float, since: date) -> int:
+    """Distinct far-end locations of `model` orders whose near end is this mandi (bbox on the near-end index)."""
+    near_lat, near_lng = near
+    points = (
+        select(far[0], far[1])
+        .where(
+            near_lat.between(lat - MANDI_MATCH_DEG, lat + MANDI_MATCH_DEG),
+            near_lng.between(lng - MANDI_MATCH_DEG, lng + MANDI_MATCH_DEG),
+            model.order_date >= since,
+        )
+        .distinct()
+        .subquery()
+    )
+    return db.scalar(select(func.count()).select_from(points)) or 0
+
+
+def rollup_overview(db: Session, mandi_owner_id: int, today: Optional[date] = None) -> Optional[dict]:
+    """
+    The supply overview (same shape as `get_supply_overview`) from this
+    mandi's rollup, inventory and order counterparties, or None if it has
+    neither orders in the last two weeks nor inventory.
+    """
+    today = today or datetime.utcnow().date()
+    week_start, prev_start = today - timedelta(days=6), today - timedelta(days=13)
+    rows = mandi_rollup(db, mandi_owner_id, since=prev_start)
+    items = db.execute(
+        select(MandiItem.item_name, MandiItem.current_qty).where(MandiItem.mandi_owner_id == mandi_owner_id)
+    ).all()
+    if not rows and not items:
+        return None
+
+    this_week = [r for r in rows if week_start <= r.day <= today]
+    last_week = [r for r in rows if r.day < week_start]
+    by_item = defaultdict(lambda: ([], []))
+    for r in this_week:
+        by_item[r.item][0].append(r)
+    for r in last_week:
+        by_item[r.item][1].append(r)
+
+    inventory = []
+    for item_name, qty in items:
+        # Inventory names are free text ("Tomato Bulk"); orders use the crop ("tomato")
+        order_item = next((i for i in by_item if i.lower() in item_name.lower()), None)
+        price = change_pct = None
+        if order_item is not None:
+            current, previous = by_item[order_item]
+            price = _avg_price(current, "inbound")
+            before = _avg_price(previous, "inbound")
+            if price is not None and before:
+                change_pct = round((price - before) / before * 100, 1)
+        qty = float(qty or 0)
+        emoji = next((c["emoji"] for c in CROPS if c["name"].lower() in item_name.lower()), "📦")
+        inventory.append({
+            "crop": item_name, "emoji": emoji, "qty_kg": qty,
+            "price_per_kg": round(price, 2) if price is not None else None,
+            "value": round(qty * price) if price is not None else 0,
+            "change_pct": change_pct,
+        })
+
+    days = [week_start + timedelta(days=d) for d in range(7)]
+    inbound_by_day, outbound_by_day = defaultdict(float), defaultdict(float)
+    for r in this_week:
+        inbound_by_day[r.day] += float(r.inbound_kg)
+        outbound_by_day[r.day] += float(r.outbound_kg)
+    inbound = [{"date": d.isoformat(), "qty_kg": round(inbound_by_day[d], 2)} for d in days]
+    outbound = [{"date": d.isoformat(), "qty_kg": round(outbound_by_day[d], 2)} for d in days]
+
+    location = db.execute(
+        select(User.latitude, User.longitude)
+        .join(MandiOwner, MandiOwner.user_id == User.id)
+        .where(MandiOwner.id == mandi_owner_id)
+    ).first()
+    active_farmers = active_retailers = 0
+    if location is not None and location.latitude is not None and location.longitude is not None:
+        lat, lng = float(location.latitude), float(location.longitude)
+        active_farmers = _distinct_counterparties(
+            db, MandiFarmerOrder,
+            (MandiFarmerOrder.dest_lat, MandiFarmerOrder.dest_long),
+            (MandiFarmerOrder.src_lat, MandiFarmerOrder.src_long), lat, lng, week_start,
+        )
+        active_retailers = _distinct_counterparties(
+            db, RetailerMandiOrder,
+            (RetailerMandiOrder.src_lat, RetailerMandiOrder.src_long),
+            (RetailerMandiOrder.dest_lat, RetailerMandiOrder.dest_long), lat, lng, week_start,
+        )
+
+    return {
+        "kpis": {
+            "total_inventory_kg": sum(i["qty_kg"] for i in inventory),
+            "total_value": sum(i["value"] for i in inventory),
+            "daily_inbound_avg": round(sum(i["qty_kg"] for i in inbound) / 7),
+            "daily_outbound_avg": round(sum(o["qty_kg"] for o in outbound) / 7),
+            "active_farmers": active_farmers,
+            "active_retailers": active_retailers,
+            "trucks_active": len(TRUCKS),
+            "pending_orders": sum(r.inbound_orders + r.outbound_orders for r in rows if r.day == today),
+        },
+        "inventory": sorted(inventory, key=lambda x: -x["value"]),
+        "inbound_7d": inbound,
+        "outbound_7d": outbound,
+        "source": "orders",
+    }
+
+
+# ── Price history (forecasting) ──────────────────────────────────────────────
+@dataclass
+class PriceHistory:
+    keys: List[Tuple[int, str]]     # (mandi_owner_id, item) per row
+    days: List[date]                # per column
+    prices: np.ndarray              # (len(keys), len(days)), NaN = no farmer orders that day
+
+
+def price_history(
+    db: Session,
+    since: date,
+    until: Optional[date] = None,
+    mandi_owner_id: Optional[int] = None,
+) -> PriceHistory:
+    """Daily average purchase price per (mandi, item), as a dense matrix for `mandi.forecasting`."""
+    until = until or datetime.utcnow().date()
+    query = (
+        select(
+            MandiDailyRollup.mandi_owner_id, MandiDailyRollup.item, MandiDailyRollup.day,
+            MandiDailyRollup.inbound_orders, MandiDailyRollup.inbound_kg,
+            MandiDailyRollup.inbound_value, MandiDailyRollup.inbound_price_sum,
+        )
+        .where(MandiDailyRollup.day.between(since, until), MandiDailyRollup.inbound_orders > 0)
+    )
+    if mandi_owner_id is not None:
+        query = query.where(MandiDailyRollup.mandi_owner_id == mandi_owner_id)
+    rows = db.execute(query).all()
+
+    days = [since + timedelta(days=d) for d in range((until - since).days + 1)]
+    keys = sorted({(r.mandi_owner_id, r.item) for r in rows})
+    prices = np.full((len(keys), len(days)), np.nan)
+    row_of = {key: i for i, key in enumerate(keys)}
+    for r in rows:
+        price = r.inbound_value / r.inbound_kg if r.inbound_kg else r.inbound_price_sum / r.inbound_orders
+        prices[row_of[(r.mandi_owner_id, r.item)], (r.day - since).days] = float(price)
+    return PriceHistory(keys=keys, days=days, prices=prices)
+
+
+def orders_forecast(db: Session, mandi_owner_id: int, days: int = 7, today: Optional[date] = None) -> Optional[dict]:
+    """
+    Price forecasts (same shape as `forecast_prices`, plus intervals) for this
+    mandi's items from its farmer orders, or None if it has none in the last
+    FORECAST_HISTORY_DAYS.
+    """
+    today = today or datetime.utcnow().date()
+    history = price_history(
+        db, since=today - timedelta(days=settings.FORECAST_HISTORY_DAYS - 1), until=today,
+        mandi_owner_id=mandi_owner_id,
+    )
+    if not history.keys:
+        return None
+    names = [item.title() for _, item in history.keys]
+    emojis = [next((c["emoji"] for c in CROPS if c["name"].lower() in name.lower()), "📦") for name in names]
+    coverage = settings.FORECAST_INTERVAL_COVERAGE
+    return {
+        "forecasts": series_forecasts(names, emojis, history.days, history.prices, days, coverage),
+        "generated_at": datetime.utcnow().isoformat(),
+        "method": "holt_damped",
+        "coverage": coverage,
+        "source": "orders",
+    }
+
+
+# ── Rebuild ──────────────────────────────────────────────────────────────────
+def rebuild_rollup(db: Session, since: Optional[date] = None) -> dict:
+    """
+    Recompute the rollup from the orders (all days, or `since` onwards):
+    one GROUP BY per order table, attributed to mandis in memory, written
+    in one bulk INSERT. Returns {rows, orders, unattributed}.
+    """
+    connection = db.connection()
+    grid = _load_locations(connection)
+    totals: Dict[tuple, Dict[str, Decimal]] = defaultdict(lambda: defaultdict(lambda: _ZERO))
+    orders = unattributed = 0
+
+    for model, (side, lat_attr, lng_attr) in SIDES.items():
+        lat_col, lng_col = getattr(model, lat_attr), getattr(model, lng_attr)
+        query = (
+            select(
+                model.item, model.order_date, lat_col, lng_col,
+                func.count(model.id),
+                func.sum(func.coalesce(model.quantity, 0)),
+                func.sum(func.coalesce(model.quantity, 0) * func.coalesce(model.price_per_kg, 0)),
+                func.sum(func.coalesce(model.price_per_kg, 0)),
+            )
+            .where(model.order_date.isnot(None))
+            .group_by(model.item, model.order_date, lat_col, lng_col)
+        )
+        if since is not None:
+            query = query.where(model.order_date >= since)
+        for item, day, lat, lng, count, kg, value, price_sum in connection.execute(query):
+            orders += count
+            mandi_id = mandi_at(connection, lat, lng, grid)
+            if mandi_id is None:
+                unattributed += count
+                continue
+            measures = totals[(mandi_id, item or "unknown", day)]
+            measures[f"{side}_orders"] += count
+            measures[f"{side}_kg"] += _dec(kg)
+            measures[f"{side}_value"] += _dec(value)
+            measures[f"{side}_price_sum"] += _dec(price_sum)
+
+    stale = delete(MandiDailyRollup)
+    if since is not None:
+        stale = stale.where(MandiDailyRollup.day >= since)
+    db.execute(stale)
+    rows = [
+        {
+            "mandi_owner_id": mandi_id, "item": item, "day": day,
+            **{f"{side}_{m}": measures[f"{side}_{m}"] for side in ("inbound", "outbound") for m in MEASURES},
+            "inbound_orders": int(measures["inbound_orders"]),
+            "outbound_orders": int(measures["outbound_orders"]),
+        }
+        for (mandi_id, item, day), measures in totals.items()
+    ]
+    if rows:
+        db.execute(MandiDailyRollup.__table__.insert(), rows)
+    db.commit()
+    logger.info(f"Supply rollup rebuilt: {len(rows)} rows from {orders} orders ({unattributed} unattributed)")
+    return {"rows": len(rows), "orders": orders, "unattributed": unattributed}
@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from datetime import date
+from pydantic import BaseModel, Field, model_validator
 
-from database import get_db
+from config import settings
+from database import get_db, get_async_db
 from models import MandiOwner, MandiItem, MandiFarmerOrder, User
 from schemas import (
     MandiOwnerProfileUpdate, MandiOwnerProfileResponse,
     MandiItemCreate, MandiItemUpdate, MandiItemResponse,
     MandiFarmerOrderCreate, MandiFarmerOrderUpdate, MandiFarmerOrderResponse,
 )
-from auth import get_current_user, require_role
+from auth import (
+    Principal, get_optional_principal, invalidate_principal, require_principal, require_role,
+)
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    apply_order_filters, order_cursor_for, order_keyset_query, set_next_cursor, split_page,
+)
 
 router = APIRouter(prefix="/api/mandi", tags=["Mandi"])
 
@@ -24,6 +34,13 @@ def _get_mandi_profile(user: User, db: Session) -> MandiOwner:
     return mandi
 
 
+def _mandi_owner_id(principal: Principal) -> int:
+    """Return the cached MandiOwner id for the authenticated principal, or 404."""
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Mandi owner profile not found")
+    return principal.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
@@ -57,6 +74,7 @@ def update_profile(
         mandi.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(mandi)
     return mandi
 
@@ -66,62 +84,63 @@ def update_profile(
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/items", response_model=List[MandiItemResponse])
-def list_items(
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+async def list_items(
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all items belonging to the logged-in mandi owner."""
-    mandi = _get_mandi_profile(current_user, db)
-    return db.query(MandiItem).filter(MandiItem.mandi_owner_id == mandi.id).all()
+    mandi_id = _mandi_owner_id(principal)
+    result = await db.execute(select(MandiItem).where(MandiItem.mandi_owner_id == mandi_id))
+    return result.scalars().all()
 
 
 @router.post("/items", response_model=MandiItemResponse, status_code=status.HTTP_201_CREATED)
-def create_item(
+async def create_item(
     payload: MandiItemCreate,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a new item to the mandi's inventory."""
-    mandi = _get_mandi_profile(current_user, db)
+    mandi_id = _mandi_owner_id(principal)
     item = MandiItem(
-        mandi_owner_id=mandi.id,
+        mandi_owner_id=mandi_id,
         item_name=payload.item_name,
         current_qty=payload.current_qty,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
 @router.get("/items/{item_id}", response_model=MandiItemResponse)
-def get_item(
+async def get_item(
     item_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a single mandi item by ID."""
-    mandi = _get_mandi_profile(current_user, db)
-    item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
-    ).first()
+    mandi_id = _mandi_owner_id(principal)
+    item = await db.scalar(select(MandiItem).where(
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 
 @router.put("/items/{item_id}", response_model=MandiItemResponse)
-def update_item(
+async def update_item(
     item_id: int,
     payload: MandiItemUpdate,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing mandi item."""
-    mandi = _get_mandi_profile(current_user, db)
-    item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
-    ).first()
+    mandi_id = _mandi_owner_id(principal)
+    item = await db.scalar(select(MandiItem).where(
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -129,26 +148,26 @@ def update_item(
     for key, value in update_data.items():
         setattr(item, key, value)
 
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item(
+async def delete_item(
     item_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a mandi item."""
-    mandi = _get_mandi_profile(current_user, db)
-    item = db.query(MandiItem).filter(
-        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi.id
-    ).first()
+    mandi_id = _mandi_owner_id(principal)
+    item = await db.scalar(select(MandiItem).where(
+        MandiItem.id == item_id, MandiItem.mandi_owner_id == mandi_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -156,50 +175,73 @@ def delete_item(
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/orders", response_model=List[MandiFarmerOrderResponse])
-def list_orders(
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+async def list_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    item: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    src_bbox: Optional[str] = Query(None, description="min_lat,min_lng,max_lat,max_lng"),
+    dest_bbox: Optional[str] = Query(None, description="min_lat,min_lng,max_lat,max_lng"),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """List all mandi-farmer orders."""
-    return db.query(MandiFarmerOrder).all()
+    """
+    List mandi-farmer orders, newest first (by order date when a date range
+    is given), one page at a time.
+
+    Pass the `X-Next-Cursor` response header back as `?cursor=` to fetch the
+    next page; the header is absent on the last page.
+    """
+    stmt = apply_order_filters(
+        select(MandiFarmerOrder), MandiFarmerOrder,
+        item=item, date_from=date_from, date_to=date_to,
+        src_bbox=src_bbox, dest_bbox=dest_bbox,
+    )
+    by_date = date_from is not None or date_to is not None
+    result = await db.execute(order_keyset_query(stmt, MandiFarmerOrder, cursor, limit, by_date))
+    orders, next_cursor = split_page(result.scalars().all(), limit, cursor_for=order_cursor_for(by_date))
+    set_next_cursor(response, next_cursor)
+    return orders
 
 
 @router.post("/orders", response_model=MandiFarmerOrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
+async def create_order(
     payload: MandiFarmerOrderCreate,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Create a new mandi-farmer order."""
     order = MandiFarmerOrder(**payload.model_dump())
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     return order
 
 
 @router.get("/orders/{order_id}", response_model=MandiFarmerOrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a single order by ID."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    order = await db.scalar(select(MandiFarmerOrder).where(MandiFarmerOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
 @router.put("/orders/{order_id}", response_model=MandiFarmerOrderResponse)
-def update_order(
+async def update_order(
     order_id: int,
     payload: MandiFarmerOrderUpdate,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing mandi-farmer order."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    order = await db.scalar(select(MandiFarmerOrder).where(MandiFarmerOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -207,23 +249,23 @@ def update_order(
     for key, value in update_data.items():
         setattr(order, key, value)
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     return order
 
 
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_order(
+async def delete_order(
     order_id: int,
-    current_user: User = Depends(require_role("mandi_owner")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a mandi-farmer order."""
-    order = db.query(MandiFarmerOrder).filter(MandiFarmerOrder.id == order_id).first()
+    order = await db.scalar(select(MandiFarmerOrder).where(MandiFarmerOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    db.delete(order)
-    db.commit()
+    await db.delete(order)
+    await db.commit()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -232,43 +274,120 @@ def delete_order(
 
 from mandi.supply_chain import (
     get_supply_overview, detect_stress_signals, forecast_prices,
-    get_truck_fleet, get_interventions, run_scenario,
+    get_truck_fleet, get_interventions, run_scenario, run_scenario_monte_carlo,
 )
+from mandi.rollup import orders_forecast, rollup_overview
+from mandi.dashboard_cache import cached_json_response, dashboard_entry, day_bucket, stress_bucket
 
 
 class ScenarioRequest(BaseModel):
     rain_days: int = 0
     demand_surge_pct: int = 0
     transport_delay_pct: int = 0
+    # "point" = single estimate; "monte_carlo" = percentiles over `samples` correlated draws
+    mode: Literal["point", "monte_carlo"] = "point"
+    samples: int = Field(10000, ge=100, le=settings.SCENARIO_MAX_SAMPLES)
+    seed: Optional[int] = None
+    # Monte-Carlo only: values per parameter, every combination is simulated
+    sweep: Optional[Dict[Literal["rain_days", "demand_surge_pct", "transport_delay_pct"], List[int]]] = None
+
+    @model_validator(mode="after")
+    def check_sweep(self):
+        if self.sweep is None:
+            return self
+        if self.mode != "monte_carlo":
+            raise ValueError("sweep requires mode=monte_carlo")
+        cells = 1
+        for values in self.sweep.values():
+            if not values:
+                raise ValueError("sweep values must not be empty")
+            cells *= len(values)
+        if cells > settings.SCENARIO_MAX_SWEEP_CELLS:
+            raise ValueError(f"sweep has {cells} cells (max {settings.SCENARIO_MAX_SWEEP_CELLS})")
+        if cells * self.samples > settings.SCENARIO_MAX_DRAWS:
+            raise ValueError(f"cells × samples must be ≤ {settings.SCENARIO_MAX_DRAWS}")
+        return self
 
 
 @router.get("/supply-chain/overview")
-def supply_overview():
-    return get_supply_overview()
+def supply_overview(
+    request: Request,
+    principal: Optional[Principal] = Depends(get_optional_principal),
+    db: Session = Depends(get_db),
+):
+    """
+    A mandi owner's overview from their order rollup and inventory; the
+    simulated overview for anyone else, or a mandi with no data yet.
+    """
+    if principal is not None and principal.role == "mandi_owner" and principal.profile_id is not None:
+        mandi_id = principal.profile_id
+
+        def compute():
+            overview = rollup_overview(db, mandi_id)
+            return overview if overview is not None else {**get_supply_overview(), "source": "simulated"}
+
+        entry = dashboard_entry("overview", compute, day_bucket(), mandi_id=mandi_id, from_orders=True)
+    else:
+        entry = dashboard_entry("overview", lambda: {**get_supply_overview(), "source": "simulated"}, day_bucket())
+    return cached_json_response(request, entry)
+
+
+def _stress_entry():
+    return dashboard_entry("stress", detect_stress_signals, stress_bucket())
 
 
 @router.get("/supply-chain/stress")
-def supply_stress():
-    return detect_stress_signals()
+def supply_stress(request: Request):
+    return cached_json_response(request, _stress_entry())
 
 
 @router.get("/supply-chain/forecast")
-def supply_forecast(days: int = 7):
-    return forecast_prices(days)
+def supply_forecast(
+    request: Request,
+    days: int = Query(7, ge=1, le=30),
+    principal: Optional[Principal] = Depends(get_optional_principal),
+    db: Session = Depends(get_db),
+):
+    """
+    Per-item price forecasts with prediction intervals: from a mandi owner's
+    own farmer orders, else (or without order history) from simulated prices.
+    """
+    if principal is not None and principal.role == "mandi_owner" and principal.profile_id is not None:
+        mandi_id = principal.profile_id
+
+        def compute():
+            forecast = orders_forecast(db, mandi_id, days)
+            return forecast if forecast is not None else {**forecast_prices(days), "source": "simulated"}
+
+        entry = dashboard_entry("forecast", compute, day_bucket(), mandi_id=mandi_id, params=(days,), from_orders=True)
+    else:
+        entry = dashboard_entry("forecast", lambda: {**forecast_prices(days), "source": "simulated"}, day_bucket(), params=(days,))
+    return cached_json_response(request, entry)
 
 
 @router.get("/supply-chain/trucks")
-def supply_trucks():
-    return get_truck_fleet()
+def supply_trucks(request: Request):
+    return cached_json_response(request, dashboard_entry("trucks", get_truck_fleet, day_bucket()))
 
 
 @router.get("/supply-chain/interventions")
-def supply_interventions():
-    return get_interventions()
+def supply_interventions(request: Request):
+    # Interventions are derived from the stress signals, so they share its
+    # bucket and are keyed by the stress entry they were computed from.
+    stress = _stress_entry()
+    entry = dashboard_entry(
+        "interventions", lambda: get_interventions(stress=stress.value), stress_bucket(), params=(stress.etag,),
+    )
+    return cached_json_response(request, entry)
 
 
 @router.post("/supply-chain/scenario")
 def supply_scenario(req: ScenarioRequest):
+    if req.mode == "monte_carlo":
+        return run_scenario_monte_carlo(
+            req.rain_days, req.demand_surge_pct, req.transport_delay_pct,
+            samples=req.samples, sweep=req.sweep, seed=req.seed,
+        )
     return run_scenario(req.rain_days, req.demand_surge_pct, req.transport_delay_pct)
 
 
@@ -276,15 +395,12 @@ def supply_scenario(req: ScenarioRequest):
 #  STRESS ALERT SIMULATION (Twilio SMS + Calls)
 # ═════════════════════════════════════════════════════════════════════════════
 
-import os
-from twilio.rest import Client as TwilioClient
+from alerts.fanout import AlertAudience, fan_out_alert
+from notification_outbox import enqueue_notifications, outbox_batch_status
+from notifications import Notification, notifications_configured
 
 ALERT_NUMBERS = ["+919620146061", "+919108208731"]
 
-TWILIO_SID = os.getenv("TWILIO_ACCOUNT_SID")
-TWILIO_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
-TWILIO_FROM = os.getenv("TWILIO_PHONE_NUMBER")
-
 
 class AlertSimRequest(BaseModel):
     risk_level: str  # "low", "moderate", "high", "critical"
@@ -293,13 +409,30 @@ class AlertSimRequest(BaseModel):
     signals: list = []
 
 
+# Stress risk level → Alert.severity
+RISK_SEVERITY = {"low": "low", "moderate": "medium", "high": "high", "critical": "critical"}
+
+
+def _critical_twiml(risk_score: int) -> str:
+    return f"<Response><Say voice='alice'>URGENT. FoodChain Mandi Critical Alert. Risk score {risk_score} out of 100. Immediate action required. Please check your dashboard for details.</Say><Pause length='1'/><Say voice='alice'>Repeating. Critical supply chain disruption detected. Log in to your FoodChain dashboard immediately.</Say></Response>"
+
+
 @router.post("/supply-chain/alert-simulate")
-def alert_simulate(req: AlertSimRequest):
+def alert_simulate(
+    req: AlertSimRequest,
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: Session = Depends(get_db),
+):
     """
-    Simulate stress alert based on risk level:
+    Simulate stress alert based on risk level (mandi owners only, since it
+    writes to every mandi owner's inbox):
+    - Always: in-app alert to every mandi owner (pushed live over the alert stream)
     - Low/Moderate: in-app notification only
     - High: send SMS to all numbers
-    - Critical: make phone call to all numbers
+    - Critical: make phone call to all numbers (plus a backup SMS)
+
+    SMS and calls go through the durable outbox (retried, de-duplicated per
+    number); poll `status_url` for the outcome.
     """
     level = req.risk_level.lower()
     msg = req.message or f"⚠️ FoodChain Mandi Alert — Risk Level: {level.upper()} (Score: {req.risk_score}/100)"
@@ -315,13 +448,21 @@ def alert_simulate(req: AlertSimRequest):
     }
 
     # Always do in-app notification
+    fanout = fan_out_alert(
+        db, msg, AlertAudience(role="mandi_owner"),
+        severity=RISK_SEVERITY.get(level, "medium"),
+        scope="alert_simulate",
+    )
     result["actions_taken"].append({
         "type": "notification",
         "status": "sent",
-        "detail": f"In-app alert dispatched: {level.upper()} risk detected",
+        "detail": (
+            f"In-app alert dispatched: {level.upper()} risk detected "
+            f"({fanout['inserted']} new, {fanout['duplicates']} already notified)"
+        ),
     })
 
-    if level in ("low", "moderate"):
+    if level not in ("high", "critical"):
         # Just notification, no external action
         result["actions_taken"].append({
             "type": "info",
@@ -330,74 +471,48 @@ def alert_simulate(req: AlertSimRequest):
         })
         return result
 
-    # High risk → SMS
-    if level == "high":
-        if not all([TWILIO_SID, TWILIO_TOKEN, TWILIO_FROM]):
-            result["errors"].append("Twilio credentials not configured")
-            return result
-
-        client = TwilioClient(TWILIO_SID, TWILIO_TOKEN)
-        for number in ALERT_NUMBERS:
-            try:
-                sms = client.messages.create(
-                    body=msg,
-                    from_=TWILIO_FROM,
-                    to=number,
-                )
-                result["actions_taken"].append({
-                    "type": "sms",
-                    "status": "sent",
-                    "detail": f"SMS sent to {number}",
-                    "sid": sms.sid,
-                })
-                result["numbers_contacted"].append(number)
-            except Exception as e:
-                result["errors"].append(f"SMS to {number} failed: {str(e)}")
+    if not notifications_configured():
+        result["errors"].append("Twilio credentials not configured")
         return result
 
-    # Critical → Phone call
-    if level == "critical":
-        if not all([TWILIO_SID, TWILIO_TOKEN, TWILIO_FROM]):
-            result["errors"].append("Twilio credentials not configured")
-            return result
-
-        client = TwilioClient(TWILIO_SID, TWILIO_TOKEN)
-        twiml_msg = f"<Response><Say voice='alice'>URGENT. FoodChain Mandi Critical Alert. Risk score {req.risk_score} out of 100. Immediate action required. Please check your dashboard for details.</Say><Pause length='1'/><Say voice='alice'>Repeating. Critical supply chain disruption detected. Log in to your FoodChain dashboard immediately.</Say></Response>"
-
-        for number in ALERT_NUMBERS:
-            try:
-                call = client.calls.create(
-                    twiml=twiml_msg,
-                    from_=TWILIO_FROM,
-                    to=number,
-                )
-                result["actions_taken"].append({
-                    "type": "call",
-                    "status": "initiated",
-                    "detail": f"Phone call to {number}",
-                    "sid": call.sid,
-                })
-                result["numbers_contacted"].append(number)
-            except Exception as e:
-                result["errors"].append(f"Call to {number} failed: {str(e)}")
-
-        # Also send SMS for critical
-        for number in ALERT_NUMBERS:
-            try:
-                sms = client.messages.create(
-                    body=f"🚨 CRITICAL: {msg}",
-                    from_=TWILIO_FROM,
-                    to=number,
-                )
-                result["actions_taken"].append({
-                    "type": "sms",
-                    "status": "sent",
-                    "detail": f"Backup SMS to {number}",
-                    "sid": sms.sid,
-                })
-            except Exception as e:
-                result["errors"].append(f"Backup SMS to {number} failed: {str(e)}")
+    # High risk → SMS; critical → phone call plus a backup SMS
+    if level == "high":
+        notifications = [Notification(kind="sms", to=n, body=msg) for n in ALERT_NUMBERS]
+        labels = ["SMS"] * len(notifications)
+    else:
+        twiml = _critical_twiml(req.risk_score)
+        notifications = [Notification(kind="call", to=n, twiml=twiml) for n in ALERT_NUMBERS]
+        notifications += [Notification(kind="sms", to=n, body=f"🚨 CRITICAL: {msg}") for n in ALERT_NUMBERS]
+        labels = ["Phone call"] * len(ALERT_NUMBERS) + ["Backup SMS"] * len(ALERT_NUMBERS)
+
+    queued = enqueue_notifications(db, notifications, source="alert_simulate")
+    for outcome, label in zip(queued["results"], labels):
+        action = {
+            "type": outcome["type"],
+            "status": "queued" if outcome["queued"] else "skipped",
+            "detail": f"{label} to {outcome['to']}",
+        }
+        if not outcome["queued"]:
+            # Already queued today: point at the dispatch that owns it
+            action["detail"] += f" — identical message already queued today ({outcome['status']})"
+            action["dispatch_id"] = outcome["batch_id"]
+        result["actions_taken"].append(action)
+    result["numbers_contacted"] = sorted({o["to"] for o in queued["results"] if o["queued"]})
+    # This call's dispatch, or the earlier one when everything was a duplicate
+    dispatch_id = queued["batch_id"] if queued["queued"] else queued["results"][0]["batch_id"]
+    result["dispatch_id"] = dispatch_id
+    result["status_url"] = f"{router.prefix}/supply-chain/alert-dispatch/{dispatch_id}"
+    return result
 
-        return result
 
-    return result
+@router.get("/supply-chain/alert-dispatch/{dispatch_id}")
+def alert_dispatch_status(
+    dispatch_id: str,
+    principal: Principal = Depends(require_principal("mandi_owner")),
+    db: Session = Depends(get_db),
+):
+    """Outcome of the SMS/calls queued by alert-simulate (per-number status, sid or last error)."""
+    dispatch = outbox_batch_status(db, dispatch_id)
+    if dispatch is None:
+        raise HTTPException(status_code=404, detail="Dispatch not found")
+    return dispatch
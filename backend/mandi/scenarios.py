@@ -0,0 +1,173 @@
+"""
+What-if scenario model: point estimates and Monte-Carlo distributions.
+
+`scenario_metrics` is the supply/demand/price/spoilage/risk model behind
+`run_scenario`. It works on scalars or NumPy arrays alike, so the
+stochastic mode evaluates every sample (and every sweep cell) in one
+broadcast expression.
+
+In Monte-Carlo mode each sample draws six correlated shocks (Cholesky
+factor of SHOCK_CORRELATION applied to standard normals):
+- how hard each rain day hits, how much of the demand surge materialises
+  and how bad the transport delay turns out: mean-1 lognormal multipliers
+  on the scenario inputs;
+- baseline supply, demand and price noise: additive relative shocks.
+Rain intensity and transport delay move together, rain cuts supply, and
+demand pushes prices, so the tails are fatter than independent draws give.
+
+A sweep evaluates the cartesian product of parameter values against the
+same draws (common random numbers), so cells differ only by their inputs,
+and a metric that does not depend on a swept parameter (demand ignores
+rain) has its percentiles computed once rather than per cell.
+
+Usage:
+    scenario_metrics(rain_days=2, demand_surge_pct=20, transport_delay_pct=0)       # floats
+    cells = sweep_cells({"rain_days": 2, "demand_surge_pct": 20, "transport_delay_pct": 0}, {"rain_days": [0, 2, 4]})
+    simulate_scenarios(cells, samples=10_000, seed=1)                                  # percentiles per cell
+"""
+
+import itertools
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+BASELINE = {"supply_kg": 5000, "demand_kg": 4500, "price_index": 100, "risk_score": 25, "spoilage_pct": 3}
+SCENARIO_PARAMS = ("rain_days", "demand_surge_pct", "transport_delay_pct")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Shock order: rain intensity, surge realisation, delay intensity, supply, demand, price noise
+SHOCK_CORRELATION = np.array([
+    [1.0,  0.0,  0.6, -0.4,  0.0,  0.2],
+    [0.0,  1.0,  0.0,  0.0,  0.5,  0.3],
+    [0.6,  0.0,  1.0, -0.3,  0.0,  0.1],
+    [-0.4, 0.0, -0.3,  1.0,  0.0, -0.3],
+    [0.0,  0.5,  0.0,  0.0,  1.0,  0.3],
+    [0.2,  0.3,  0.1, -0.3,  0.3,  1.0],
+])
+SHOCK_SD = np.array([0.35, 0.30, 0.40, 0.08, 0.06, 0.04])
+_LOGNORMAL = 3   # the first three shocks are lognormal multipliers
+
+# Reported metrics, their rounding, and the inputs each depends on: in a sweep a
+# metric's percentiles are computed once per distinct combination of its inputs
+METRICS = {
+    "supply_kg": (0, ("rain_days", "transport_delay_pct")),
+    "demand_kg": (0, ("demand_surge_pct",)),
+    "gap_kg": (0, SCENARIO_PARAMS),
+    "price_index": (1, ("rain_days", "demand_surge_pct")),
+    "spoilage_pct": (1, ("rain_days", "transport_delay_pct")),
+    "risk_score": (1, SCENARIO_PARAMS),
+}
+
+
+def scenario_metrics(
+    rain_days,
+    demand_surge_pct,
+    transport_delay_pct,
+    rain_intensity=1.0,
+    surge_realised=1.0,
+    delay_intensity=1.0,
+    supply_noise=0.0,
+    demand_noise=0.0,
+    price_noise=0.0,
+) -> Dict[str, object]:
+    """Predicted supply, demand, gap, price index, risk and spoilage (unrounded; arrays broadcast)."""
+    rain = np.maximum(rain_days, 0) * rain_intensity
+    surge = np.maximum(demand_surge_pct, 0) / 100 * surge_realised
+    delay = np.maximum(transport_delay_pct, 0) / 100 * delay_intensity
+
+    supply_impact = 1.0 - 0.12 * rain - 0.3 * delay      # -12% supply per rain day
+    demand_impact = 1.0 + surge
+    price_impact = 1.0 + 0.08 * rain + 0.6 * surge       # +8% price per rain day
+    risk_impact = 1.0 + 0.15 * rain + 0.4 * surge + 0.5 * delay
+    spoilage_impact = 1.0 + 0.20 * rain + 0.4 * delay
+
+    supply = np.maximum(500, BASELINE["supply_kg"] * np.maximum(0.2, supply_impact) * (1 + supply_noise))
+    demand = BASELINE["demand_kg"] * demand_impact * (1 + demand_noise)
+    return {
+        "supply_kg": supply,
+        "demand_kg": demand,
+        "gap_kg": demand - supply,
+        "price_index": BASELINE["price_index"] * np.maximum(0.5, price_impact) * (1 + price_noise),
+        "risk_score": np.minimum(100, BASELINE["risk_score"] * np.maximum(1, risk_impact)),
+        "spoilage_pct": np.minimum(40, BASELINE["spoilage_pct"] * np.maximum(1, spoilage_impact)),
+        "price_impact": price_impact,
+        "supply_impact": supply_impact,
+    }
+
+
+def draw_shocks(samples: int, seed: Optional[int] = None) -> np.ndarray:
+    """(6, samples) correlated shocks: lognormal mean-1 multipliers, then relative noise (float32)."""
+    rng = np.random.default_rng(seed)
+    z = np.linalg.cholesky(SHOCK_CORRELATION) @ rng.standard_normal((len(SHOCK_SD), samples))
+    shocks = SHOCK_SD[:, None] * z
+    shocks[:_LOGNORMAL] = np.exp(shocks[:_LOGNORMAL] - SHOCK_SD[:_LOGNORMAL, None] ** 2 / 2)
+    # float32 halves the memory traffic of the (cells × samples) evaluation; plenty for p5–p95
+    return shocks.astype(np.float32)
+
+
+def sweep_cells(base: Dict[str, int], sweep: Optional[Dict[str, Sequence[int]]] = None) -> List[Dict[str, int]]:
+    """Scenario inputs for every combination of the swept values (other inputs from `base`)."""
+    sweep = sweep or {}
+    names = [p for p in SCENARIO_PARAMS if p in sweep]
+    return [
+        {**base, **dict(zip(names, values))}
+        for values in itertools.product(*(sweep[p] for p in names))
+    ]
+
+
+def _summary(values: np.ndarray, decimals: int) -> List[dict]:
+    """Per-row percentiles and mean of a (rows × samples) array."""
+    qs = np.percentile(values, PERCENTILES, axis=1)            # (len(PERCENTILES), rows)
+    means = values.mean(axis=1, dtype=np.float64)
+    return [
+        {**{f"p{p}": round(float(qs[i, r]), decimals) for i, p in enumerate(PERCENTILES)},
+         "mean": round(float(means[r]), decimals)}
+        for r in range(values.shape[0])
+    ]
+
+
+def _metric_summaries(values: np.ndarray, cells: List[Dict[str, int]], inputs: Sequence[str], decimals: int) -> List[dict]:
+    """`_summary` per cell, computed once per distinct combination of `inputs`."""
+    first_row: Dict[tuple, int] = {}
+    keys = [tuple(cell[p] for p in inputs) for cell in cells]
+    for row, key in enumerate(keys):
+        first_row.setdefault(key, row)
+    rows = list(first_row.values())
+    summaries = dict(zip(first_row, _summary(values[rows], decimals)))
+    return [summaries[key] for key in keys]
+
+
+def simulate_scenarios(
+    cells: List[Dict[str, int]],
+    samples: int = 10_000,
+    seed: Optional[int] = None,
+) -> List[dict]:
+    """
+    Monte-Carlo outcome distribution for each scenario in `cells`, all
+    evaluated on the same `samples` draws: percentiles of supply, demand,
+    gap, price index, spoilage and risk, plus shortfall probabilities.
+    """
+    shocks = draw_shocks(samples, seed)
+    column = {p: np.array([c[p] for c in cells], dtype=np.float32)[:, None] for p in SCENARIO_PARAMS}
+    m = scenario_metrics(
+        column["rain_days"], column["demand_surge_pct"], column["transport_delay_pct"],
+        *(shocks[i][None, :] for i in range(len(SHOCK_SD))),
+    )
+
+    summaries = {
+        metric: _metric_summaries(m[metric], cells, inputs, decimals)
+        for metric, (decimals, inputs) in METRICS.items()
+    }
+    shortfall = (m["gap_kg"] > 0).mean(axis=1)
+    severe = (m["gap_kg"] > 500).mean(axis=1)
+    return [
+        {
+            "scenario": cell,
+            **{metric: summaries[metric][c] for metric in METRICS},
+            "probabilities": {
+                "shortfall": round(float(shortfall[c]), 4),
+                "shortfall_over_500kg": round(float(severe[c]), 4),
+            },
+        }
+        for c, cell in enumerate(cells)
+    ]
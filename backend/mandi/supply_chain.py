@@ -7,6 +7,12 @@ import random
 import math
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from config import settings
+from mandi.forecasting import series_forecasts
+from mandi.scenarios import BASELINE, PERCENTILES, scenario_metrics, simulate_scenarios, sweep_cells
+
 
 # ── Crop catalog ──
 CROPS = [
@@ -175,44 +181,32 @@ def detect_stress_signals(mandi_lat=12.97, mandi_lng=77.59):
 
 
 def forecast_prices(days=7):
-    """Price forecasts for all crops"""
+    """Price forecasts for all crops (damped-trend Holt over a simulated 14-day history)"""
     rng = _seed()
     today = datetime.utcnow().date()
-    forecasts = []
+    history_days = [today - timedelta(days=13 - d) for d in range(14)]
 
-    for c in CROPS:
-        history = []
+    prices = np.empty((len(CROPS), len(history_days)))
+    for i, c in enumerate(CROPS):
         price = c["base_price"] + rng.uniform(-5, 5)
-        for d in range(14):
+        for d in range(len(history_days)):
             price += rng.uniform(-2, 2.5) * c["volatility"] * 10
             price = max(c["base_price"] * 0.5, min(c["base_price"] * 2, price))
-            date = (today - timedelta(days=13 - d)).isoformat()
-            history.append({"date": date, "price": round(price, 2)})
-
-        # Forecast
-        last5 = [h["price"] for h in history[-5:]]
-        trend = (last5[-1] - last5[0]) / 5 if len(last5) > 1 else 0
-        predicted = []
-        fp = last5[-1]
-        for d in range(days):
-            fp += trend + rng.uniform(-1, 1) * c["volatility"] * 5
-            fp = max(c["base_price"] * 0.5, min(c["base_price"] * 2, fp))
-            date = (today + timedelta(days=d + 1)).isoformat()
-            predicted.append({"date": date, "price": round(fp, 2)})
-
-        trend_pct = round(((predicted[-1]["price"] - history[-1]["price"]) / history[-1]["price"]) * 100, 1)
-        forecasts.append({
-            "crop": c["name"], "emoji": c["emoji"],
-            "current_price": history[-1]["price"],
-            "predicted_price_7d": predicted[-1]["price"],
-            "trend_pct": trend_pct,
-            "trend": "up" if trend_pct > 2 else "down" if trend_pct < -2 else "stable",
-            "history": history,
-            "forecast": predicted,
-            "volatility": c["volatility"],
-        })
+            prices[i, d] = round(price, 2)
+
+    forecasts = series_forecasts(
+        [c["name"] for c in CROPS], [c["emoji"] for c in CROPS],
+        history_days, prices, days, settings.FORECAST_INTERVAL_COVERAGE,
+    )
+    for entry, c in zip(forecasts, CROPS):
+        entry["volatility"] = c["volatility"]
 
-    return {"forecasts": forecasts, "generated_at": datetime.utcnow().isoformat()}
+    return {
+        "forecasts": forecasts,
+        "generated_at": datetime.utcnow().isoformat(),
+        "method": "holt_damped",
+        "coverage": settings.FORECAST_INTERVAL_COVERAGE,
+    }
 
 
 def get_truck_fleet(mandi_lat=12.97, mandi_lng=77.59):
@@ -257,10 +251,10 @@ def get_truck_fleet(mandi_lat=12.97, mandi_lng=77.59):
     }
 
 
-def get_interventions():
-    """AI-generated stabilizing interventions"""
+def get_interventions(stress=None):
+    """AI-generated stabilizing interventions (pass `stress` to reuse an already computed detect_stress_signals())"""
     rng = _seed()
-    stress = detect_stress_signals()
+    stress = stress if stress is not None else detect_stress_signals()
     interventions = []
 
     # Generate based on stress signals
@@ -302,42 +296,15 @@ def run_scenario(rain_days=0, demand_surge_pct=0, transport_delay_pct=0):
     """Simulate what-if scenarios and return predicted impact"""
     rng = _seed()
 
-    # Base metrics
-    base_supply = 5000  # kg/day
-    base_demand = 4500
-    base_price_index = 100
-    base_risk = 25
-    base_spoilage = 3  # %
-
-    # Calculate impacts
-    supply_impact = 1.0
-    demand_impact = 1.0
-    price_impact = 1.0
-    risk_impact = 1.0
-    spoilage_impact = 1.0
-
-    if rain_days > 0:
-        supply_impact -= 0.12 * rain_days  # -12% supply per rain day
-        price_impact += 0.08 * rain_days   # +8% price per rain day
-        risk_impact += 0.15 * rain_days
-        spoilage_impact += 0.20 * rain_days
-
-    if demand_surge_pct > 0:
-        demand_impact += demand_surge_pct / 100
-        price_impact += (demand_surge_pct / 100) * 0.6
-        risk_impact += (demand_surge_pct / 100) * 0.4
-
-    if transport_delay_pct > 0:
-        supply_impact -= (transport_delay_pct / 100) * 0.3
-        risk_impact += (transport_delay_pct / 100) * 0.5
-        spoilage_impact += (transport_delay_pct / 100) * 0.4
-
-    predicted_supply = max(500, round(base_supply * max(0.2, supply_impact)))
-    predicted_demand = round(base_demand * demand_impact)
+    m = {name: float(value) for name, value in scenario_metrics(rain_days, demand_surge_pct, transport_delay_pct).items()}
+    price_impact, supply_impact = m["price_impact"], m["supply_impact"]
+
+    predicted_supply = round(m["supply_kg"])
+    predicted_demand = round(m["demand_kg"])
     gap = predicted_demand - predicted_supply
-    predicted_price = round(base_price_index * max(0.5, price_impact), 1)
-    predicted_risk = min(100, round(base_risk * max(1, risk_impact)))
-    predicted_spoilage = min(40, round(base_spoilage * max(1, spoilage_impact), 1))
+    predicted_price = round(m["price_index"], 1)
+    predicted_risk = round(m["risk_score"])
+    predicted_spoilage = round(m["spoilage_pct"], 1)
 
     # Per-crop impact
     crop_impacts = []
@@ -364,8 +331,31 @@ def run_scenario(rain_days=0, demand_surge_pct=0, transport_delay_pct=0):
 
     return {
         "scenario": {"rain_days": rain_days, "demand_surge_pct": demand_surge_pct, "transport_delay_pct": transport_delay_pct},
-        "baseline": {"supply_kg": base_supply, "demand_kg": base_demand, "price_index": base_price_index, "risk_score": base_risk, "spoilage_pct": base_spoilage},
+        "baseline": dict(BASELINE),
         "predicted": {"supply_kg": predicted_supply, "demand_kg": predicted_demand, "gap_kg": gap, "price_index": predicted_price, "risk_score": predicted_risk, "spoilage_pct": predicted_spoilage},
         "crop_impacts": crop_impacts,
         "recommendations": recommendations,
     }
+
+
+def run_scenario_monte_carlo(rain_days=0, demand_surge_pct=0, transport_delay_pct=0, samples=10000, sweep=None, seed=None):
+    """Monte-Carlo what-if: percentile bands for the scenario, or for every cell of a parameter sweep"""
+    seed = seed if seed is not None else datetime.utcnow().date().toordinal()
+    base = {"rain_days": rain_days, "demand_surge_pct": demand_surge_pct, "transport_delay_pct": transport_delay_pct}
+    cells = sweep_cells(base, sweep)
+    results = simulate_scenarios(cells, samples=samples, seed=seed)
+
+    response = {
+        "mode": "monte_carlo",
+        "samples": samples,
+        "seed": seed,
+        "percentiles": list(PERCENTILES),
+        "baseline": dict(BASELINE),
+    }
+    if sweep:
+        response["sweep"] = {"params": [p for p in base if p in sweep], "cells": results}
+    else:
+        response.update(results[0])
+        response["point_estimate"] = run_scenario(rain_days, demand_surge_pct, transport_delay_pct)["predicted"]
+    return response
+
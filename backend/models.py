@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, ForeignKey, Text, CheckConstraint, TIMESTAMP
+from sqlalchemy import Column, Integer, String, Numeric, Date, DateTime, Boolean, Float, ForeignKey, Text, CheckConstraint, TIMESTAMP, Index, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -13,6 +13,8 @@ class User(Base):
     contact = Column(String(20))
     latitude = Column(Numeric(10, 7))
     longitude = Column(Numeric(10, 7))
+    # Maintained by alert fan-out / mark-seen so the badge poll reads one row
+    unseen_alert_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     __table_args__ = (
         CheckConstraint("role IN ('farmer', 'mandi_owner', 'retailer', 'admin')", name='check_user_role'),
@@ -88,6 +90,17 @@ class MandiFarmerOrder(Base):
     order_date = Column(Date)
     quantity = Column(Numeric(10, 2))
 
+    # Back the keyset-paginated, filtered order listing: each index matches a
+    # filter's page order (id, or (order_date, id) under a date range). Bounding
+    # boxes range-scan on lat; lng is checked on the index entry before the heap.
+    __table_args__ = (
+        Index("ix_mfo_item_id", "item", "id"),
+        Index("ix_mfo_item_date_id", "item", "order_date", "id"),
+        Index("ix_mfo_date_id", "order_date", "id"),
+        Index("ix_mfo_src_lat_long", "src_lat", "src_long"),
+        Index("ix_mfo_dest_lat_long", "dest_lat", "dest_long"),
+    )
+
 class Retailer(Base):
     __tablename__ = "retailer"
     
@@ -127,14 +140,121 @@ class RetailerMandiOrder(Base):
     order_date = Column(Date)
     quantity = Column(Numeric(10, 2))
 
+    # Back the keyset-paginated, filtered order listing: each index matches a
+    # filter's page order (id, or (order_date, id) under a date range). Bounding
+    # boxes range-scan on lat; lng is checked on the index entry before the heap.
+    __table_args__ = (
+        Index("ix_rmo_item_id", "item", "id"),
+        Index("ix_rmo_item_date_id", "item", "order_date", "id"),
+        Index("ix_rmo_date_id", "order_date", "id"),
+        Index("ix_rmo_src_lat_long", "src_lat", "src_long"),
+        Index("ix_rmo_dest_lat_long", "dest_lat", "dest_long"),
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     message = Column(Text)
+    severity = Column(String(20))
     seen = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
-    
+    dedupe_key = Column(String(64))
+
+    __table_args__ = (
+        # Fan-out writes insert with ON CONFLICT DO NOTHING on this key
+        Index("uq_alerts_user_dedupe_key", "user_id", "dedupe_key", unique=True),
+        # Per-user inbox, newest first (keyset on created_at, id)
+        Index("ix_alerts_user_created_id", "user_id", "created_at", "id"),
+    )
+
     # Relationships
-    user = relationship("User", back_populates="alerts")
\ No newline at end of file
+    user = relationship("User", back_populates="alerts")
+
+class NotificationOutbox(Base):
+    """SMS / voice call waiting to be sent (or already sent / dead-lettered) by the outbox worker."""
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(32), nullable=False)       # one enqueue call, for status polling
+    source = Column(String(50))                         # e.g. "alert_simulate"
+    kind = Column(String(10), nullable=False)           # sms | call
+    recipient = Column(String(20), nullable=False)
+    body = Column(Text)                                 # sms text
+    twiml = Column(Text)                                # call script
+    dedupe_key = Column(String(64), nullable=False)
+    status = Column(String(10), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    next_attempt_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    locked_until = Column(TIMESTAMP)                    # lease of the worker currently sending it
+    last_error = Column(Text)
+    provider_sid = Column(String(64))
+    created_at = Column(TIMESTAMP, default=datetime.utcnow)
+    sent_at = Column(TIMESTAMP)
+
+    __table_args__ = (
+        CheckConstraint("kind IN ('sms', 'call')", name="check_outbox_kind"),
+        CheckConstraint("status IN ('pending', 'sending', 'sent', 'dead')", name="check_outbox_status"),
+        # The same message reaches a recipient once, however often it is enqueued
+        Index("uq_outbox_recipient_kind_dedupe", "recipient", "kind", "dedupe_key", unique=True),
+        # Worker claim: due pending rows (and expired sending leases), oldest first
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_outbox_batch_id", "batch_id"),
+    )
+
+
+class AgentRun(Base):
+    """One scheduled or manual agent run, shared by every worker for polling and de-duplication."""
+    __tablename__ = "agent_runs"
+
+    id = Column(String(32), primary_key=True)            # uuid hex, the job id handed to clients
+    agent = Column(String(20), nullable=False)           # demand | mandi | farmer
+    params = Column(Text, nullable=False, default="{}")  # JSON keyword arguments
+    trigger = Column(String(10), nullable=False)         # schedule | manual
+    dedupe_key = Column(String(255), nullable=False)     # agent + params
+    status = Column(String(10), nullable=False, default="queued")
+    created_at = Column(TIMESTAMP, nullable=False, default=datetime.utcnow)
+    started_at = Column(TIMESTAMP)
+    finished_at = Column(TIMESTAMP)
+    duration_s = Column(Float)
+    result = Column(Text)
+    error = Column(Text)
+
+    __table_args__ = (
+        CheckConstraint("status IN ('queued', 'running', 'success', 'error')", name="check_agent_run_status"),
+        # At most one queued/running run per agent and params, across all workers
+        Index(
+            "uq_agent_runs_active_dedupe", "dedupe_key", unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_agent_runs_created_at", "created_at"),
+    )
+
+
+class MandiDailyRollup(Base):
+    """
+    Per mandi, item and day: order volume in (farmer → mandi) and out (mandi →
+    retailer). Maintained on order writes by mandi.rollup; rebuilt by
+    backfill_supply_rollup.py.
+    """
+    __tablename__ = "mandi_daily_rollup"
+
+    mandi_owner_id = Column(Integer, ForeignKey("mandi_owners.id", ondelete="CASCADE"), primary_key=True)
+    item = Column(String(100), primary_key=True)
+    day = Column(Date, primary_key=True)
+    inbound_orders = Column(Integer, nullable=False, default=0)
+    inbound_kg = Column(Numeric(14, 2), nullable=False, default=0)
+    inbound_value = Column(Numeric(16, 2), nullable=False, default=0)
+    inbound_price_sum = Column(Numeric(14, 2), nullable=False, default=0)   # Σ price_per_kg, for orders without quantity
+    outbound_orders = Column(Integer, nullable=False, default=0)
+    outbound_kg = Column(Numeric(14, 2), nullable=False, default=0)
+    outbound_value = Column(Numeric(16, 2), nullable=False, default=0)
+    outbound_price_sum = Column(Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        # Overview reads: one mandi, a date range, all items
+        Index("ix_rollup_mandi_day", "mandi_owner_id", "day"),
+    )
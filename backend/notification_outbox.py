@@ -0,0 +1,346 @@
+"""
+Durable outbox for SMS / voice-call notifications.
+
+Request handlers never talk to Twilio: they insert rows into
+`notification_outbox` and return. A worker thread in the elected leader
+process (see leader.py) drains the table in batches, so the per-process
+Twilio rate limit is the rate for the whole deployment:
+
+1. claim up to `claim_limit()` due rows with `FOR UPDATE SKIP LOCKED`, mark
+   them `sending` under a lease of OUTBOX_LEASE_SECONDS and count the
+   attempt. The claim is capped at what TWILIO_REQUESTS_PER_MINUTE can send
+   in half a lease, so a batch is not re-leased (and sent twice) mid-send;
+2. send the batch in parallel through `notifications.send_notification`
+   (shared client, shared Twilio rate limit);
+3. record each outcome: `sent`, back to `pending` with exponential backoff
+   for throttling / transient errors, or `dead` once a permanent error or
+   OUTBOX_MAX_ATTEMPTS is reached (dead letters keep their last error) —
+   only if the row is still `sending` under this worker's lease.
+
+A row whose worker died mid-send is picked up again once its lease expires,
+so nothing queued is lost on restart. Rows are unique per (recipient, kind,
+dedupe_key): enqueueing the same message for the same number twice in a day
+(by default) sends it once.
+
+Usage:
+    summary = enqueue_notifications(db, [Notification(kind="sms", to="+91...", body="...")], source="alert_simulate")
+    outbox_batch_status(db, summary["batch_id"])   # {status, sent, dead, pending, results, ...}
+
+    outbox_worker.start()      # on leader election; .stop() when demoted
+    outbox_worker.shutdown()   # lifespan shutdown
+"""
+
+import hashlib
+import logging
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, insert_ignoring_duplicates
+from models import NotificationOutbox
+from notifications import Notification, is_retryable, send_notification
+
+logger = logging.getLogger("notification_outbox")
+
+
+def derive_outbox_key(notification: Notification, source: str, day: Optional[str] = None) -> str:
+    """Stable key for "this text / call script, from this source, today" (per recipient via the index)."""
+    day = day or datetime.utcnow().strftime("%Y-%m-%d")
+    content = notification.body if notification.kind == "sms" else notification.twiml
+    return hashlib.sha256(f"{source}|{day}|{notification.kind}|{content or ''}".encode()).hexdigest()[:40]
+
+
+# ── Enqueue ──────────────────────────────────────────────────────────────────
+def enqueue_notifications(
+    db: Session,
+    notifications: List[Notification],
+    source: str,
+    dedupe_key: Optional[str] = None,
+) -> dict:
+    """
+    Queue `notifications` in one INSERT, skipping any already queued for the
+    same recipient and key. Returns {batch_id, queued, duplicates, results},
+    `results` saying per notification whether it was queued now or is a
+    duplicate, with the batch and status of the row that will send it.
+    """
+    batch_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    rows = [
+        {
+            "batch_id": batch_id,
+            "source": source,
+            "kind": n.kind,
+            "recipient": n.to,
+            "body": n.body,
+            "twiml": n.twiml,
+            "dedupe_key": dedupe_key or derive_outbox_key(n, source),
+            "status": "pending",
+            "attempts": 0,
+            "max_attempts": settings.OUTBOX_MAX_ATTEMPTS,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        for n in notifications
+    ]
+    queued, results = 0, []
+    if rows:
+        stmt = insert_ignoring_duplicates(
+            db, NotificationOutbox, ["recipient", "kind", "dedupe_key"]
+        ).returning(NotificationOutbox.id)
+        queued = len(db.execute(stmt.values(rows)).all())
+        db.commit()
+        # New and pre-existing rows alike, to report who sends each notification
+        existing = {
+            (r.recipient, r.kind, r.dedupe_key): r
+            for r in db.execute(
+                select(
+                    NotificationOutbox.recipient, NotificationOutbox.kind, NotificationOutbox.dedupe_key,
+                    NotificationOutbox.batch_id, NotificationOutbox.status,
+                ).where(
+                    NotificationOutbox.recipient.in_({row["recipient"] for row in rows}),
+                    NotificationOutbox.dedupe_key.in_({row["dedupe_key"] for row in rows}),
+                )
+            ).all()
+        }
+        for row in rows:
+            match = existing.get((row["recipient"], row["kind"], row["dedupe_key"]))
+            results.append({
+                "type": row["kind"],
+                "to": row["recipient"],
+                "queued": match is not None and match.batch_id == batch_id,
+                "batch_id": match.batch_id if match else None,
+                "status": match.status if match else None,
+            })
+    if queued:
+        outbox_worker.wake()
+    return {"batch_id": batch_id, "queued": queued, "duplicates": len(rows) - queued, "results": results}
+
+
+def outbox_batch_status(db: Session, batch_id: str) -> Optional[dict]:
+    """Per-recipient outcome of one enqueue call, or None if the batch is unknown."""
+    rows = db.scalars(
+        select(NotificationOutbox).where(NotificationOutbox.batch_id == batch_id).order_by(NotificationOutbox.id)
+    ).all()
+    if not rows:
+        return None
+    counts = {status: sum(1 for r in rows if r.status == status) for status in ("pending", "sending", "sent", "dead")}
+    return {
+        "id": batch_id,
+        "status": "sending" if counts["pending"] or counts["sending"] else "done",
+        "total": len(rows),
+        "sent": counts["sent"],
+        "dead": counts["dead"],
+        "pending": counts["pending"] + counts["sending"],
+        "results": [
+            {
+                "type": r.kind,
+                "to": r.recipient,
+                "status": r.status,
+                "attempts": r.attempts,
+                "sid": r.provider_sid,
+                "error": r.last_error,
+                "next_attempt_at": r.next_attempt_at.isoformat() if r.status == "pending" else None,
+            }
+            for r in rows
+        ],
+    }
+
+
+# ── Worker ───────────────────────────────────────────────────────────────────
+def claim_limit() -> int:
+    """OUTBOX_BATCH_SIZE, capped at the sends the Twilio rate limit allows in half a lease."""
+    if settings.TWILIO_REQUESTS_PER_MINUTE <= 0:
+        return settings.OUTBOX_BATCH_SIZE
+    per_lease = settings.TWILIO_REQUESTS_PER_MINUTE / 60 * settings.OUTBOX_LEASE_SECONDS / 2
+    return max(1, min(settings.OUTBOX_BATCH_SIZE, int(per_lease)))
+
+
+def claim_batch(db: Session, limit: int) -> List[dict]:
+    """
+    Lease up to `limit` due rows to this worker and return their contents,
+    including the lease (`locked_until`) that the outcome write must still match.
+    """
+    now = datetime.utcnow()
+    lease = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+    due = or_(
+        and_(NotificationOutbox.status == "pending", NotificationOutbox.next_attempt_at <= now),
+        and_(NotificationOutbox.status == "sending", NotificationOutbox.locked_until < now),
+    )
+    ids = db.scalars(
+        select(NotificationOutbox.id)
+        .where(due)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return []
+    claimed = db.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(ids))
+        .values(
+            status="sending",
+            locked_until=lease,
+            attempts=NotificationOutbox.attempts + 1,
+        )
+        .returning(
+            NotificationOutbox.id, NotificationOutbox.kind, NotificationOutbox.recipient,
+            NotificationOutbox.body, NotificationOutbox.twiml,
+            NotificationOutbox.attempts, NotificationOutbox.max_attempts,
+            NotificationOutbox.locked_until,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return [row._asdict() for row in claimed]
+
+
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff from OUTBOX_RETRY_BASE_SECONDS, ±25% jitter so a burst does not retry in lockstep."""
+    delay = min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.75, 1.25)
+
+
+class OutboxWorker:
+    def __init__(self):
+        self._pool = ThreadPoolExecutor(max_workers=settings.TWILIO_DISPATCH_WORKERS, thread_name_prefix="outbox-send")
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.lease_lost = 0     # outcomes dropped because another worker had reclaimed the row
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start draining (no-op if already draining); may follow a stop()."""
+        with self._thread_lock:
+            self._stop.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stop claiming; in-flight sends finish and unclaimed rows stay queued."""
+        with self._thread_lock:
+            self._stop.set()
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout=settings.OUTBOX_POLL_SECONDS + 5)
+
+    def shutdown(self) -> None:
+        """Stop for good, dropping sends not yet started."""
+        self.stop()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def wake(self) -> None:
+        """Drain now instead of at the next poll (called after an enqueue)."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            with self._thread_lock:
+                if self._stop.is_set():
+                    self._thread = None
+                    return
+            try:
+                drained = self.drain_once()
+                self.last_error = None
+            except Exception as e:
+                drained = 0
+                self.last_error = str(e)
+                logger.error(f"Outbox drain failed: {e}", exc_info=True)
+            if not drained:
+                self._wake.wait(settings.OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+    def drain_once(self) -> int:
+        """Claim, send and record one batch; returns how many rows it handled."""
+        db = SessionLocal()
+        try:
+            batch = claim_batch(db, claim_limit())
+        finally:
+            db.close()
+        if not batch:
+            return 0
+
+        outcomes = list(self._pool.map(self._attempt, batch))
+        db = SessionLocal()
+        try:
+            for row, outcome in zip(batch, outcomes):
+                # Only while our lease holds: once it expires another worker may
+                # have reclaimed the row, and its outcome must not be overwritten
+                recorded = db.execute(
+                    update(NotificationOutbox)
+                    .where(
+                        NotificationOutbox.id == row["id"],
+                        NotificationOutbox.status == "sending",
+                        NotificationOutbox.locked_until == row["locked_until"],
+                    )
+                    .values(**outcome)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not recorded:
+                    with self._lock:
+                        self.lease_lost += 1
+                    logger.warning(
+                        f"Outbox {row['kind']} to {row['recipient']}: lease expired before the outcome "
+                        f"({outcome['status']}) was recorded; keeping the reclaiming worker's result"
+                    )
+            db.commit()
+        finally:
+            db.close()
+        return len(batch)
+
+    def _attempt(self, row: dict) -> dict:
+        """Send one claimed row; returns the column values recording the outcome."""
+        notification = Notification(kind=row["kind"], to=row["recipient"], body=row["body"], twiml=row["twiml"])
+        now = datetime.utcnow()
+        try:
+            sid = send_notification(notification, retries=0)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_retryable(e) and row["attempts"] < row["max_attempts"]:
+                with self._lock:
+                    self.retried += 1
+                return {
+                    "status": "pending", "locked_until": None, "last_error": error,
+                    "next_attempt_at": now + timedelta(seconds=_retry_delay(row["attempts"])),
+                }
+            logger.error(f"Outbox {row['kind']} to {row['recipient']} dead-lettered after {row['attempts']} attempt(s): {e}")
+            with self._lock:
+                self.dead += 1
+            return {"status": "dead", "locked_until": None, "last_error": error}
+
+        with self._lock:
+            self.sent += 1
+        return {
+            "status": "sent", "locked_until": None, "last_error": None,
+            "provider_sid": sid, "sent_at": now,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "sent": self.sent,
+                "retried": self.retried,
+                "dead": self.dead,
+                "lease_lost": self.lease_lost,
+                "last_error": self.last_error,
+            }
+
+
+outbox_worker = OutboxWorker()
@@ -0,0 +1,134 @@
+"""
+SMS / voice-call dispatch through Twilio.
+
+One Twilio client is shared by the whole process (its HTTP session keeps
+connections to the API warm) and every send, from any thread, draws from
+one token bucket (TWILIO_REQUESTS_PER_MINUTE) so a long contact list cannot
+trip the account's rate limit. Throttled (429), 5xx and connection failures
+are retryable (`is_retryable`); other Twilio errors (bad number, unverified
+recipient) are not.
+
+Requests don't send directly: they enqueue into the durable outbox
+(notification_outbox.py), whose worker calls `send_notification` in parallel.
+TWILIO_FAKE=true swaps the client for `FakeTwilioClient`, which records what
+would have been sent (no credentials needed).
+
+Usage:
+    sid = send_notification(Notification(kind="sms", to="+91...", body="..."))   # blocking, with retries
+"""
+
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+import requests
+from twilio.base.exceptions import TwilioRestException
+
+from config import settings
+from rate_limits import twilio_rate_limiter
+
+logger = logging.getLogger("notifications")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass(frozen=True)
+class Notification:
+    kind: str                       # "sms" | "call"
+    to: str
+    body: Optional[str] = None      # sms text
+    twiml: Optional[str] = None     # call script
+
+
+class NotificationNotConfigured(Exception):
+    pass
+
+
+# ── Clients ──────────────────────────────────────────────────────────────────
+class _FakeResource:
+    def __init__(self, client: "FakeTwilioClient", kind: str):
+        self._client = client
+        self._kind = kind
+
+    def create(self, to: str, from_: str, **kwargs):
+        time.sleep(self._client.latency)
+        sid = f"{'SM' if self._kind == 'sms' else 'CA'}{uuid.uuid4().hex}"
+        with self._client._lock:
+            self._client.sent.append({"kind": self._kind, "to": to, "from": from_, "sid": sid, **kwargs})
+        return type("FakeTwilioRecord", (), {"sid": sid})()
+
+
+class FakeTwilioClient:
+    """Stand-in for `twilio.rest.Client`: same `messages`/`calls` `.create()` calls, recorded in `sent`."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: List[dict] = []
+        self._lock = threading.Lock()
+        self.messages = _FakeResource(self, "sms")
+        self.calls = _FakeResource(self, "call")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_twilio_client():
+    """The process-wide Twilio client (a `FakeTwilioClient` when TWILIO_FAKE is set)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if settings.TWILIO_FAKE:
+                _client = FakeTwilioClient(latency=settings.TWILIO_FAKE_LATENCY_SECONDS)
+            elif not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
+                raise NotificationNotConfigured("Twilio credentials not configured")
+            else:
+                from twilio.rest import Client as TwilioClient
+                _client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+        return _client
+
+
+def notifications_configured() -> bool:
+    return settings.TWILIO_FAKE or all(
+        [settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]
+    )
+
+
+# ── Sending ──────────────────────────────────────────────────────────────────
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, TwilioRestException):
+        return error.status in RETRYABLE_STATUS
+    return isinstance(error, requests.RequestException)
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    cap = min(settings.TWILIO_RETRY_MAX_DELAY, settings.TWILIO_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def send_notification(notification: Notification, retries: Optional[int] = None) -> str:
+    """Send one SMS or call (blocking), retrying throttling and transient errors. Returns the SID."""
+    client = get_twilio_client()
+    from_number = settings.TWILIO_PHONE_NUMBER or "+10000000000"
+    retries = settings.TWILIO_RETRIES if retries is None else retries
+
+    for attempt in range(retries + 1):
+        if twilio_rate_limiter is not None:
+            twilio_rate_limiter.acquire()
+        try:
+            if notification.kind == "call":
+                record = client.calls.create(twiml=notification.twiml, from_=from_number, to=notification.to)
+            else:
+                record = client.messages.create(body=notification.body, from_=from_number, to=notification.to)
+            return record.sid
+        except Exception as e:
+            if attempt == retries or not is_retryable(e):
+                raise
+            delay = _backoff_seconds(attempt)
+            logger.warning(f"{notification.kind} to {notification.to} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
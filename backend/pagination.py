@@ -0,0 +1,191 @@
+"""
+Keyset (cursor) pagination helpers shared by the list endpoints.
+
+Pages are ordered newest-first by primary key. The cursor handed back to the
+client is an opaque base64 token wrapping the last id of the page, so the next
+page is a single `WHERE id < :last_id ORDER BY id DESC LIMIT n` index range
+scan regardless of how deep the client has paged.
+
+Works on both legacy `Query` objects and 2.0 `select()` statements, so the
+same helpers serve sync and async sessions.
+
+Feeds ordered by a timestamp use `time_keyset_query`, whose cursor wraps
+(timestamp, id) so the page boundary is a row-value comparison on a
+`(…, created_at, id)` index.
+
+Order listings page by id, or by (order_date, id) once a date range is
+given (`order_keyset_query`), so each filter walks an index in page order:
+`(item, id)`, `(order_date, id)` or `(item, order_date, id)`. The date
+predicate also excludes NULL order_dates, which a row-value cursor could not
+step past.
+
+Usage:
+    stmt = apply_order_filters(select(Order), Order, item=..., date_from=...)
+    stmt = keyset_query(stmt, Order.id, cursor, limit)
+    rows, next_cursor = split_page((await db.execute(stmt)).scalars().all(), limit)
+
+    stmt = time_keyset_query(select(Alert), Alert.created_at, Alert.id, cursor, limit)
+    rows, next_cursor = split_page(rows, limit, cursor_for=lambda a: encode_time_cursor(a.created_at, a.id))
+
+    by_date = date_from is not None or date_to is not None
+    stmt = order_keyset_query(stmt, Order, cursor, limit, by_date)
+    rows, next_cursor = split_page(rows, limit, cursor_for=order_cursor_for(by_date))
+"""
+
+import base64
+from datetime import date, datetime
+from typing import Callable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id) -> str:
+    """Wrap the last id of a page into an opaque cursor string."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Unwrap a cursor produced by `encode_cursor`, or 400 if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def encode_time_cursor(timestamp: Union[date, datetime], last_id: int) -> str:
+    """Wrap the (timestamp or date, id) of the last row of a page into an opaque cursor."""
+    return encode_cursor(f"{timestamp.isoformat()}|{last_id}")
+
+
+def decode_time_cursor(
+    cursor: Optional[str],
+    parse: Callable[[str], Union[date, datetime]] = datetime.fromisoformat,
+) -> Optional[Tuple[Union[date, datetime], int]]:
+    """Unwrap a cursor produced by `encode_time_cursor`, or 400 if it is malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, last_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return parse(timestamp), int(last_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_bbox(bbox: Optional[str]) -> Optional[Tuple[float, float, float, float]]:
+    """Parse 'min_lat,min_lng,max_lat,max_lng' into a tuple, or 400."""
+    if not bbox:
+        return None
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Bounding box must be 'min_lat,min_lng,max_lat,max_lng'",
+        )
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Bounding box minimums exceed maximums")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def apply_order_filters(
+    query,
+    model,
+    item: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    src_bbox: Optional[str] = None,
+    dest_bbox: Optional[str] = None,
+):
+    """Narrow an order query by item, order-date range and src/dest bounding boxes."""
+    if item:
+        query = query.filter(model.item == item)
+    if date_from:
+        query = query.filter(model.order_date >= date_from)
+    if date_to:
+        query = query.filter(model.order_date <= date_to)
+
+    for box, lat_col, lng_col in (
+        (parse_bbox(src_bbox), model.src_lat, model.src_long),
+        (parse_bbox(dest_bbox), model.dest_lat, model.dest_long),
+    ):
+        if box:
+            min_lat, min_lng, max_lat, max_lng = box
+            query = query.filter(
+                lat_col.between(min_lat, max_lat),
+                lng_col.between(min_lng, max_lng),
+            )
+    return query
+
+
+def keyset_query(query, id_column, cursor: Optional[str], limit: int):
+    """
+    Restrict `query` to the page after `cursor`, ordered by `id_column` descending.
+
+    One extra row is requested so `split_page` can tell whether another page exists.
+    """
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        query = query.filter(id_column < last_id)
+    return query.order_by(id_column.desc()).limit(limit + 1)
+
+
+def time_keyset_query(
+    query,
+    time_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    parse: Callable[[str], Union[date, datetime]] = datetime.fromisoformat,
+):
+    """
+    Like `keyset_query`, but ordered by (`time_column`, `id_column`) descending
+    with a cursor from `encode_time_cursor` (`parse` reads its timestamp part).
+    """
+    position = decode_time_cursor(cursor, parse)
+    if position is not None:
+        query = query.filter(tuple_(time_column, id_column) < tuple_(*position))
+    return query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def order_keyset_query(query, model, cursor: Optional[str], limit: int, by_date: bool):
+    """Page an order listing by id, or by (order_date, id) when it is date-filtered."""
+    if by_date:
+        return time_keyset_query(query, model.order_date, model.id, cursor, limit, parse=date.fromisoformat)
+    return keyset_query(query, model.id, cursor, limit)
+
+
+def order_cursor_for(by_date: bool) -> Optional[Callable]:
+    """The `split_page` cursor builder matching `order_keyset_query`."""
+    if by_date:
+        return lambda order: encode_time_cursor(order.order_date, order.id)
+    return None
+
+
+def split_page(
+    rows: List,
+    limit: int,
+    cursor_for: Optional[Callable] = None,
+) -> Tuple[List, Optional[str]]:
+    """
+    Trim the look-ahead row; returns (rows, next_cursor), next_cursor None on
+    the last page. `cursor_for(last_row)` builds the cursor (default: its id).
+    """
+    if len(rows) <= limit:
+        return list(rows), None
+    rows = list(rows[:limit])
+    return rows, (cursor_for or (lambda row: encode_cursor(row.id)))(rows[-1])
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    """Expose the next-page cursor as a response header (body stays a plain list)."""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
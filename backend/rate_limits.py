@@ -0,0 +1,57 @@
+"""
+Process-wide request quotas for the LLM, search and Twilio upstreams.
+
+Every agent run in this process shares the same token buckets, so a fleet of
+parallel runs stays inside the Groq / Tavily quotas no matter how many
+run concurrently.
+
+Usage:
+    llm = ChatGroq(..., rate_limiter=groq_rate_limiter)
+    search = rate_limited_tool(TavilySearchResults(...), tavily_rate_limiter)
+"""
+
+from typing import Optional
+
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_core.tools import BaseTool, StructuredTool
+
+from config import settings
+
+
+def _limiter(per_minute: float) -> Optional[InMemoryRateLimiter]:
+    """Token bucket refilling at `per_minute`/60 per second; None when unlimited."""
+    if per_minute <= 0:
+        return None
+    per_second = per_minute / 60
+    return InMemoryRateLimiter(
+        requests_per_second=per_second,
+        check_every_n_seconds=0.05,
+        max_bucket_size=max(1.0, per_second),  # allow about one second of burst
+    )
+
+
+groq_rate_limiter = _limiter(settings.GROQ_REQUESTS_PER_MINUTE)
+tavily_rate_limiter = _limiter(settings.TAVILY_REQUESTS_PER_MINUTE)
+twilio_rate_limiter = _limiter(settings.TWILIO_REQUESTS_PER_MINUTE)
+
+
+def rate_limited_tool(inner: BaseTool, limiter: Optional[InMemoryRateLimiter]) -> BaseTool:
+    """Wrap `inner` so each call first takes a token from `limiter` (same name and schema)."""
+    if limiter is None:
+        return inner
+
+    def _run(**kwargs):
+        limiter.acquire()
+        return inner.invoke(kwargs)
+
+    async def _arun(**kwargs):
+        await limiter.aacquire()
+        return await inner.ainvoke(kwargs)
+
+    return StructuredTool.from_function(
+        func=_run,
+        coroutine=_arun,
+        name=inner.name,
+        description=inner.description,
+        args_schema=inner.args_schema,
+    )
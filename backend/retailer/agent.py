@@ -9,11 +9,22 @@ Flow:
   3. Use Tavily to search for market / demand news near those locations.
   4. LLM decides whether to create alerts.
   5. Persist alerts into the `alerts` table with severity.
+
+With no target retailer, `run_demand_fleet` runs the agent for every retailer
+concurrently (bounded by DEMAND_AGENT_CONCURRENCY, each run capped at
+DEMAND_AGENT_TIMEOUT_SECONDS) and returns a per-retailer run report.
+
+Steps 1–2 run once up front (`agent_context.build_retailer_contexts`, one
+pass for the whole fleet) and each retailer's slice is passed to the LLM as
+a context block, unless AGENT_PRECOMPUTE_CONTEXT=false.
 """
 
+import asyncio
 import json
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import func as sa_func
@@ -22,9 +33,12 @@ from langchain.agents import create_agent
 from langchain_core.tools import tool
 from langchain_groq import ChatGroq
 
+from agent_context import build_retailer_contexts, context_block, record_run, run_stats
+from alerts.fanout import save_alert_json
 from config import settings
 from database import SessionLocal
-from models import RetailerMandiOrder, Retailer, User, Alert
+from models import RetailerMandiOrder, Retailer, User
+from rate_limits import groq_rate_limiter, rate_limited_tool, tavily_rate_limiter
 
 logger = logging.getLogger("demand_agent")
 
@@ -143,27 +157,9 @@ def get_retailer_details(user_id: str) -> str:
 def save_personal_alert(alert_json: str) -> str:
     """
     Save an alert.
-    Input JSON: { "user_id": int, "message": str, "severity": "low"|"medium"|"high"}
+    Input JSON: { "user_id": int, "message": str, "severity": "low"|"medium"|"high"|"critical"}
     """
-    return save_alert(alert_json) # reuse existing function logic if possible or copy paste
-    # To avoid 'save_alert' not defined error if I replaced it, I'll paste logic here.
-    
-    db: Session = SessionLocal()
-    try:
-        data = json.loads(alert_json)
-        alert = Alert(
-            user_id=data["user_id"],
-            message=data["message"],
-            severity=data.get("severity", "medium"),
-        )
-        db.add(alert)
-        db.commit()
-        db.refresh(alert)
-        return f"Alert saved for user {alert.user_id}."
-    except Exception as e:
-        return f"Error: {e}"
-    finally:
-        db.close()
+    return save_alert_json(alert_json, role="retailer", scope="demand_agent")
 
 
 # ── System prompt ────────────────────────────────────────────────────────────
@@ -187,20 +183,34 @@ STEPS:
 6. Return a summary.
 """
 
+# Used when the retailer's details and sales are precomputed and passed in the message.
+CONTEXT_SYSTEM_PROMPT = """You are a smart retail assistant.
+Your goal: Analyze sales AND local events to warn a SPECIFIC retailer.
+
+INPUT: The user message contains a JSON context block with:
+  - retailer: user_id, username, lat/lng, contact
+  - sales_5d: per item order_count and avg_price over the past 5 days
+    (if sales for an item are high/rising, it's a "High Demand" signal)
+
+STEPS:
+1. Read the context block; do not ask for data it already contains.
+2. Use `tavily_search_results_json` to find LOCAL news/events near their lat/long.
+   - Search for: "events in [City/Area]", "festivals near [Lat, Long]", "weather warnings [Location]".
+   - If an event is coming up (festival, holiday, storm), demand might spike.
+3. COMBINE insights:
+   - IF (High Past Sales) AND (Upcoming Event) -> Critical Alert: "Stock up immediately!"
+   - IF (Normal Sales) AND (Upcoming Event) -> Medium Alert: "Event coming, expect demand."
+   - IF (High Sales) AND (No Event) -> Medium Alert: "Trending item, restock."
+4. Call `save_personal_alert` with the retailer's `user_id` and your message.
+5. Return a summary.
+"""
+
+# Tools that open a DB session (counted in the run stats)
+RETAILER_DB_TOOLS = {"get_recent_sales", "get_retailer_details", "save_personal_alert"}
+
 
 # ── Build & run ──────────────────────────────────────────────────────────────
-def run_demand_agent(target_user_id: int = None) -> str:
-    """
-    Run agent. If target_user_id is None, it runs for ALL retailers (legacy mode).
-    If target_user_id is provided, it runs ONLY for that retailer.
-    """
-    # ... legacy loop logic if need be, but user asked to update "the prompt to include user_id" 
-    # implying we run it FOR a specific user.
-    # To keep backward compat, if None, we could loop all. 
-    # But let's simplify: The specific prompt above expects a user_id. 
-    # If no ID provided, we can pick the first one or fail. 
-    # Let's assume for this task we just support the specific mode or loop all calling the agent for each.
-    
+def _build_agent(precompute: bool):
     from langchain_community.tools.tavily_search import TavilySearchResults
 
     tavily_search = TavilySearchResults(
@@ -211,32 +221,172 @@ def run_demand_agent(target_user_id: int = None) -> str:
     llm = ChatGroq(
         model="gpt-oss-120b",
         api_key=settings.GROQ_API_KEY,
+        rate_limiter=groq_rate_limiter,
     )
-    
+
+    tavily_search = rate_limited_tool(tavily_search, tavily_rate_limiter)
+    if precompute:
+        return create_agent(llm, tools=[tavily_search, save_personal_alert], system_prompt=CONTEXT_SYSTEM_PROMPT)
+
     tools = [get_recent_sales, get_retailer_details, tavily_search, save_personal_alert]
+    return create_agent(llm, tools=tools, system_prompt=SYSTEM_PROMPT)
+
+
+def _retailer_message(user_id: int, context: Optional[dict] = None) -> dict:
+    text = f"Analyze for retailer user_id='{user_id}'"
+    if context is not None:
+        text += f"\n\nCONTEXT:\n{context_block(context)}"
+    return {"messages": [("user", text)]}
+
+
+def _precompute_contexts(user_ids: Optional[List[int]]) -> Dict[int, dict]:
+    db: Session = SessionLocal()
+    try:
+        return build_retailer_contexts(db, user_ids)
+    finally:
+        db.close()
+
 
-    agent = create_agent(llm, tools=tools, prompt=SYSTEM_PROMPT)
+def _token_usage(messages) -> dict:
+    """Sum the LLM token usage reported on the AI messages of one run."""
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for message in messages:
+        metadata = getattr(message, "usage_metadata", None) or {}
+        for key in usage:
+            usage[key] += metadata.get(key, 0)
+    return usage
+
+
+async def _run_for_retailer(
+    agent, user_id: int, context: Optional[dict], semaphore: asyncio.Semaphore, timeout: float,
+) -> dict:
+    async with semaphore:
+        entry = {"user_id": user_id, "ok": False, "timed_out": False}
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(agent.ainvoke(_retailer_message(user_id, context)), timeout=timeout)
+            messages = result.get("messages", [])
+            stats = run_stats(messages, time.perf_counter() - start, False, RETAILER_DB_TOOLS)
+            entry.update(
+                ok=True,
+                summary=messages[-1].content if messages else "",
+                tokens=_token_usage(messages),
+                llm_turns=stats["llm_turns"],
+                tool_calls=stats["tool_calls"],
+                db_sessions=stats["db_sessions"],
+            )
+        except asyncio.TimeoutError:
+            entry.update(timed_out=True, error=f"timed out after {timeout}s")
+        except Exception as e:
+            entry["error"] = str(e)
+        entry["latency_s"] = round(time.perf_counter() - start, 2)
+        return entry
+
+
+async def run_demand_fleet(
+    user_ids: List[int],
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    precompute: Optional[bool] = None,
+) -> dict:
+    """
+    Run the agent for every retailer in `user_ids`, at most `concurrency` at
+    a time, each bounded by `timeout` seconds. Groq and Tavily calls draw on
+    the process-wide quotas in `rate_limits`. With `precompute` (default:
+    AGENT_PRECOMPUTE_CONTEXT) every retailer's details and sales are
+    aggregated once for the whole fleet. Returns a run report.
+    """
+    concurrency = concurrency or settings.DEMAND_AGENT_CONCURRENCY
+    timeout = timeout or settings.DEMAND_AGENT_TIMEOUT_SECONDS
+    precompute = settings.AGENT_PRECOMPUTE_CONTEXT if precompute is None else precompute
+    agent = _build_agent(precompute)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+    contexts = await asyncio.to_thread(_precompute_contexts, user_ids) if precompute else {}
+    results = await asyncio.gather(
+        *(_run_for_retailer(agent, uid, contexts.get(uid), semaphore, timeout) for uid in user_ids)
+    )
+    wall = time.perf_counter() - start
+
+    latencies = sorted(r["latency_s"] for r in results)
+    tokens = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for r in results:
+        for key, value in r.get("tokens", {}).items():
+            tokens[key] += value
+
+    return {
+        "started_at": started_at.isoformat(),
+        "wall_s": round(wall, 2),
+        "mode": "precomputed" if precompute else "tool_discovery",
+        "concurrency": concurrency,
+        "timeout_s": timeout,
+        "retailers": len(results),
+        "succeeded": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "timed_out": sum(1 for r in results if r["timed_out"]),
+        "latency_p50_s": latencies[len(latencies) // 2] if latencies else 0.0,
+        "latency_p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        "tokens": tokens,
+        "llm_turns": sum(r.get("llm_turns", 0) for r in results),
+        "tool_calls": sum(r.get("tool_calls", 0) for r in results),
+        "db_sessions": int(precompute) + sum(r.get("db_sessions", 0) for r in results),
+        "results": results,
+    }
+
+
+_last_fleet_report: Optional[dict] = None
+
+
+def demand_fleet_stats() -> Optional[dict]:
+    """Totals of the last fleet run (without per-retailer rows) for the metrics endpoint."""
+    if _last_fleet_report is None:
+        return None
+    return {k: v for k, v in _last_fleet_report.items() if k != "results"}
+
+
+def run_demand_agent(target_user_id: int = None, precompute: Optional[bool] = None) -> str:
+    """
+    Run agent. If target_user_id is None, it runs for ALL retailers (legacy mode).
+    If target_user_id is provided, it runs ONLY for that retailer.
+    """
+    global _last_fleet_report
+    precompute = settings.AGENT_PRECOMPUTE_CONTEXT if precompute is None else precompute
 
     # If target_user_id is provided, run once.
     if target_user_id:
-        result = agent.invoke({
-            "messages": [("user", f"Analyze for retailer user_id='{target_user_id}'")]
-        })
-        return result.get("messages", [])[-1].content
-    
-    # If no ID, loop all (legacy behavior support)
+        start = time.perf_counter()
+        context = _precompute_contexts([target_user_id]).get(target_user_id) if precompute else None
+        result = _build_agent(precompute).invoke(_retailer_message(target_user_id, context))
+        messages = result.get("messages", [])
+        stats = run_stats(messages, time.perf_counter() - start, precompute, RETAILER_DB_TOOLS)
+        record_run("retailer", stats)
+        logger.info(f"Demand agent run for user {target_user_id}: {stats}")
+        return messages[-1].content
+
+    # If no ID, run the whole fleet in parallel (legacy behavior support)
     db = SessionLocal()
-    retailers = db.query(Retailer).all()
-    db.close()
-    
-    log = []
-    for r in retailers:
-        try:
-             res = agent.invoke({
-                "messages": [("user", f"Analyze for retailer user_id='{r.user_id}'")]
-             })
-             log.append(f"User {r.user_id}: " + res.get("messages", [])[-1].content)
-        except Exception as e:
-             log.append(f"User {r.user_id} clean failed: {e}")
-             
+    try:
+        user_ids = [uid for (uid,) in db.query(Retailer.user_id).all()]
+    finally:
+        db.close()
+
+    report = asyncio.run(run_demand_fleet(user_ids, precompute=precompute))
+    _last_fleet_report = report
+    logger.info(
+        f"Demand fleet run: {report['succeeded']}/{report['retailers']} succeeded, "
+        f"{report['timed_out']} timed out, {report['wall_s']}s wall, "
+        f"{report['tokens']['total_tokens']} tokens, {report['tool_calls']} tool calls ({report['mode']})"
+    )
+
+    log = [
+        f"Fleet run: {report['succeeded']}/{report['retailers']} retailers succeeded "
+        f"in {report['wall_s']}s ({report['timed_out']} timed out)"
+    ]
+    for r in report["results"]:
+        if r["ok"]:
+            log.append(f"User {r['user_id']}: {r['summary']}")
+        else:
+            log.append(f"User {r['user_id']} failed: {r['error']}")
     return "\n".join(log)
@@ -1,15 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from database import get_db
+from database import get_db, get_async_db
 from models import Retailer, RetailerItem, RetailerMandiOrder, User
 from schemas import (
     RetailerProfileUpdate, RetailerProfileResponse,
     RetailerItemCreate, RetailerItemUpdate, RetailerItemResponse,
     RetailerMandiOrderCreate, RetailerMandiOrderUpdate, RetailerMandiOrderResponse,
 )
-from auth import get_current_user, require_role
+from auth import (
+    Principal, invalidate_principal, require_principal, require_role,
+)
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    apply_order_filters, order_cursor_for, order_keyset_query, set_next_cursor, split_page,
+)
 
 router = APIRouter(prefix="/api/retailer", tags=["Retailer"])
 
@@ -23,6 +32,13 @@ def _get_retailer_profile(user: User, db: Session) -> Retailer:
     return retailer
 
 
+def _retailer_id(principal: Principal) -> int:
+    """Return the cached Retailer id for the authenticated principal, or 404."""
+    if principal.profile_id is None:
+        raise HTTPException(status_code=404, detail="Retailer profile not found")
+    return principal.profile_id
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 #  PROFILE
 # ═════════════════════════════════════════════════════════════════════════════
@@ -59,6 +75,7 @@ def update_profile(
         retailer.language = payload.language
 
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(retailer)
     return retailer
 
@@ -68,63 +85,64 @@ def update_profile(
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/items", response_model=List[RetailerItemResponse])
-def list_items(
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+async def list_items(
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """List all items belonging to the logged-in retailer."""
-    retailer = _get_retailer_profile(current_user, db)
-    return db.query(RetailerItem).filter(RetailerItem.retailer_id == retailer.id).all()
+    retailer_id = _retailer_id(principal)
+    result = await db.execute(select(RetailerItem).where(RetailerItem.retailer_id == retailer_id))
+    return result.scalars().all()
 
 
 @router.post("/items", response_model=RetailerItemResponse, status_code=status.HTTP_201_CREATED)
-def create_item(
+async def create_item(
     payload: RetailerItemCreate,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a new item to the retailer's inventory."""
-    retailer = _get_retailer_profile(current_user, db)
+    retailer_id = _retailer_id(principal)
     item = RetailerItem(
-        retailer_id=retailer.id,
+        retailer_id=retailer_id,
         name=payload.name,
         item=payload.item,
         quantity=payload.quantity,
     )
     db.add(item)
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
 @router.get("/items/{item_id}", response_model=RetailerItemResponse)
-def get_item(
+async def get_item(
     item_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a single retailer item by ID."""
-    retailer = _get_retailer_profile(current_user, db)
-    item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
-    ).first()
+    retailer_id = _retailer_id(principal)
+    item = await db.scalar(select(RetailerItem).where(
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 
 @router.put("/items/{item_id}", response_model=RetailerItemResponse)
-def update_item(
+async def update_item(
     item_id: int,
     payload: RetailerItemUpdate,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing retailer item."""
-    retailer = _get_retailer_profile(current_user, db)
-    item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
-    ).first()
+    retailer_id = _retailer_id(principal)
+    item = await db.scalar(select(RetailerItem).where(
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -132,26 +150,26 @@ def update_item(
     for key, value in update_data.items():
         setattr(item, key, value)
 
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await db.refresh(item)
     return item
 
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_item(
+async def delete_item(
     item_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a retailer item."""
-    retailer = _get_retailer_profile(current_user, db)
-    item = db.query(RetailerItem).filter(
-        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer.id
-    ).first()
+    retailer_id = _retailer_id(principal)
+    item = await db.scalar(select(RetailerItem).where(
+        RetailerItem.id == item_id, RetailerItem.retailer_id == retailer_id
+    ))
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -159,50 +177,73 @@ def delete_item(
 # ═════════════════════════════════════════════════════════════════════════════
 
 @router.get("/orders", response_model=List[RetailerMandiOrderResponse])
-def list_orders(
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+async def list_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    item: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    src_bbox: Optional[str] = Query(None, description="min_lat,min_lng,max_lat,max_lng"),
+    dest_bbox: Optional[str] = Query(None, description="min_lat,min_lng,max_lat,max_lng"),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """List all retailer-mandi orders."""
-    return db.query(RetailerMandiOrder).all()
+    """
+    List retailer-mandi orders, newest first (by order date when a date range
+    is given), one page at a time.
+
+    Pass the `X-Next-Cursor` response header back as `?cursor=` to fetch the
+    next page; the header is absent on the last page.
+    """
+    stmt = apply_order_filters(
+        select(RetailerMandiOrder), RetailerMandiOrder,
+        item=item, date_from=date_from, date_to=date_to,
+        src_bbox=src_bbox, dest_bbox=dest_bbox,
+    )
+    by_date = date_from is not None or date_to is not None
+    result = await db.execute(order_keyset_query(stmt, RetailerMandiOrder, cursor, limit, by_date))
+    orders, next_cursor = split_page(result.scalars().all(), limit, cursor_for=order_cursor_for(by_date))
+    set_next_cursor(response, next_cursor)
+    return orders
 
 
 @router.post("/orders", response_model=RetailerMandiOrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
+async def create_order(
     payload: RetailerMandiOrderCreate,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Create a new retailer-mandi order."""
     order = RetailerMandiOrder(**payload.model_dump())
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     return order
 
 
 @router.get("/orders/{order_id}", response_model=RetailerMandiOrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a single order by ID."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    order = await db.scalar(select(RetailerMandiOrder).where(RetailerMandiOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
 @router.put("/orders/{order_id}", response_model=RetailerMandiOrderResponse)
-def update_order(
+async def update_order(
     order_id: int,
     payload: RetailerMandiOrderUpdate,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing order."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    order = await db.scalar(select(RetailerMandiOrder).where(RetailerMandiOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
@@ -210,20 +251,20 @@ def update_order(
     for key, value in update_data.items():
         setattr(order, key, value)
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
     return order
 
 
 @router.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_order(
+async def delete_order(
     order_id: int,
-    current_user: User = Depends(require_role("retailer")),
-    db: Session = Depends(get_db),
+    principal: Principal = Depends(require_principal("retailer")),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete an order."""
-    order = db.query(RetailerMandiOrder).filter(RetailerMandiOrder.id == order_id).first()
+    order = await db.scalar(select(RetailerMandiOrder).where(RetailerMandiOrder.id == order_id))
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    db.delete(order)
-    db.commit()
+    await db.delete(order)
+    await db.commit()
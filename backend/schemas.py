@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator, validator
+from typing import List, Optional
 from datetime import datetime, date
 
 class UserRegister(BaseModel):
@@ -237,4 +237,57 @@ class CropResponse(BaseModel):
     planted_date: Optional[date]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# ── Alerts ───────────────────────────────────────────────────────────────────
+class AlertFanoutRequest(BaseModel):
+    message: str = Field(..., min_length=1)
+    severity: str = Field("medium", pattern="^(low|medium|high|critical)$")
+    # Audience: any combination (ANDed); at least one is required
+    role: Optional[str] = Field(None, pattern="^(farmer|mandi_owner|retailer|admin)$")
+    user_ids: Optional[List[int]] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    radius_km: Optional[float] = Field(None, gt=0)
+    # Same key again → no new rows (defaults to message + severity + UTC day)
+    dedupe_key: Optional[str] = Field(None, max_length=64)
+
+
+class AlertFanoutResponse(BaseModel):
+    targeted: int
+    inserted: int
+    duplicates: int
+    dedupe_key: str
+
+
+class AlertResponse(BaseModel):
+    id: int
+    message: Optional[str]
+    severity: Optional[str]
+    seen: Optional[bool]
+    created_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class AlertMarkSeenRequest(BaseModel):
+    # Exactly one of: explicit ids, everything up to (and including) an id, or all
+    ids: Optional[List[int]] = Field(None, max_length=500)
+    up_to_id: Optional[int] = None
+    all: bool = False
+
+    @model_validator(mode="after")
+    def one_selector(self):
+        if sum([self.ids is not None, self.up_to_id is not None, self.all]) != 1:
+            raise ValueError("Pass exactly one of ids, up_to_id or all")
+        return self
+
+
+class AlertMarkSeenResponse(BaseModel):
+    marked: int
+    unseen_count: int
+
+
+class AlertUnseenCountResponse(BaseModel):
+    unseen_count: int
@@ -1,70 +1,104 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from typing import Optional
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.schedulers.base import STATE_RUNNING, STATE_STOPPED
 
-from database import get_db, init_db, engine
+from config import settings
+from database import get_db, init_db, engine, pool_stats
 from models import User, Farmer, MandiOwner, Retailer, RetailerItem, RetailerMandiOrder, Base
 from retailer.routes import router as retailer_router
 from schemas import UserRegister, UserLogin, Token, UserResponse
-from auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth import create_access_token, principal_cache_stats, ACCESS_TOKEN_EXPIRE_MINUTES
+from hashing import password_hasher, HashPoolSaturated
+from http_clients import start_clients, close_clients
+from pagination import NEXT_CURSOR_HEADER
 from farmer.routes import router as farmer_router
-from retailer.agent import run_demand_agent
+from farmer.llm_cache import llm_cache
+from farmer.weather import weather_cache_stats
+from mandi.dashboard_cache import dashboard_cache_stats
+from agent_context import agent_run_stats
+from agent_jobs import AGENT_JOBS, build_scheduler, get_agent_run, jobs_status, shutdown_agent_runs, submit_agent_run
+from leader import LeaderElector, build_leader_lock
+from retailer.agent import demand_fleet_stats
 from mandi.routes import router as mandi_router
-from mandi.agent import run_mandi_agent
-from farmer.agent import run_farmer_agent
+from alerts.routes import router as alerts_router
+from alerts.stream import alert_broker, build_alert_listener
+from notification_outbox import outbox_worker
 
 logger = logging.getLogger("server")
 
 # ── Scheduler ────────────────────────────────────────────────────────────────
-scheduler = BackgroundScheduler()
+scheduler = build_scheduler()
 
 
-def _scheduled_agent_job():
-    """Wrapper called by APScheduler — runs both agents."""
-    logger.info("⏰ Cron triggered: running demand agent...")
-    try:
-        result = run_demand_agent()
-        logger.info(f"Retailer agent finished: {result[:200]}")
-    except Exception as e:
-        logger.error(f"Retailer agent failed: {e}", exc_info=True)
+def _start_scheduling():
+    """Leader elected: start (or resume) the agent jobs in this worker."""
+    if scheduler.state == STATE_STOPPED:
+        scheduler.start()
+    else:
+        # Run times computed before the pause are stale: the previous leader may
+        # already have run them, and misfire grace would fire them again here.
+        # Re-arm every job from now so a fire time passed while paused is dropped.
+        for job in scheduler.get_jobs():
+            scheduler.reschedule_job(job.id, trigger=job.trigger)
+        scheduler.resume()
+    logger.info(
+        "✅ APScheduler started — "
+        + ", ".join(f"{spec.name} agent at '{spec.cron}'" for spec in AGENT_JOBS.values())
+        + " (UTC)"
+    )
 
-    logger.info("⏰ Cron triggered: running mandi agent...")
-    try:
-        result = run_mandi_agent()
-        logger.info(f"Mandi agent finished: {result[:200]}")
-    except Exception as e:
-        logger.error(f"Mandi agent failed: {e}", exc_info=True)
 
-    logger.info("⏰ Cron triggered: running farmer agent...")
-    try:
-        result = run_farmer_agent()
-        logger.info(f"Farmer agent finished: {result[:200]}")
-    except Exception as e:
-        logger.error(f"Farmer agent failed: {e}", exc_info=True)
+def _stop_scheduling():
+    """Leadership lost: stop firing jobs here (runs in progress finish)."""
+    if scheduler.state == STATE_RUNNING:
+        scheduler.pause()
+        logger.info("⏸️ APScheduler paused — not the scheduler leader")
+
+
+def _on_elected():
+    """Leader elected: run the agent jobs and drain the notification outbox here."""
+    _start_scheduling()
+    # One drainer for the deployment, so the Twilio rate limit holds across workers
+    if settings.OUTBOX_WORKER_ENABLED:
+        outbox_worker.start()
+
+
+def _on_demoted():
+    _stop_scheduling()
+    outbox_worker.stop()
+
+
+elector = LeaderElector(build_leader_lock(), on_elected=_on_elected, on_demoted=_on_demoted)
+alert_listener = build_alert_listener()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: schedule the agent to run daily at 06:00 UTC
-    scheduler.add_job(
-        _scheduled_agent_job,
-        trigger=CronTrigger(hour=6, minute=0),
-        id="demand_alert_agent",
-        replace_existing=True,
-    )
-    scheduler.start()
-    logger.info("✅ APScheduler started — demand agent runs daily at 06:00 UTC")
+    # Startup: one scheduled job per agent (see agent_jobs.AGENT_JOBS) and the
+    # notification outbox drainer, started only in the worker that wins the
+    # leader election
+    elector.start()
+    # Every worker relays new alerts to its own SSE subscribers
+    alert_listener.start()
+    await start_clients()
     yield
     # Shutdown
-    scheduler.shutdown(wait=False)
+    alert_listener.stop()
+    elector.stop()
+    if scheduler.state != STATE_STOPPED:
+        scheduler.shutdown(wait=False)
     logger.info("🛑 APScheduler shut down")
+    shutdown_agent_runs()
+    outbox_worker.shutdown()
+    password_hasher.shutdown()
+    await close_clients()
 
 
 app = FastAPI(title="Supply Chain Management API", lifespan=lifespan)
@@ -76,6 +110,7 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # # Initialize database tables on startup
@@ -99,25 +134,20 @@ def read_root():
         }
     }
 
-@app.post("/api/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    """
-    Register a new user with role-based profile creation
-    
-    Roles: farmer, mandi_owner, retailer, admin
-    """
-    # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    # Hash the password
-    hashed_password = get_password_hash(user_data.password)
-    
-    # Create user
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many concurrent logins, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _create_user(db: Session, user_data: UserRegister, hashed_password: str) -> User:
+    """Insert the user and its role-specific profile."""
     new_user = User(
         username=user_data.username,
         password_hash=hashed_password,
@@ -152,31 +182,81 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
         db.add(retailer_profile)
     
     db.commit()
-    
+    db.refresh(new_user)
     return new_user
 
+
+def _replace_password_hash(db: Session, user: User, new_hash: str) -> None:
+    """Persist a re-hash made at the current bcrypt cost."""
+    user.password_hash = new_hash
+    db.commit()
+    db.refresh(user)
+
+
+# Login counters for /api/metrics (mutated only on the event loop)
+login_stats = {"succeeded": 0, "failed": 0, "rejected": 0, "rehashed": 0}
+
+
+@app.post("/api/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+    """
+    Register a new user with role-based profile creation
+    
+    Roles: farmer, mandi_owner, retailer, admin
+    """
+    # Check if username already exists
+    existing_user = await run_in_threadpool(_get_user_by_username, db, user_data.username)
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered"
+        )
+    
+    # Hash the password on the dedicated bcrypt pool
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except HashPoolSaturated:
+        raise _hashing_busy()
+    
+    return await run_in_threadpool(_create_user, db, user_data, hashed_password)
+
 @app.post("/api/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login with username and password, returns JWT token with role
     """
     # Find user by username
-    user = db.query(User).filter(User.username == user_credentials.username).first()
+    user = await run_in_threadpool(_get_user_by_username, db, user_credentials.username)
     
     if not user:
+        login_stats["failed"] += 1
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verify password
-    if not verify_password(user_credentials.password, user.password_hash):
+    # Verify password on the dedicated bcrypt pool
+    try:
+        verified, new_hash = await password_hasher.verify_and_update(
+            user_credentials.password, user.password_hash
+        )
+    except HashPoolSaturated:
+        login_stats["rejected"] += 1
+        raise _hashing_busy()
+
+    if not verified:
+        login_stats["failed"] += 1
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # Stored hash was made at a different cost — upgrade it transparently
+    if new_hash:
+        await run_in_threadpool(_replace_password_hash, db, user, new_hash)
+        login_stats["rehashed"] += 1
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -189,6 +269,7 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
         expires_delta=access_token_expires
     )
     
+    login_stats["succeeded"] += 1
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -200,6 +281,7 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
 # Register routes
 app.include_router(retailer_router)
 app.include_router(mandi_router)
+app.include_router(alerts_router)
 
 @app.get("/api/health")
 def health_check():
@@ -217,38 +299,74 @@ def readiness():
     return {"status": "ready"}
 
 
+@app.get("/api/metrics")
+def metrics():
+    """In-process counters for capacity planning (per worker)."""
+    return {
+        "auth": {
+            "logins": login_stats,
+            "hashing": password_hasher.stats(),
+            "principal_cache": principal_cache_stats(),
+        },
+        "db_pool": pool_stats(),
+        "llm_cache": llm_cache.stats(),
+        "weather_cache": weather_cache_stats(),
+        "dashboard_cache": dashboard_cache_stats(),
+        "agents": {"last_runs": agent_run_stats(), "demand_fleet": demand_fleet_stats()},
+        "alert_stream": {**alert_broker.stats(), **alert_listener.status()},
+        "notification_outbox": outbox_worker.stats(),
+    }
+
+
+
+@app.get("/api/agent/jobs", tags=["Agent"])
+def list_agent_jobs():
+    """Schedule, next run and last-run status (time, duration, outcome) of each agent job."""
+    return {"leader": elector.status(), "jobs": jobs_status(scheduler)}
+
 
-@app.post("/api/agent/run", tags=["Agent"])
-def trigger_agent_manually(user_id: Optional[int] = None):
+def _accepted(run: dict, created: bool, response: Response) -> dict:
+    """202 body for a queued (or de-duplicated) agent run."""
+    response.headers["Location"] = f"/api/agent/jobs/{run['id']}"
+    return {
+        "job_id": run["id"],
+        "agent": run["agent"],
+        "status": run["status"],
+        "deduplicated": not created,
+        "status_url": f"/api/agent/jobs/{run['id']}",
+    }
+
+
+@app.get("/api/agent/jobs/{job_id}", tags=["Agent"])
+def get_agent_job(job_id: str):
+    """Status of one agent run; `result` is filled in once it succeeds."""
+    run = get_agent_run(job_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return run
+
+
+@app.post("/api/agent/run", tags=["Agent"], status_code=status.HTTP_202_ACCEPTED)
+def trigger_agent_manually(response: Response, user_id: Optional[int] = None):
     """
     Manually trigger the demand-alert agent (for testing).
     Optional query param: ?user_id=123 to run for specific retailer.
+    Returns 202 with a job id to poll at /api/agent/jobs/{job_id}.
     """
-    try:
-        result = run_demand_agent(target_user_id=user_id)
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+    params = {"target_user_id": user_id} if user_id else {}
+    return _accepted(*submit_agent_run("demand", **params), response)
 
 
-@app.post("/api/agent/mandi/run", tags=["Agent"])
-def trigger_mandi_agent_manually():
-    """Manually trigger the mandi supply-chain agent (for testing)."""
-    try:
-        result = run_mandi_agent()
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+@app.post("/api/agent/mandi/run", tags=["Agent"], status_code=status.HTTP_202_ACCEPTED)
+def trigger_mandi_agent_manually(response: Response):
+    """Manually trigger the mandi supply-chain agent (for testing). Returns 202 with a job id."""
+    return _accepted(*submit_agent_run("mandi"), response)
 
 
-@app.post("/api/agent/farmer/run", tags=["Agent"])
-def trigger_farmer_agent_manually():
-    """Manually trigger the farmer advisory agent (for testing)."""
-    try:
-        result = run_farmer_agent()
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
+@app.post("/api/agent/farmer/run", tags=["Agent"], status_code=status.HTTP_202_ACCEPTED)
+def trigger_farmer_agent_manually(response: Response):
+    """Manually trigger the farmer advisory agent (for testing). Returns 202 with a job id."""
+    return _accepted(*submit_agent_run("farmer"), response)
 
 
 if __name__ == "__main__":
@@ -10,7 +10,7 @@ import {
     AlertCircle, CheckCircle, Clock, RefreshCw, BarChart3, PieChart,
     Save, X, Zap, Activity, Navigation, Radio
 } from 'lucide-react'
-import api from '../services/api'
+import api, { getPage } from '../services/api'
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, ArcElement, RadialLinearScale, Title, Tooltip, Legend, Filler)
 
@@ -101,6 +101,9 @@ export default function RetailerDashboard() {
     const [profile, setProfile] = useState(null)
     const [items, setItems] = useState([])
     const [orders, setOrders] = useState([])
+    const [ordersCursor, setOrdersCursor] = useState(null)
+    const [loadingMoreOrders, setLoadingMoreOrders] = useState(false)
+    const [orderFilters, setOrderFilters] = useState({ item: '', date_from: '', date_to: '' })
     const [lastUpdated, setLastUpdated] = useState(new Date())
     // Auto-refresh state removed - feature disabled
     const [selectedOrder, setSelectedOrder] = useState(null)
@@ -139,7 +142,7 @@ export default function RetailerDashboard() {
             const [profileRes, itemsRes, ordersRes] = await Promise.allSettled([
                 api.get('/retailer/profile'),
                 api.get('/retailer/items'),
-                api.get('/retailer/orders'),
+                getPage('/retailer/orders', orderFilters),
             ])
             if (profileRes.status === 'fulfilled') {
                 setProfile(profileRes.value.data)
@@ -151,7 +154,10 @@ export default function RetailerDashboard() {
                 })
             }
             if (itemsRes.status === 'fulfilled') setItems(itemsRes.value.data || [])
-            if (ordersRes.status === 'fulfilled') setOrders(ordersRes.value.data || [])
+            if (ordersRes.status === 'fulfilled') {
+                setOrders(ordersRes.value.data)
+                setOrdersCursor(ordersRes.value.nextCursor)
+            }
             setLastUpdated(new Date())
         } catch (err) {
             console.error('Failed to load:', err)
@@ -159,6 +165,30 @@ export default function RetailerDashboard() {
         setLoading(false)
     }
 
+    // Order pages: filters are applied server-side, one page per request
+    const loadOrders = async (filters = orderFilters) => {
+        try {
+            const page = await getPage('/retailer/orders', filters)
+            setOrders(page.data)
+            setOrdersCursor(page.nextCursor)
+        } catch (err) {
+            console.error('Failed to load orders:', err)
+        }
+    }
+
+    const loadMoreOrders = async () => {
+        if (!ordersCursor) return
+        setLoadingMoreOrders(true)
+        try {
+            const page = await getPage('/retailer/orders', { ...orderFilters, cursor: ordersCursor })
+            setOrders(prev => [...prev, ...page.data])
+            setOrdersCursor(page.nextCursor)
+        } catch (err) {
+            console.error('Failed to load more orders:', err)
+        }
+        setLoadingMoreOrders(false)
+    }
+
     // Item Operations
     const handleAddItem = async () => {
         try {
@@ -805,7 +835,7 @@ export default function RetailerDashboard() {
                                         <Truck className="w-6 h-6 text-cyan-400" />
                                         Order Management
                                     </h2>
-                                    <p className="text-sm text-white/40 mt-1">{orders.length} orders • ₹{(totalOrderValue / 1000).toFixed(1)}K total value</p>
+                                    <p className="text-sm text-white/40 mt-1">{orders.length}{ordersCursor ? '+' : ''} orders • ₹{(totalOrderValue / 1000).toFixed(1)}K total value</p>
                                 </div>
                                 <button onClick={() => { setShowAddOrder(true); setOrderForm({ ...orderForm, src_lat: profile?.user?.latitude || 0, src_long: profile?.user?.longitude || 0 }); }}
                                     className="flex items-center gap-2 px-5 py-3 rounded-xl bg-cyan-500 text-black font-bold hover:bg-cyan-400 transition-all shadow-lg shadow-cyan-500/20">
@@ -874,6 +904,38 @@ export default function RetailerDashboard() {
                                 </div>
                             )}
 
+                            <div className="flex flex-wrap items-end gap-3">
+                                <div>
+                                    <label className="text-xs font-semibold text-white/60 block mb-2">Item</label>
+                                    <input type="text" placeholder="e.g., tomato" value={orderFilters.item}
+                                        onChange={e => setOrderFilters({ ...orderFilters, item: e.target.value })}
+                                        className="px-4 py-2 rounded-xl bg-white/5 border border-white/10 text-white placeholder:text-white/20 focus:outline-none focus:border-cyan-500/50"
+                                    />
+                                </div>
+                                <div>
+                                    <label className="text-xs font-semibold text-white/60 block mb-2">From</label>
+                                    <input type="date" value={orderFilters.date_from}
+                                        onChange={e => setOrderFilters({ ...orderFilters, date_from: e.target.value })}
+                                        className="px-4 py-2 rounded-xl bg-white/5 border border-white/10 text-white focus:outline-none focus:border-cyan-500/50"
+                                    />
+                                </div>
+                                <div>
+                                    <label className="text-xs font-semibold text-white/60 block mb-2">To</label>
+                                    <input type="date" value={orderFilters.date_to}
+                                        onChange={e => setOrderFilters({ ...orderFilters, date_to: e.target.value })}
+                                        className="px-4 py-2 rounded-xl bg-white/5 border border-white/10 text-white focus:outline-none focus:border-cyan-500/50"
+                                    />
+                                </div>
+                                <button onClick={() => loadOrders()}
+                                    className="px-5 py-2 rounded-xl bg-cyan-500/20 text-cyan-400 hover:bg-cyan-500/30 transition-all">
+                                    Apply
+                                </button>
+                                <button onClick={() => { const cleared = { item: '', date_from: '', date_to: '' }; setOrderFilters(cleared); loadOrders(cleared); }}
+                                    className="px-5 py-2 rounded-xl bg-white/5 text-white/60 hover:bg-white/10 transition-all">
+                                    Clear
+                                </button>
+                            </div>
+
                             {orders.length > 0 && profile?.user?.latitude && (
                                 <div className="rounded-2xl overflow-hidden border border-white/[0.06]" style={{ height: 400 }}>
                                     <MapContainer center={[profile.user.latitude, profile.user.longitude]} zoom={12} style={{ height: '100%', width: '100%' }}>
@@ -930,6 +992,15 @@ export default function RetailerDashboard() {
                                 ))}
                             </div>
 
+                            {ordersCursor && (
+                                <div className="text-center">
+                                    <button onClick={loadMoreOrders} disabled={loadingMoreOrders}
+                                        className="px-6 py-3 rounded-xl bg-white/5 text-white/60 hover:bg-white/10 transition-all disabled:opacity-50">
+                                        {loadingMoreOrders ? 'Loading…' : 'Load more orders'}
+                                    </button>
+                                </div>
+                            )}
+
                             {orders.length === 0 && !showAddOrder && (
                                 <div className="text-center py-20">
                                     <Truck className="w-16 h-16 mx-auto mb-4 text-white/10" />
@@ -9,7 +9,7 @@ import {
     User, Globe, Plus, Edit2, Trash2, Calendar, DollarSign, Truck,
     AlertCircle, CheckCircle, Clock, RefreshCw, BarChart3, PieChart
 } from 'lucide-react'
-import api from '../services/api'
+import api, { getPage } from '../services/api'
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, ArcElement, Title, Tooltip, Legend, Filler)
 
@@ -69,6 +69,7 @@ export default function RetailerDashboard() {
     const [profile, setProfile] = useState(null)
     const [items, setItems] = useState([])
     const [orders, setOrders] = useState([])
+    const [hasMoreOrders, setHasMoreOrders] = useState(false)
     
     // Modals
     const [showAddItem, setShowAddItem] = useState(false)
@@ -101,7 +102,7 @@ export default function RetailerDashboard() {
             const [profileRes, itemsRes, ordersRes] = await Promise.allSettled([
                 api.get('/retailer/profile'),
                 api.get('/retailer/items'),
-                api.get('/retailer/orders'),
+                getPage('/retailer/orders'),
             ])
             if (profileRes.status === 'fulfilled') {
                 setProfile(profileRes.value.data)
@@ -113,7 +114,10 @@ export default function RetailerDashboard() {
                 })
             }
             if (itemsRes.status === 'fulfilled') setItems(itemsRes.value.data)
-            if (ordersRes.status === 'fulfilled') setOrders(ordersRes.value.data)
+            if (ordersRes.status === 'fulfilled') {
+                setOrders(ordersRes.value.data)
+                setHasMoreOrders(Boolean(ordersRes.value.nextCursor))
+            }
         } catch (err) {
             console.error('Failed to load:', err)
         }
@@ -326,7 +330,7 @@ export default function RetailerDashboard() {
                             <div className="p-5 rounded-2xl border border-cyan-500/20 bg-gradient-to-br from-cyan-500/10 to-cyan-500/5 hover:scale-[1.02] transition-all">
                                 <div className="flex items-center justify-between mb-3">
                                     <Truck className="w-8 h-8 text-cyan-400" />
-                                    <div className="text-3xl font-black text-cyan-400">{orders.length}</div>
+                                    <div className="text-3xl font-black text-cyan-400">{orders.length}{hasMoreOrders ? '+' : ''}</div>
                                 </div>
                                 <div className="text-xs text-white/40 font-medium uppercase tracking-wider">Active Orders</div>
                             </div>
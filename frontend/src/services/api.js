@@ -21,4 +21,13 @@ api.interceptors.request.use(
     (error) => Promise.reject(error)
 );
 
+// List endpoints return one page at a time; the next page's cursor comes back
+// in the X-Next-Cursor header (absent on the last page). Pass it back as
+// `cursor` to load more. Empty filter values are left out of the query.
+export const getPage = async (url, params = {}) => {
+    const query = Object.fromEntries(Object.entries(params).filter(([, v]) => v !== '' && v != null));
+    const res = await api.get(url, { params: query });
+    return { data: res.data || [], nextCursor: res.headers['x-next-cursor'] || null };
+};
+
 export default api;